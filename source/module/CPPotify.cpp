@@ -1,35 +1,126 @@
 #include "CPPotify.h"
+#include "pyJSON.h"
+#include "lazyJSON.h"
 #include <regex>
 #include <array>
 #include <typeinfo>
+#include <deque>
+#include <random>
+#include <cmath>
+#include <cstdlib>
+#include <ctime>
+#include <unordered_map>
+#include <thread>
 #include <algorithm>
 #include <curl/curl.h>
+#include <nlohmann/json.hpp>
 #include <pybind11/stl.h>
+#include <pybind11/functional.h>
+#include <pybind11/numpy.h>
 #include <pybind11/pybind11.h>
 
 namespace py = pybind11;
 using namespace std;
 
-CPPotify::CPPotify(std::string ID, std::string SECRET) : CLIENT_ID(ID), CLIENT_SECRET(SECRET) {
-    clientCredentials ac(this->CLIENT_ID, this->CLIENT_SECRET);
-    this->ac = ac;
-    this->TOKEN = ac.getToken();
+/* Defined here as well, std::chrono::seconds takes them by reference */
+const int CPPotify::REFRESH_MARGIN;
+const int CPPotify::REFRESH_RETRY;
+const int CPPotify::REFRESH_RETRY_MAX;
+
+/* Constructors return at once without requesting a token, the first request that needs one requests it */
+CPPotify::CPPotify(std::string ID, std::string SECRET, std::shared_ptr<tokenStore> store) : CLIENT_ID(ID), CLIENT_SECRET(SECRET), store(store) {
+    this->refreshThread = std::thread(&CPPotify::refreshLoop, this);
+}
+
+CPPotify::CPPotify(std::string ID, std::string SECRET, std::string oAuthToken, std::string REDIRECT_URI, std::string STATE, std::string SCOPE, bool SHOW_DIALOG, std::shared_ptr<tokenStore> store) : CLIENT_ID(ID), CLIENT_SECRET(SECRET), oAuthToken(oAuthToken), REDIRECT_URI(REDIRECT_URI), STATE(STATE), SCOPE(SCOPE), SHOW_DIALOG(SHOW_DIALOG), store(store) {
+    this->refreshThread = std::thread(&CPPotify::refreshLoop, this);
+}
+
+CPPotify::~CPPotify() {
+    this->stopRefresh();
+
+    if (this->multiHandle) {
+        curl_multi_cleanup(this->multiHandle);
+    }
+
+    for (auto &transfer : this->asyncTransfers) {
+        curl_multi_remove_handle(this->asyncHandle, transfer.first);
+        curl_slist_free_all(transfer.second->chunk);
+        curl_easy_cleanup(transfer.first);
+    }
+
+    if (this->asyncHandle) {
+        curl_multi_cleanup(this->asyncHandle);
+    }
+
+    for (CURL *curl : this->handlePool) {
+        curl_easy_cleanup(curl);
+    }
 }
 
-CPPotify::CPPotify(std::string ID, std::string SECRET, std::string oAuthToken, std::string REDIRECT_URI, std::string STATE, std::string SCOPE, bool SHOW_DIALOG) : CLIENT_ID(ID), CLIENT_SECRET(SECRET), oAuthToken(oAuthToken), REDIRECT_URI(REDIRECT_URI), STATE(STATE), SCOPE(SCOPE), SHOW_DIALOG(SHOW_DIALOG) {
-    oAuth ac(this->CLIENT_ID, this->CLIENT_SECRET, this->oAuthToken, this->REDIRECT_URI, this->STATE, this->SCOPE, this->SHOW_DIALOG);
-    this->ac = ac;
-    this->TOKEN = ac.getToken();
+CURL *CPPotify::acquireHandle() {
+    std::lock_guard<std::mutex> lock(this->poolMutex);
+
+    if (this->handlePool.empty()) {
+        return curl_easy_init();
+    }
+
+    CURL *curl = this->handlePool.back();
+    this->handlePool.pop_back();
+    return curl;
 }
 
-CPPotify::~CPPotify() {}
+void CPPotify::releaseHandle(CURL *curl) {
+    /* curl_easy_reset clears the options set for the last request but keeps live connections */
+    curl_easy_reset(curl);
+
+    std::lock_guard<std::mutex> lock(this->poolMutex);
+    this->handlePool.push_back(curl);
+}
 
 size_t CPPotify::WriteCallback(void *contents, size_t size, size_t nmemb, void *userp) {
     ((std::string*)userp)->append((char*)contents, size * nmemb);
     return size * nmemb;
 }
 
-std::vector<std::string> CPPotify::curlGET(std::string spotifyObj, std::map<std::string, std::string> payload) {
+size_t CPPotify::HeaderCallback(char *buffer, size_t size, size_t nitems, void *userp) {
+    responseTarget *target = (responseTarget*)userp;
+    std::string line(buffer, size * nitems);
+    size_t colon = line.find(':');
+
+    if (colon != std::string::npos) {
+        std::string name = line.substr(0, colon);
+        std::transform(name.begin(), name.end(), name.begin(), ::tolower);
+
+        size_t start = line.find_first_not_of(" \t", colon + 1);
+        size_t end = line.find_last_not_of(" \t\r\n");
+        std::string value = (start == std::string::npos || end < start) ? "" : line.substr(start, end - start + 1);
+
+        /* Reserve the whole body so appending to it never reallocates, capped in case of a bogus length */
+        if (name == "content-length" && target->res) {
+            long long length = std::atoll(value.c_str());
+            if (length > 0 && length <= (64LL << 20)) {
+                target->res->reserve(length);
+            }
+        }
+
+        (*target->headers)[name] = value;
+    }
+
+    return size * nitems;
+}
+
+std::vector<std::string> CPPotify::makeResponse(std::string targetURL, std::string res) {
+    /* Braced initialisation would copy both strings out of the initializer list */
+    std::vector<std::string> call;
+    call.reserve(2);
+    call.push_back(std::move(targetURL));
+    call.push_back(std::move(res));
+
+    return call;
+}
+
+std::string CPPotify::buildURL(std::string spotifyObj, std::map<std::string, std::string> payload) {
     std::string selfStr = (payload["self"] == "1" && payload["obj"] != "") ? "me/" + spotifyObj : "me";
 
     std::string spotifyObjStr = (payload["self"] == "1") ? "me/" + spotifyObj : spotifyObj;
@@ -45,7 +136,8 @@ std::vector<std::string> CPPotify::curlGET(std::string spotifyObj, std::map<std:
         payloadStr = payloadStr + "/" + payload["obj"] + "?";
     }
     else {
-        payloadStr = payloadStr + "?";
+        /* Multiple IDs already start the query string */
+        payloadStr = payloadStr + ((idStr.rfind("?", 0) == 0) ? "&" : "?");
     }
 
     auto it1 = payload.find("self");
@@ -69,37 +161,241 @@ std::vector<std::string> CPPotify::curlGET(std::string spotifyObj, std::map<std:
         it++;
     }
 
-    std::string targetURL = "https://api.spotify.com/v1/" + payloadStr;
-    
-    /* Logging  */
-    std::cout << targetURL << std::endl;
+    return std::string(SPOTIFY_API_URL) + payloadStr;
+}
+
+struct curl_slist *CPPotify::setupGET(CURL *curl, std::string targetURL, responseTarget *target) {
+    curl_easy_setopt(curl, CURLOPT_TCP_NODELAY, 0);
+    curl_easy_setopt(curl, CURLOPT_TCP_KEEPALIVE, 1L);
+    curl_easy_setopt(curl, CURLOPT_URL, targetURL.c_str());
+    curl_easy_setopt(curl, CURLOPT_WRITEFUNCTION, this->WriteCallback);
+    curl_easy_setopt(curl, CURLOPT_WRITEDATA, target->res);
+    curl_easy_setopt(curl, CURLOPT_HEADERFUNCTION, this->HeaderCallback);
+    curl_easy_setopt(curl, CURLOPT_HEADERDATA, target);
+    curl_easy_setopt(curl, CURLOPT_TIMEOUT, std::atomic_load(&this->retries)->TIMEOUT);
+
+    std::string bearer = "Content-Type: application/json"; 
+    struct curl_slist *bearerChunk = nullptr;
+    bearerChunk = curl_slist_append(bearerChunk, bearer.c_str());
+    bearerChunk = curl_slist_append(bearerChunk, this->bearerHeader(target->generation).c_str());
+
+    /* Revalidate expired cache entries instead of downloading them again, a 304 is answered from the cache in cacheStore */
+    if (target->etag != "") {
+        bearerChunk = curl_slist_append(bearerChunk, ("If-None-Match: " + target->etag).c_str());
+    }
+
+    if (target->lastModified != "") {
+        bearerChunk = curl_slist_append(bearerChunk, ("If-Modified-Since: " + target->lastModified).c_str());
+    }
 
+    curl_easy_setopt(curl, CURLOPT_HTTPHEADER, bearerChunk);
+
+    return bearerChunk;
+}
+
+std::vector<std::string> CPPotify::curlGET(std::string spotifyObj, std::map<std::string, std::string> payload) {
+    return this->performGET(this->buildURL(spotifyObj, payload));
+}
+
+std::vector<std::string> CPPotify::performGET(std::string targetURL) {
     CURL *curl;
     std::string res;
+    std::map<std::string, std::string> headers;
+
+    cachedResponse cached;
+    if (this->cacheLookup(targetURL, cached)) {
+        return makeResponse(targetURL, std::move(cached.res));
+    }
+
+    this->awaitToken();
+
+    /* Logging  */
+    std::cout << targetURL << std::endl;
     
-    curl = curl_easy_init();
+    curl = this->acquireHandle();
     if(curl) {
         try {
-            curl_easy_setopt(curl, CURLOPT_TCP_NODELAY, 0);
-            curl_easy_setopt(curl, CURLOPT_URL, targetURL.c_str());
-            curl_easy_setopt(curl, CURLOPT_WRITEFUNCTION, this->WriteCallback);
-            curl_easy_setopt(curl, CURLOPT_WRITEDATA, &res);
+            responseTarget target {&res, &headers};
+            target.etag = cached.etag;
+            target.lastModified = cached.lastModified;
 
-            std::string bearer = "Content-Type: application/json"; 
-            struct curl_slist *bearerChunk = nullptr;
-            bearerChunk = curl_slist_append(bearerChunk, bearer.c_str());
-            bearerChunk = curl_slist_append(bearerChunk, ("Authorization: Bearer " + regex_replace(this->TOKEN, regex("\""), "")).c_str());
-            curl_easy_setopt(curl, CURLOPT_HTTPHEADER, bearerChunk);
+            for (int attempt = 0; ; attempt++) {
+                this->rateAcquire();
 
-            curl_easy_perform(curl);
-            curl_easy_cleanup(curl);
+                res.clear();
+                headers.clear();
+                struct curl_slist *bearerChunk = this->setupGET(curl, targetURL, &target);
+
+                CURLcode code = curl_easy_perform(curl);
+                curl_slist_free_all(bearerChunk);
+
+                double delay = this->retryDelay(curl, code, target, attempt);
+                if (delay < 0) {
+                    this->retryFailed(curl, code, res);
+                    break;
+                }
+
+                std::this_thread::sleep_for(std::chrono::duration<double>(delay));
+            }
+
+            this->cacheStore(targetURL, curl, res, headers);
         }
         catch (const char* Exception) {
             cerr << Exception << std::endl;
         }
+
+        this->releaseHandle(curl);
     }
     
-    return std::vector<std::string> {targetURL, res};
+    return makeResponse(targetURL, std::move(res));
+}
+
+std::vector<std::vector<std::string>> CPPotify::getMany(std::vector<std::string> targetURLs, int maxConcurrency) {
+    size_t n = targetURLs.size();
+    std::vector<std::string> res(n);
+    std::vector<std::map<std::string, std::string>> headers(n);
+    std::vector<responseTarget> targets(n);
+    std::vector<CURL*> handles(n, nullptr);
+    std::vector<struct curl_slist*> chunks(n, nullptr);
+    std::vector<int> attempts(n, 0);
+
+    /* Cached responses are filled in directly, only the rest are sent */
+    std::deque<size_t> pending;
+    for (size_t i = 0; i < n; i++) {
+        cachedResponse cached;
+
+        if (this->cacheLookup(targetURLs[i], cached)) {
+            res[i] = std::move(cached.res);
+        }
+        else {
+            targets[i] = responseTarget {&res[i], &headers[i]};
+            targets[i].etag = cached.etag;
+            targets[i].lastModified = cached.lastModified;
+            pending.push_back(i);
+        }
+    }
+
+    if (!pending.empty()) {
+        this->awaitToken();
+    }
+
+    /* Reuse the persistent multi handle unless another thread is already running a batch on it */
+    std::unique_lock<std::mutex> lock(this->multiMutex, std::try_to_lock);
+
+    if (lock.owns_lock() && !this->multiHandle) {
+        this->multiHandle = curl_multi_init();
+    }
+
+    CURLM *multi = lock.owns_lock() ? this->multiHandle : curl_multi_init();
+
+    /* Transfers waiting out a retry backoff, keyed by the time they can be sent again */
+    std::multimap<std::chrono::steady_clock::time_point, size_t> delayed;
+
+    int active = 0;
+    double wait = 0;
+
+    auto addTransfer = [&](size_t i) {
+        handles[i] = this->acquireHandle();
+        chunks[i] = this->setupGET(handles[i], targetURLs[i], &targets[i]);
+        curl_easy_setopt(handles[i], CURLOPT_PRIVATE, reinterpret_cast<void*>(i));
+        curl_multi_add_handle(multi, handles[i]);
+        active++;
+    };
+
+    /* Starts queued transfers while the concurrency limit and the rate limiter allow, wait is set when the limiter is empty */
+    auto startPending = [&]() {
+        while (!pending.empty() && (maxConcurrency <= 0 || active < maxConcurrency)) {
+            if ((wait = this->rateWait()) > 0) {
+                return;
+            }
+
+            addTransfer(pending.front());
+            pending.pop_front();
+        }
+    };
+
+    /* Moves transfers whose backoff has passed to the front of the queue, returns the seconds until the next one is due */
+    auto releaseDelayed = [&]() {
+        auto now = std::chrono::steady_clock::now();
+
+        while (!delayed.empty() && delayed.begin()->first <= now) {
+            pending.push_front(delayed.begin()->second);
+            delayed.erase(delayed.begin());
+        }
+
+        return delayed.empty() ? 1.0 : std::chrono::duration<double>(delayed.begin()->first - now).count();
+    };
+
+    startPending();
+
+    while (active > 0 || !pending.empty() || !delayed.empty()) {
+        double next = releaseDelayed();
+        startPending();
+
+        if (active == 0) {
+            std::this_thread::sleep_for(std::chrono::duration<double>(!pending.empty() && wait > 0 ? std::min(wait, next) : next));
+            continue;
+        }
+
+        int running = 0;
+        curl_multi_perform(multi, &running);
+
+        CURLMsg *msg;
+        int queued = 0;
+        while ((msg = curl_multi_info_read(multi, &queued))) {
+            if (msg->msg != CURLMSG_DONE) {
+                continue;
+            }
+
+            CURL *curl = msg->easy_handle;
+            CURLcode code = msg->data.result;
+            void *priv = nullptr;
+            curl_easy_getinfo(curl, CURLINFO_PRIVATE, &priv);
+            size_t i = reinterpret_cast<size_t>(priv);
+
+            curl_multi_remove_handle(multi, curl);
+            curl_slist_free_all(chunks[i]);
+            active--;
+
+            /* Failed transfers wait out their backoff without holding a handle, rate limited ones are due straight away */
+            double delay = this->retryDelay(curl, code, targets[i], attempts[i]++);
+            if (delay >= 0) {
+                res[i].clear();
+                headers[i].clear();
+                delayed.emplace(std::chrono::steady_clock::now() + std::chrono::duration_cast<std::chrono::steady_clock::duration>(std::chrono::duration<double>(delay)), i);
+            }
+            else {
+                this->retryFailed(curl, code, res[i]);
+                this->cacheStore(targetURLs[i], curl, res[i], headers[i]);
+            }
+
+            this->releaseHandle(curl);
+        }
+
+        next = releaseDelayed();
+        startPending();
+
+        if (active > 0) {
+            double timeout = std::min(1.0, next);
+            if (!pending.empty() && wait > 0) {
+                timeout = std::min(timeout, wait);
+            }
+
+            curl_multi_wait(multi, nullptr, 0, static_cast<int>(timeout * 1000) + 1, nullptr);
+        }
+    }
+
+    if (!lock.owns_lock()) {
+        curl_multi_cleanup(multi);
+    }
+
+    std::vector<std::vector<std::string>> calls;
+    calls.reserve(n);
+    for (size_t i = 0; i < n; i++) {
+        calls.push_back(makeResponse(targetURLs[i], std::move(res[i])));
+    }
+
+    return calls;
 }
 
 std::vector<std::string> CPPotify::curlPOST(std::string spotifyObj, std::map<std::string, std::string> payload) { 
@@ -134,7 +430,9 @@ std::vector<std::string> CPPotify::curlPOST(std::string spotifyObj, std::map<std
         }
     }
 
-    std::string targetURL = "https://api.spotify.com/v1/" + payloadStr + POSTFIELDS;
+    std::string targetURL = std::string(SPOTIFY_API_URL) + payloadStr + POSTFIELDS;
+
+    this->awaitToken();
 
     /* Logging  */
     std::cout << targetURL << std::endl;
@@ -143,40 +441,175 @@ std::vector<std::string> CPPotify::curlPOST(std::string spotifyObj, std::map<std
     CURL *curl;
     std::string res;
     
-    curl = curl_easy_init();
+    curl = this->acquireHandle();
     if(curl) {
         try {
             curl_easy_setopt(curl, CURLOPT_TCP_NODELAY, 0);
+            curl_easy_setopt(curl, CURLOPT_TCP_KEEPALIVE, 1L);
             curl_easy_setopt(curl, CURLOPT_URL, targetURL.c_str());
             curl_easy_setopt(curl, CURLOPT_POST, 1);
             curl_easy_setopt(curl, CURLOPT_POSTFIELDS, "");
             curl_easy_setopt(curl, CURLOPT_WRITEFUNCTION, this->WriteCallback);
             curl_easy_setopt(curl, CURLOPT_WRITEDATA, &res);
-            
-            struct curl_slist *authChunk = nullptr;            
-            authChunk = curl_slist_append(authChunk, "Accept: application/json");
-            authChunk = curl_slist_append(authChunk, "Content-Type: application/json");
-            authChunk = curl_slist_append(authChunk, ("Authorization: Bearer " + this->TOKEN).c_str());
+            curl_easy_setopt(curl, CURLOPT_TIMEOUT, std::atomic_load(&this->retries)->TIMEOUT);
+
+            std::map<std::string, std::string> headers;
+            responseTarget target {&res, &headers};
+            curl_easy_setopt(curl, CURLOPT_HEADERFUNCTION, this->HeaderCallback);
+            curl_easy_setopt(curl, CURLOPT_HEADERDATA, &target);
+
+            for (int attempt = 0; ; attempt++) {
+                this->rateAcquire();
 
-            curl_easy_setopt(curl, CURLOPT_HTTPHEADER, authChunk);
+                res.clear();
+                headers.clear();
+                struct curl_slist *authChunk = nullptr;            
+                authChunk = curl_slist_append(authChunk, "Accept: application/json");
+                authChunk = curl_slist_append(authChunk, "Content-Type: application/json");
+                authChunk = curl_slist_append(authChunk, this->bearerHeader(target.generation).c_str());
 
-            curl_easy_perform(curl);
-            curl_easy_cleanup(curl);
+                curl_easy_setopt(curl, CURLOPT_HTTPHEADER, authChunk);
+
+                CURLcode code = curl_easy_perform(curl);
+                curl_slist_free_all(authChunk);
+
+                double delay = this->retryDelay(curl, code, target, attempt);
+                if (delay < 0) {
+                    this->retryFailed(curl, code, res);
+                    break;
+                }
+
+                std::this_thread::sleep_for(std::chrono::duration<double>(delay));
+            }
         }
         catch (const char* Exception) {
             std::cerr << Exception << std::endl;
         }
+
+        this->releaseHandle(curl);
     }
     
-    return std::vector<std::string> {targetURL, res};
+    return makeResponse(targetURL, std::move(res));
 }
 
-std::vector<std::string> CPPotify::getAlbums(std::string albumID, std::string albumObj, int limit, int offset) { 
+const std::vector<std::string> CPPotify::AUDIO_FEATURES = {
+    "danceability", "energy", "key", "loudness", "mode", "speechiness", "acousticness", "instrumentalness", "liveness",
+    "valence", "tempo", "duration_ms", "time_signature"
+};
+
+CPPotify::audioFeaturesMatrix CPPotify::getAudioFeaturesMatrix(std::vector<std::string> trackIDs, int maxConcurrency) {
+    audioFeaturesMatrix matrix;
+
+    std::unordered_map<std::string, size_t> rows;
+    for (auto &trackID : trackIDs) {
+        if (rows.emplace(trackID, matrix.ids.size()).second) {
+            matrix.ids.push_back(trackID);
+        }
+    }
+
+    size_t n = matrix.ids.size();
+    matrix.columns.assign(AUDIO_FEATURES.size(), std::vector<float>(n, NAN));
+
+    if (n == 0) {
+        return matrix;
+    }
+
+    /* Batches are split evenly, a batch holding a single ID would be sent to the single track endpoint */
+    size_t count = (n + 99) / 100;
+    std::vector<std::string> targetURLs;
+    for (size_t b = 0; b < count; b++) {
+        std::string joined;
+        for (size_t i = n * b / count; i < n * (b + 1) / count; i++) {
+            joined += (joined.empty() ? "" : "%2C") + matrix.ids[i];
+        }
+
+        targetURLs.push_back(this->getTracksURL(joined, "audio-features"));
+    }
+
+    std::vector<std::vector<std::string>> calls = this->getMany(targetURLs, maxConcurrency);
+
+    for (size_t b = 0; b < count; b++) {
+        columnReader reader = this->readColumns(calls[b]);
+
+        /* Several IDs return a list in request order with null for unknown IDs, a single ID returns the object itself */
+        size_t first = n * b / count;
+        size_t size = n * (b + 1) / count - first;
+        auto features = reader.tables.find("audio_features");
+
+        for (size_t c = 0; c < AUDIO_FEATURES.size(); c++) {
+            if (features == reader.tables.end()) {
+                auto number = reader.numbers.find(AUDIO_FEATURES[c]);
+                if (number != reader.numbers.end()) {
+                    matrix.columns[c][first] = static_cast<float>(number->second);
+                }
+
+                continue;
+            }
+
+            for (auto &column : features->second.columns) {
+                if (column.name == AUDIO_FEATURES[c] && !column.list) {
+                    std::copy_n(column.values.begin(), std::min(size, features->second.rows), matrix.columns[c].begin() + first);
+                }
+            }
+        }
+    }
+
+    return matrix;
+}
+
+columnReader CPPotify::readColumns(const std::vector<std::string> &call) {
+    columnReader reader;
+
+    if (!reader.read(call[1])) {
+        throw std::runtime_error("Received an invalid response from " + call[0]);
+    }
+
+    auto error = reader.raw.find("error");
+    if (error != reader.raw.end()) {
+        /* The error is either an object with a message or the message itself */
+        nlohmann::json body = nlohmann::json::parse(error->second, nullptr, false);
+        std::string message = body.is_object() ? body.value("message", "") : (body.is_string() ? body.get<std::string>() : error->second);
+
+        throw std::runtime_error("Request to " + call[0] + " failed: " + message);
+    }
+
+    return reader;
+}
+
+std::vector<columnReader> CPPotify::getAudioAnalysisColumns(std::vector<std::string> trackIDs, int maxConcurrency) {
+    std::vector<std::string> targetURLs;
+    for (auto &trackID : trackIDs) {
+        targetURLs.push_back(this->getTracksURL(trackID, "audio-analysis"));
+    }
+
+    std::vector<std::vector<std::string>> calls = this->getMany(targetURLs, maxConcurrency);
+
+    std::vector<columnReader> analyses;
+    for (auto &call : calls) {
+        analyses.push_back(this->readColumns(call));
+    }
+
+    return analyses;
+}
+
+size_t CPPotify::countIDs(std::string IDs) {
+    /* IDs are joined with either "," or its URL encoding "%2C" */
+    size_t count = 1;
+    for (size_t i = 0; i < IDs.size(); i++) {
+        if (IDs[i] == ',' || IDs.compare(i, 3, "%2C") == 0) {
+            count++;
+        }
+    }
+
+    return count;
+}
+
+std::string CPPotify::getAlbumsURL(std::string albumID, std::string albumObj, int limit, int offset) { 
     if (albumObj != "" && albumObj != "tracks") {
         throw std::invalid_argument("Received invalid argument for album_obj argument, value " + albumObj + " must match 'tracks'");
     }
 
-    if (albumID.size() > 1150) {
+    if (this->countIDs(albumID) > 50) {
         throw std::length_error("Exceeded limit of 50 Spotify IDs");
     }
 
@@ -187,15 +620,19 @@ std::vector<std::string> CPPotify::getAlbums(std::string albumID, std::string al
         {"limit", to_string(limit)},
         {"offset", to_string(offset)}};
 
-    return this->curlGET("albums", payload);
+    return this->buildURL("albums", payload);
 }
 
-std::vector<std::string> CPPotify::getArtists(std::string artistID, std::string artistObj, std::string include_groups, int limit, int offset) {
+std::vector<std::string> CPPotify::getAlbums(std::string albumID, std::string albumObj, int limit, int offset) {
+    return this->performGET(this->getAlbumsURL(albumID, albumObj, limit, offset));
+}
+
+std::string CPPotify::getArtistsURL(std::string artistID, std::string artistObj, std::string include_groups, int limit, int offset) {
     if (artistObj != "" && (artistObj != "albums" && artistObj != "top-tracks" && artistObj != "related-artists")) {
         throw std::invalid_argument("Received invalid argument for artist_obj argument, value " + artistObj + " must match 'albums', 'top-tracks' or 'related-tracks'");
     }
 
-    if (artistID.size() > 1150) { 
+    if (this->countIDs(artistID) > 50) { 
         throw std::length_error("Exceeded limit of 50 Spotify IDs");
     }
 
@@ -207,11 +644,15 @@ std::vector<std::string> CPPotify::getArtists(std::string artistID, std::string
         {"limit", to_string(limit)},
         {"offset", to_string(offset)}};
 
-    return this->curlGET("artists", payload);
+    return this->buildURL("artists", payload);
 }
 
-std::vector<std::string> CPPotify::getEpisodes(std::string episodeID) {
-    if (episodeID.size() > 1150) {
+std::vector<std::string> CPPotify::getArtists(std::string artistID, std::string artistObj, std::string include_groups, int limit, int offset) {
+    return this->performGET(this->getArtistsURL(artistID, artistObj, include_groups, limit, offset));
+}
+
+std::string CPPotify::getEpisodesURL(std::string episodeID) {
+    if (this->countIDs(episodeID) > 50) {
         throw std::length_error("Exceeded limit of 50 Spotify IDs");
     }
 
@@ -219,10 +660,14 @@ std::vector<std::string> CPPotify::getEpisodes(std::string episodeID) {
         {"self", "0"},
         {"id", episodeID}};
 
-    return this->curlGET("episodes", payload);
+    return this->buildURL("episodes", payload);
 }
 
-std::vector<std::string> CPPotify::getPlayer(std::string playerObj, std::string deviceID) {
+std::vector<std::string> CPPotify::getEpisodes(std::string episodeID) {
+    return this->performGET(this->getEpisodesURL(episodeID));
+}
+
+std::string CPPotify::getPlayerURL(std::string playerObj, std::string deviceID) {
     if (playerObj != "" && (playerObj != "devices" && playerObj != "currently-playing" && playerObj != "recently-played")) {
         throw std::invalid_argument("Received invalid player_obj argument, value " + playerObj + " must be equal to 'devices', 'currently-playing' or 'recently-player");
     }
@@ -232,10 +677,14 @@ std::vector<std::string> CPPotify::getPlayer(std::string playerObj, std::string
         {"obj", playerObj},
         {"device_id", deviceID}};
 
-    return this->curlGET("player", payload);
+    return this->buildURL("player", payload);
 }
 
-std::vector<std::string> CPPotify::getPlaylists(bool getOwnPlaylists, std::string userID, std::string playlistID, std::string playlistObj, std::string fields, int limit, int offset) {
+std::vector<std::string> CPPotify::getPlayer(std::string playerObj, std::string deviceID) {
+    return this->performGET(this->getPlayerURL(playerObj, deviceID));
+}
+
+std::string CPPotify::getPlaylistsURL(bool getOwnPlaylists, std::string userID, std::string playlistID, std::string playlistObj, std::string fields, int limit, int offset) {
     if (playlistObj != "" && (playlistObj != "tracks" && playlistObj != "images")) {
         throw std::invalid_argument("Received invalid playlist_obj argument, value " + playlistObj + " must match 'tracks' or 'images'");
     }
@@ -252,10 +701,14 @@ std::vector<std::string> CPPotify::getPlaylists(bool getOwnPlaylists, std::strin
         {"limit", to_string(limit)},
         {"offset", to_string(offset)}};
 
-    return this->curlGET("playlists", payload);
+    return this->buildURL("playlists", payload);
 }
 
-std::vector<std::string> CPPotify::getProfiles(bool getOwnProfile, std::string userID) {
+std::vector<std::string> CPPotify::getPlaylists(bool getOwnPlaylists, std::string userID, std::string playlistID, std::string playlistObj, std::string fields, int limit, int offset) {
+    return this->performGET(this->getPlaylistsURL(getOwnPlaylists, userID, playlistID, playlistObj, fields, limit, offset));
+}
+
+std::string CPPotify::getProfilesURL(bool getOwnProfile, std::string userID) {
     if (getOwnProfile && userID != "") {
         throw std::invalid_argument("get_own_profile and user_id arguments cannot be used concurrently");
     }
@@ -264,15 +717,19 @@ std::vector<std::string> CPPotify::getProfiles(bool getOwnProfile, std::string u
         {"self", to_string(getOwnProfile)},
         {"id", userID}};
 
-    return this->curlGET("", payload);
+    return this->buildURL("", payload);
 }
 
-std::vector<std::string> CPPotify::getShows(std::string showID, std::string showObj) {
-    if (showObj != "episodes") {
+std::vector<std::string> CPPotify::getProfiles(bool getOwnProfile, std::string userID) {
+    return this->performGET(this->getProfilesURL(getOwnProfile, userID));
+}
+
+std::string CPPotify::getShowsURL(std::string showID, std::string showObj) {
+    if (showObj != "" && showObj != "episodes") {
         throw std::invalid_argument("Received invalid show_obj argument, value " + showObj + " must be equal to 'episodes'");
     }
     
-    if (showID.size() > 1150) {
+    if (this->countIDs(showID) > 50) {
         throw std::length_error("Exceeded limit of 50 Spotify IDs");
     }
 
@@ -281,15 +738,23 @@ std::vector<std::string> CPPotify::getShows(std::string showID, std::string show
         {"id", showID},
         {"obj", showObj}};
 
-    return this->curlGET("shows", payload);
+    return this->buildURL("shows", payload);
+}
+
+std::vector<std::string> CPPotify::getShows(std::string showID, std::string showObj) {
+    return this->performGET(this->getShowsURL(showID, showObj));
 }
 
-std::vector<std::string> CPPotify::getTracks(std::string trackID, std::string trackObj){
+std::string CPPotify::getTracksURL(std::string trackID, std::string trackObj) {
     if (trackObj != "" && trackObj != "audio-analysis" && trackObj != "audio-features") {
         throw std::invalid_argument("Received invalid track_obj argument, value " + trackObj + " must match 'audio-analysis' or 'audio-features'. If left blank will default to 'tracks'");
     }
 
-    if (trackID.size() > 1150) {
+    if (trackObj == "audio-features" && this->countIDs(trackID) > 100) {
+        throw std::length_error("Exceeded limit of 100 Spotify IDs");
+    }
+
+    if (trackObj != "audio-features" && this->countIDs(trackID) > 50) {
         throw std::length_error("Exceeded limit of 50 Spotify IDs");
     }
 
@@ -302,10 +767,14 @@ std::vector<std::string> CPPotify::getTracks(std::string trackID, std::string tr
         {"id", trackID},
         {"obj", ""}};
 
-    return this->curlGET((trackObj == "" || trackObj == "tracks") ? "tracks" : trackObj, payload);
+    return this->buildURL((trackObj == "" || trackObj == "tracks") ? "tracks" : trackObj, payload);
 }
 
-std::vector<std::string> CPPotify::browse(std::string browseCategory, std::string categoryID, std::string categoryObj, std::string timestamp, int limit, int offset) {
+std::vector<std::string> CPPotify::getTracks(std::string trackID, std::string trackObj) {
+    return this->performGET(this->getTracksURL(trackID, trackObj));
+}
+
+std::string CPPotify::browseURL(std::string browseCategory, std::string categoryID, std::string categoryObj, std::string timestamp, int limit, int offset) {
     if (browseCategory != "categories" && browseCategory != "featured-playlists" && browseCategory != "new-releases") {
         throw std::invalid_argument("Received invalid argument for browse_category argument, value " + browseCategory + " must be equal to 'categories', 'featured-playlists' or 'new-releases'");
     }
@@ -329,10 +798,14 @@ std::vector<std::string> CPPotify::browse(std::string browseCategory, std::strin
         {"limit", to_string(limit)},
         {"offset", to_string(offset)}};
 
-    return this->curlGET("browse", payload);
+    return this->buildURL("browse", payload);
 }
 
-std::vector<std::string> CPPotify::search(std::string query, std::string objType, std::map<std::string, std::string> filt, int limit, int offset) {
+std::vector<std::string> CPPotify::browse(std::string browseCategory, std::string categoryID, std::string categoryObj, std::string timestamp, int limit, int offset) {
+    return this->performGET(this->browseURL(browseCategory, categoryID, categoryObj, timestamp, limit, offset));
+}
+
+std::string CPPotify::searchURL(std::string query, std::string objType, std::map<std::string, std::string> filt, int limit, int offset) {
     std::string filtKeys[] {"album", "artist", "track", "year"};
     std::string filtStr;
 
@@ -372,7 +845,11 @@ std::vector<std::string> CPPotify::search(std::string query, std::string objType
         {"limit", to_string(limit)},
         {"offset", to_string(offset)}};
 
-    return this->curlGET("search", payload);
+    return this->buildURL("search", payload);
+}
+
+std::vector<std::string> CPPotify::search(std::string query, std::string objType, std::map<std::string, std::string> filt, int limit, int offset) {
+    return this->performGET(this->searchURL(query, objType, filt, limit, offset));
 }
 
 std::vector<std::string> CPPotify::postPlayer(std::string playerAction, std::string songURI, std::string deviceID) {
@@ -389,13 +866,206 @@ std::vector<std::string> CPPotify::postPlayer(std::string playerAction, std::str
 }
 
 std::string CPPotify::reAuth() {
-    this->TOKEN = ac.auth()[0];
-    return this->TOKEN;
+    return this->renewToken(false);
 }
 
 std::string CPPotify::reAuthoAuth() {
-    this->TOKEN = ac.reAuth();
-    return this->TOKEN;
+    return this->renewToken(true);
+}
+
+long CPPotify::getTokenExpiresIn() {
+    std::lock_guard<std::mutex> lock(this->tokenMutex);
+    return std::chrono::duration_cast<std::chrono::seconds>(this->tokenExpiry - std::chrono::steady_clock::now()).count();
+}
+
+double CPPotify::getTokenIssuedAt() {
+    std::lock_guard<std::mutex> lock(this->tokenMutex);
+    if (this->tokenGeneration == 0) {
+        return 0;
+    }
+
+    return std::chrono::duration<double>(this->tokenIssued.time_since_epoch()).count();
+}
+
+void CPPotify::setToken(std::string token, int expiresIn) {
+    {
+        std::lock_guard<std::mutex> lock(this->tokenMutex);
+        auto now = std::chrono::steady_clock::now();
+
+        this->TOKEN = token;
+        this->BEARER = "Authorization: Bearer " + regex_replace(token, regex("\""), "");
+        this->tokenGeneration++;
+        this->tokenIssued = std::chrono::system_clock::now();
+        this->tokenExpiry = now + std::chrono::seconds(expiresIn);
+        this->tokenRefreshAt = now + std::chrono::seconds(std::max({expiresIn - REFRESH_MARGIN, expiresIn / 2, 1}));
+        this->tokenError = "";
+        this->tokenRefused = false;
+        this->refreshFailures = 0;
+    }
+
+    this->refreshSignal.notify_all();
+}
+
+/*
+Requests a new token, through the refresh token if refresh is true and the authorization flow otherwise. If generation is
+given the token is only renewed if it is still the current one, otherwise another thread already renewed it
+*/
+std::string CPPotify::renewToken(bool refresh, long generation) {
+    std::lock_guard<std::mutex> renew(this->renewMutex);
+
+    std::string current;
+    {
+        std::lock_guard<std::mutex> lock(this->tokenMutex);
+        if (generation >= 0 && generation != this->tokenGeneration) {
+            return this->TOKEN;
+        }
+
+        current = this->TOKEN;
+    }
+
+    if (!this->ac) {
+        /* Built without requesting a token, the first one is requested below like any other */
+        if (this->oAuthToken != "") {
+            std::atomic_store(&this->ac, std::shared_ptr<authControl>(std::make_shared<oAuth>(this->CLIENT_ID, this->CLIENT_SECRET, this->oAuthToken, this->REDIRECT_URI, this->STATE, this->SCOPE, this->SHOW_DIALOG, false)));
+        }
+        else {
+            std::atomic_store(&this->ac, std::shared_ptr<authControl>(std::make_shared<clientCredentials>(this->CLIENT_ID, this->CLIENT_SECRET, false)));
+        }
+
+        this->ac->setAbort(&this->refreshStop);
+    }
+
+    std::shared_ptr<oAuth> user = std::dynamic_pointer_cast<oAuth>(this->ac);
+
+    auto request = [this, user, refresh](const tokenStore::entry &stored) {
+        /* A refresh token kept in the token store can renew the token of a client that has not exchanged its code */
+        if (user && user->getRefreshToken() == "") {
+            user->setRefreshToken(stored.refreshToken);
+        }
+
+        tokenStore::entry fresh;
+        if (user && refresh && user->getRefreshToken() != "") {
+            fresh.token = user->reAuth();
+        }
+        else if (user) {
+            std::vector<std::string> tokens = user->auth();
+            user->setRefreshToken(tokens[1]);
+            fresh.token = tokens[0];
+        }
+        else {
+            fresh.token = this->ac->auth()[0];
+        }
+
+        fresh.refreshToken = user ? user->getRefreshToken() : "";
+        fresh.expires = std::time(nullptr) + this->ac->getExpiresIn();
+        return fresh;
+    };
+
+    /* oAuth tokens are stored per authorization code, a client credentials token is shared by every client of the app */
+    tokenStore::entry entry = this->store
+        ? this->store->fetch(this->oAuthToken != "" ? this->CLIENT_ID + ":" + this->oAuthToken : this->CLIENT_ID, current, REFRESH_MARGIN, request)
+        : request(tokenStore::entry());
+
+    if (user && user->getRefreshToken() == "") {
+        user->setRefreshToken(entry.refreshToken);
+    }
+
+    this->setToken(entry.token, static_cast<int>(entry.expires - std::time(nullptr)));
+    return entry.token;
+}
+
+/* True if awaitToken would return at once */
+bool CPPotify::hasToken() {
+    std::lock_guard<std::mutex> lock(this->tokenMutex);
+    return !this->tokenRefused && this->tokenGeneration > 0 && (this->tokenError == "" || std::chrono::steady_clock::now() < this->tokenExpiry);
+}
+
+/*
+Requests the first token for the first request that needs one, the requests arriving meanwhile wait for it. Raises
+the error of the last refresh once the token endpoint refused it, or renews an expired token here while the refresh
+thread is waiting to try again
+*/
+void CPPotify::awaitToken() {
+    long generation;
+    {
+        std::lock_guard<std::mutex> lock(this->tokenMutex);
+        if (this->tokenRefused) {
+            throw std::runtime_error("Spotify token request failed: " + this->tokenError);
+        }
+
+        if (this->tokenGeneration > 0 && (this->tokenError == "" || std::chrono::steady_clock::now() < this->tokenExpiry)) {
+            return;
+        }
+
+        generation = this->tokenGeneration;
+    }
+
+    try {
+        this->renewToken(this->oAuthToken != "", generation);
+    }
+    catch (const std::invalid_argument &e) {
+        this->refuseToken(e.what());
+        throw std::runtime_error(std::string("Spotify token request failed: ") + e.what());
+    }
+    catch (const std::exception &e) {
+        throw std::runtime_error(std::string("Spotify token request failed: ") + e.what());
+    }
+}
+
+/* Stops the background refresh after the token endpoint refused a request, sending it again can not succeed */
+void CPPotify::refuseToken(std::string error) {
+    std::lock_guard<std::mutex> lock(this->tokenMutex);
+    this->tokenError = error;
+    this->tokenRefused = true;
+    this->tokenRefreshAt = std::chrono::steady_clock::time_point::max();
+}
+
+void CPPotify::stopRefresh() {
+    {
+        std::lock_guard<std::mutex> lock(this->tokenMutex);
+        this->refreshStop = true;
+    }
+
+    this->refreshSignal.notify_all();
+    if (this->refreshThread.joinable()) {
+        this->refreshThread.join();
+    }
+}
+
+void CPPotify::refreshLoop() {
+    std::unique_lock<std::mutex> lock(this->tokenMutex);
+
+    while (!this->refreshStop) {
+        auto due = this->tokenRefreshAt;
+        if (due == std::chrono::steady_clock::time_point::max()) {
+            /* Nothing to refresh until a token is set */
+            this->refreshSignal.wait(lock);
+            continue;
+        }
+
+        if (this->refreshSignal.wait_until(lock, due) != std::cv_status::timeout || this->refreshStop || this->tokenRefreshAt != due) {
+            continue;
+        }
+
+        long generation = this->tokenGeneration;
+        lock.unlock();
+
+        try {
+            /* oAuth tokens are renewed with the refresh token, client credentials tokens are requested again */
+            this->renewToken(this->oAuthToken != "", generation);
+            lock.lock();
+        }
+        catch (const std::invalid_argument &e) {
+            this->refuseToken(e.what());
+            lock.lock();
+        }
+        catch (const std::exception &e) {
+            lock.lock();
+            this->tokenError = e.what();
+            this->tokenRefreshAt = std::chrono::steady_clock::now() + std::chrono::seconds(std::min(REFRESH_RETRY_MAX, REFRESH_RETRY << std::min(this->refreshFailures, 5)));
+            this->refreshFailures++;
+        }
+    }
 }
 
 
@@ -428,27 +1098,752 @@ bool CPPotify::getShowDialog() {
 }
 
 std::string CPPotify::getToken() {
+    std::lock_guard<std::mutex> lock(this->tokenMutex);
     return this->TOKEN;
 }
 
+/* Authorization header for the current token, generation is set to the token it holds */
+std::string CPPotify::bearerHeader(long &generation) {
+    std::lock_guard<std::mutex> lock(this->tokenMutex);
+    generation = this->tokenGeneration;
+    return this->BEARER;
+}
+
+/* On a miss entry still holds the validators of an expired entry, if there is one, for the request that replaces it */
+bool CPPotify::cacheLookup(std::string targetURL, cachedResponse &entry, bool stale) {
+    std::shared_ptr<responseCache> cache = std::atomic_load(&this->cache);
+    if (cache && cache->get(targetURL, entry, stale)) {
+        return true;
+    }
+
+    std::shared_ptr<diskCache> disk = std::atomic_load(&this->disk);
+    if (disk && disk->get(targetURL, entry, stale)) {
+        if (cache && !stale) {
+            cache->put(targetURL, entry);
+        }
+
+        return true;
+    }
+
+    return false;
+}
+
+void CPPotify::cacheStore(std::string targetURL, CURL *curl, std::string &res, std::map<std::string, std::string> &headers) {
+    std::shared_ptr<responseCache> cache = std::atomic_load(&this->cache);
+    std::shared_ptr<diskCache> disk = std::atomic_load(&this->disk);
+    if (!cache && !disk) {
+        return;
+    }
+
+    /* Only successful responses are cached, errors and rate limit responses always go back to the network */
+    long status = 0;
+    curl_easy_getinfo(curl, CURLINFO_RESPONSE_CODE, &status);
+
+    cachedResponse entry;
+
+    if (status == 304) {
+        /* Not Modified, answer with the stored body and start a new TTL for it */
+        if (!this->cacheLookup(targetURL, entry, true)) {
+            return;
+        }
+
+        res = entry.res;
+    }
+    else if (status == 200) {
+        entry = cachedResponse{res, headers["etag"], headers["last-modified"]};
+    }
+    else {
+        return;
+    }
+
+    if (cache) {
+        cache->put(targetURL, entry);
+    }
+
+    if (disk) {
+        disk->put(targetURL, entry);
+    }
+}
+
+void CPPotify::enableCache(size_t maxBytes, std::map<std::string, int> ttls, int defaultTTL) {
+    std::atomic_store(&this->cache, std::make_shared<responseCache>(maxBytes, ttls, defaultTTL));
+}
+
+void CPPotify::disableCache() {
+    std::atomic_store(&this->cache, std::shared_ptr<responseCache>());
+}
+
+void CPPotify::clearCache() {
+    std::shared_ptr<responseCache> cache = std::atomic_load(&this->cache);
+    if (cache) {
+        cache->clear();
+    }
+}
+
+void CPPotify::enableDiskCache(std::string path, std::map<std::string, int> ttls, int defaultTTL) {
+    std::atomic_store(&this->disk, std::make_shared<diskCache>(path, ttls, defaultTTL));
+}
+
+void CPPotify::disableDiskCache() {
+    std::atomic_store(&this->disk, std::shared_ptr<diskCache>());
+}
+
+int CPPotify::compactDiskCache() {
+    std::shared_ptr<diskCache> disk = std::atomic_load(&this->disk);
+    return disk ? disk->compact() : 0;
+}
+
+int CPPotify::asyncSocketFunction(CURL *curl, curl_socket_t s, int what, void *userp, void *socketp) {
+    CPPotify *self = static_cast<CPPotify*>(userp);
+
+    try {
+        self->asyncSocketCallback(static_cast<int>(s), what);
+    }
+    catch (...) {
+        return -1;
+    }
+
+    return 0;
+}
+
+int CPPotify::asyncTimerFunction(CURLM *multi, long timeout_ms, void *userp) {
+    CPPotify *self = static_cast<CPPotify*>(userp);
+
+    self->asyncCurlDeadline = (timeout_ms < 0)
+        ? std::chrono::steady_clock::time_point::max()
+        : std::chrono::steady_clock::now() + std::chrono::milliseconds(timeout_ms);
+
+    try {
+        self->asyncUpdateTimer();
+    }
+    catch (...) {
+        return -1;
+    }
+
+    return 0;
+}
+
+void CPPotify::asyncInit(std::function<void(int, int)> socketCallback, std::function<void(long)> timerCallback, std::function<void(long)> renewCallback) {
+    this->asyncSocketCallback = socketCallback;
+    this->asyncTimerCallback = timerCallback;
+    this->asyncRenewCallback = renewCallback;
+
+    if (!this->asyncHandle) {
+        this->asyncHandle = curl_multi_init();
+        curl_multi_setopt(this->asyncHandle, CURLMOPT_SOCKETFUNCTION, this->asyncSocketFunction);
+        curl_multi_setopt(this->asyncHandle, CURLMOPT_SOCKETDATA, this);
+        curl_multi_setopt(this->asyncHandle, CURLMOPT_TIMERFUNCTION, this->asyncTimerFunction);
+        curl_multi_setopt(this->asyncHandle, CURLMOPT_TIMERDATA, this);
+    }
+}
+
+void CPPotify::asyncSubmit(std::string targetURL, std::function<void(std::vector<std::string>)> callback) {
+    if (!this->asyncHandle) {
+        throw std::logic_error("asyncInit must be called before submitting event loop requests");
+    }
+
+    cachedResponse cached;
+    if (this->cacheLookup(targetURL, cached)) {
+        callback(makeResponse(targetURL, std::move(cached.res)));
+        return;
+    }
+
+    /* The event loop wrapper waits for the first token off the loop thread, this only blocks when called without it */
+    this->awaitToken();
+
+    std::unique_ptr<asyncTransfer> transfer(new asyncTransfer{targetURL, "", {}, nullptr, callback, 0, {nullptr, nullptr}});
+    transfer->target = responseTarget {&transfer->res, &transfer->headers};
+    transfer->target.etag = cached.etag;
+    transfer->target.lastModified = cached.lastModified;
+
+    this->asyncQueue.push_back(std::move(transfer));
+    this->asyncStartQueued();
+}
+
+void CPPotify::asyncStartQueued() {
+    /* Queued transfers wait here while the rate limiter is empty, the event loop timer is set to wake up when it refills */
+    this->asyncQueueDeadline = std::chrono::steady_clock::time_point::max();
+
+    /* Transfers whose retry backoff has passed go to the front of the queue */
+    auto now = std::chrono::steady_clock::now();
+    while (!this->asyncDelayed.empty() && this->asyncDelayed.begin()->first <= now) {
+        this->asyncQueue.push_front(std::move(this->asyncDelayed.begin()->second));
+        this->asyncDelayed.erase(this->asyncDelayed.begin());
+    }
+
+    if (!this->asyncDelayed.empty()) {
+        this->asyncQueueDeadline = this->asyncDelayed.begin()->first;
+    }
+
+    while (!this->asyncQueue.empty()) {
+        double wait = this->rateWait();
+        if (wait > 0) {
+            this->asyncQueueDeadline = std::min(this->asyncQueueDeadline, std::chrono::steady_clock::now() + std::chrono::duration_cast<std::chrono::steady_clock::duration>(std::chrono::duration<double>(wait)));
+            break;
+        }
+
+        std::unique_ptr<asyncTransfer> transfer = std::move(this->asyncQueue.front());
+        this->asyncQueue.pop_front();
+
+        CURL *curl = this->acquireHandle();
+        transfer->chunk = this->setupGET(curl, transfer->targetURL, &transfer->target);
+
+        this->asyncTransfers[curl] = std::move(transfer);
+        curl_multi_add_handle(this->asyncHandle, curl);
+    }
+
+    this->asyncUpdateTimer();
+}
+
+void CPPotify::asyncUpdateTimer() {
+    /* The event loop has a single timer, set it to whichever of the libcurl timeout and the queue wake up comes first */
+    auto deadline = std::min(this->asyncCurlDeadline, this->asyncQueueDeadline);
+
+    if (deadline == std::chrono::steady_clock::time_point::max()) {
+        this->asyncTimerCallback(-1);
+    }
+    else {
+        auto remaining = std::chrono::duration_cast<std::chrono::milliseconds>(deadline - std::chrono::steady_clock::now()).count();
+        this->asyncTimerCallback(std::max<long>(0, remaining));
+    }
+}
+
+void CPPotify::asyncSocketAction(int fd, int events) {
+    int running = 0;
+    curl_multi_socket_action(this->asyncHandle, static_cast<curl_socket_t>(fd), events, &running);
+    this->asyncCheckDone();
+}
+
+void CPPotify::asyncCheckDone() {
+    std::vector<std::unique_ptr<asyncTransfer>> done;
+    long renew = -1;
+
+    CURLMsg *msg;
+    int queued = 0;
+    while ((msg = curl_multi_info_read(this->asyncHandle, &queued))) {
+        if (msg->msg != CURLMSG_DONE) {
+            continue;
+        }
+
+        CURL *curl = msg->easy_handle;
+        CURLcode code = msg->data.result;
+        curl_multi_remove_handle(this->asyncHandle, curl);
+
+        auto it = this->asyncTransfers.find(curl);
+        std::unique_ptr<asyncTransfer> transfer = std::move(it->second);
+        this->asyncTransfers.erase(it);
+        curl_slist_free_all(transfer->chunk);
+
+        /*
+        A 401 is not renewed here, the token request would block the event loop. Transfers sent with a token that was
+        already replaced are sent again straight away, the others wait for one renewal shared between them
+        */
+        if (code == CURLE_OK && this->refused(curl, transfer->target)) {
+            this->statRequests++;
+
+            long generation;
+            {
+                std::lock_guard<std::mutex> lock(this->tokenMutex);
+                generation = this->tokenGeneration;
+            }
+
+            if (transfer->target.generation != generation) {
+                this->asyncReplay(std::move(transfer));
+            }
+            else {
+                this->asyncUnauthorized.push_back(std::move(transfer));
+
+                if (!this->asyncRenewing) {
+                    this->asyncRenewing = true;
+                    renew = generation;
+                }
+            }
+
+            this->releaseHandle(curl);
+            continue;
+        }
+
+        /* Failed transfers wait out their backoff in asyncDelayed, rate limited ones are due straight away */
+        double delay = this->retryDelay(curl, code, transfer->target, transfer->attempts++);
+        if (delay >= 0) {
+            transfer->res.clear();
+            transfer->headers.clear();
+            this->asyncDelayed.emplace(std::chrono::steady_clock::now() + std::chrono::duration_cast<std::chrono::steady_clock::duration>(std::chrono::duration<double>(delay)), std::move(transfer));
+        }
+        else {
+            this->retryFailed(curl, code, transfer->res);
+            this->cacheStore(transfer->targetURL, curl, transfer->res, transfer->headers);
+            done.push_back(std::move(transfer));
+        }
+
+        this->releaseHandle(curl);
+    }
+
+    this->asyncStartQueued();
+
+    if (renew >= 0) {
+        this->asyncRenewCallback(renew);
+    }
+
+    /* Callbacks run after bookkeeping so an exception raised by one can not leave a transfer half removed */
+    for (auto &transfer : done) {
+        transfer->callback(makeResponse(transfer->targetURL, std::move(transfer->res)));
+    }
+}
+
+/* Queues a transfer refused with a 401 to be sent once more with the current token */
+void CPPotify::asyncReplay(std::unique_ptr<asyncTransfer> transfer) {
+    this->statReauthorized++;
+    transfer->target.replayed = true;
+    transfer->res.clear();
+    transfer->headers.clear();
+    this->asyncQueue.push_back(std::move(transfer));
+}
+
+/* Called off the event loop thread, renews the token unless it was already replaced since generation was refused */
+void CPPotify::asyncRenewToken(long generation) {
+    this->renewToken(this->oAuthToken != "", generation);
+}
+
+/* Called on the event loop thread once asyncRenewToken returned, refused transfers are sent again or completed with their 401 */
+void CPPotify::asyncTokenRenewed(bool renewed) {
+    std::vector<std::unique_ptr<asyncTransfer>> refused;
+    refused.swap(this->asyncUnauthorized);
+    this->asyncRenewing = false;
+
+    std::vector<std::unique_ptr<asyncTransfer>> done;
+    for (auto &transfer : refused) {
+        if (renewed) {
+            this->asyncReplay(std::move(transfer));
+        }
+        else {
+            done.push_back(std::move(transfer));
+        }
+    }
+
+    this->asyncStartQueued();
+
+    for (auto &transfer : done) {
+        transfer->callback(makeResponse(transfer->targetURL, std::move(transfer->res)));
+    }
+}
+
+double CPPotify::rateWait() {
+    std::shared_ptr<rateLimiter> limiter = std::atomic_load(&this->limiter);
+    return limiter ? limiter->tryAcquire() : 0;
+}
+
+void CPPotify::rateAcquire() {
+    std::shared_ptr<rateLimiter> limiter = std::atomic_load(&this->limiter);
+    if (limiter) {
+        limiter->acquire();
+    }
+}
+
+/* Seconds to wait before sending a 429 response again, or -1 if it is not one. The limiter waits instead when it is set */
+double CPPotify::rateLimited(CURL *curl, std::map<std::string, std::string> &headers, int attempt) {
+    long status = 0;
+    curl_easy_getinfo(curl, CURLINFO_RESPONSE_CODE, &status);
+
+    if (status != 429 || attempt >= this->rateLimitRetries) {
+        return -1;
+    }
+
+    /* Retry-After is given in seconds, wait one second if it is missing or can not be read */
+    double retryAfter = 1;
+    try {
+        retryAfter = std::max(0.0, std::stod(headers["retry-after"]));
+    }
+    catch (const std::exception &) {}
+
+    std::shared_ptr<rateLimiter> limiter = std::atomic_load(&this->limiter);
+    if (!limiter) {
+        return retryAfter;
+    }
+
+    limiter->pause(retryAfter);
+    return 0;
+}
+
+void CPPotify::setRateLimit(double rate, int burst, int maxRetries) {
+    if (rate <= 0) {
+        throw std::invalid_argument("Received invalid rate argument, value must be greater than 0 requests per second");
+    }
+
+    this->rateLimitRetries = maxRetries;
+    std::atomic_store(&this->limiter, std::make_shared<rateLimiter>(rate, burst));
+}
+
+void CPPotify::disableRateLimit() {
+    std::atomic_store(&this->limiter, std::shared_ptr<rateLimiter>());
+}
+
+double CPPotify::retryDelay(CURL *curl, CURLcode code, responseTarget &target, int attempt) {
+    /* Returns the seconds to wait before sending a finished request again, or -1 if its result should be returned */
+    this->statRequests++;
+
+    if (code == CURLE_OK && this->unauthorized(curl, target)) {
+        this->statReauthorized++;
+        return 0;
+    }
+
+    if (code == CURLE_OK) {
+        double retryAfter = this->rateLimited(curl, *target.headers, attempt);
+        if (retryAfter >= 0) {
+            this->statRateLimited++;
+            return retryAfter;
+        }
+    }
+
+    std::shared_ptr<retryPolicy> policy = std::atomic_load(&this->retries);
+
+    long status = 0;
+    curl_easy_getinfo(curl, CURLINFO_RESPONSE_CODE, &status);
+
+    bool transient = false;
+    switch (code) {
+        case CURLE_OK:
+            transient = policy->STATUSES.count(status) > 0;
+            break;
+        case CURLE_COULDNT_RESOLVE_HOST:
+        case CURLE_COULDNT_CONNECT:
+        case CURLE_OPERATION_TIMEDOUT:
+        case CURLE_SEND_ERROR:
+        case CURLE_RECV_ERROR:
+        case CURLE_GOT_NOTHING:
+        case CURLE_PARTIAL_FILE:
+        case CURLE_SSL_CONNECT_ERROR:
+        case CURLE_HTTP2:
+        case CURLE_HTTP2_STREAM:
+            transient = true;
+            break;
+        default:
+            break;
+    }
+
+    if (!transient || attempt + 1 >= policy->MAX_ATTEMPTS) {
+        return -1;
+    }
+
+    this->statRetries++;
+
+    double delay = std::min(policy->MAX_DELAY, policy->BASE_DELAY * (1 << std::min(attempt, 16)));
+
+    /* Full jitter, spreads out clients that failed at the same moment */
+    if (policy->JITTER) {
+        thread_local std::mt19937 generator(std::random_device{}());
+        delay = std::uniform_real_distribution<double>(0, delay)(generator);
+    }
+
+    return delay;
+}
+
+/* True for a 401 response to a request that was not yet sent again with a new token */
+bool CPPotify::refused(CURL *curl, responseTarget &target) {
+    long status = 0;
+    curl_easy_getinfo(curl, CURLINFO_RESPONSE_CODE, &status);
+
+    return status == 401 && !target.replayed;
+}
+
+bool CPPotify::unauthorized(CURL *curl, responseTarget &target) {
+    /*
+    A 401 means the token expired or was revoked before the background refresh replaced it. The token is renewed and
+    the request sent again once, the threads that were refused with the same token share a single renewal
+    */
+    if (!this->refused(curl, target)) {
+        return false;
+    }
+
+    try {
+        this->renewToken(this->oAuthToken != "", target.generation);
+    }
+    catch (const std::exception &e) {
+        return false;
+    }
+
+    target.replayed = true;
+    return true;
+}
+
+void CPPotify::retryFailed(CURL *curl, CURLcode code, std::string &res) {
+    /* Counts a request that failed on every attempt, a body that is not JSON is replaced with a Spotify style error object */
+    long status = 0;
+    curl_easy_getinfo(curl, CURLINFO_RESPONSE_CODE, &status);
+
+    if (code == CURLE_OK && status < 500) {
+        return;
+    }
+
+    this->statFailures++;
+
+    if (code == CURLE_OK && nlohmann::json::accept(res)) {
+        return;
+    }
+
+    nlohmann::json error;
+    error["error"]["status"] = (code == CURLE_OK) ? status : 0;
+    error["error"]["message"] = (code == CURLE_OK) ? "Request failed with status " + std::to_string(status) : std::string(curl_easy_strerror(code));
+
+    res = error.dump();
+}
+
+void CPPotify::setRetryPolicy(int maxAttempts, double baseDelay, double maxDelay, bool jitter, std::vector<long> statuses, long timeout) {
+    if (maxAttempts < 1) {
+        throw std::invalid_argument("Received invalid maxAttempts argument, value must be at least 1");
+    }
+
+    std::atomic_store(&this->retries, std::make_shared<retryPolicy>(retryPolicy {maxAttempts, baseDelay, maxDelay, jitter, std::set<long>(statuses.begin(), statuses.end()), timeout}));
+}
+
+std::map<std::string, long> CPPotify::getStats() {
+    std::shared_ptr<authControl> ac = std::atomic_load(&this->ac);
+
+    return std::map<std::string, long> {
+        {"requests", this->statRequests},
+        {"retries", this->statRetries},
+        {"rateLimited", this->statRateLimited},
+        {"failures", this->statFailures},
+        {"reauthorized", this->statReauthorized},
+        {"tokenRequests", ac ? ac->getTokenRequests() : 0}
+    };
+}
+
+void CPPotify::setResponseMode(std::string mode) {
+    if (mode != "json" && mode != "cpp" && mode != "lazy" && mode != "bytes" && mode != "buffer") {
+        throw std::invalid_argument("Received invalid response mode " + mode + ", must be equal to 'json', 'cpp', 'lazy', 'bytes' or 'buffer'");
+    }
+
+    std::atomic_store(&this->RESPONSE_MODE, std::make_shared<const std::string>(mode));
+}
+
+std::string CPPotify::getResponseMode() {
+    return *std::atomic_load(&this->RESPONSE_MODE);
+}
+
+/* Owns a response body moved out of C++ so Python can read it through the buffer protocol without copying it */
+struct responseBuffer {
+    std::string body;
+};
+
+/*
+Converts a {targetURL, res} pair for Python. res is parsed into Python objects in "cpp" response mode, wrapped in a
+LazyJSON view in "lazy" mode, copied once into bytes in "bytes" mode and moved behind a read only memoryview in
+"buffer" mode
+*/
+static py::list pyResponse(CPPotify &self, std::vector<std::string> &call) {
+    std::string mode = self.getResponseMode();
+
+    py::list response;
+    response.append(py::str(call[0]));
+
+    if (mode == "cpp") {
+        response.append(parseJSON(call[1]));
+    }
+    else if (mode == "lazy") {
+        response.append(lazyJSON::fromString(call[1]));
+    }
+    else if (mode == "bytes") {
+        response.append(py::bytes(call[1].data(), call[1].size()));
+    }
+    else if (mode == "buffer") {
+        response.append(py::memoryview(py::cast(responseBuffer {std::move(call[1])})));
+    }
+    else {
+        response.append(py::str(call[1]));
+    }
+
+    return response;
+}
+
+/* Float32 array that takes over values instead of copying them */
+static py::array_t<float> pyArray(std::vector<float> &&values, std::vector<size_t> shape) {
+    auto *owned = new std::vector<float>(std::move(values));
+    py::capsule owner(owned, [](void *p) { delete static_cast<std::vector<float>*>(p); });
+
+    return py::array_t<float>(shape, owned->data(), owner);
+}
+
+/* Converts a columnReader for Python, tables become dicts of float32 arrays and raw members are parsed with parseJSON */
+static py::dict pyColumns(columnReader &reader) {
+    py::dict result;
+
+    for (auto &number : reader.numbers) {
+        result[py::str(number.first)] = number.second;
+    }
+
+    for (auto &raw : reader.raw) {
+        result[py::str(raw.first)] = parseJSON(raw.second);
+    }
+
+    for (auto &table : reader.tables) {
+        py::dict columns;
+        for (auto &column : table.second.columns) {
+            std::vector<size_t> shape {table.second.rows};
+            if (column.list) {
+                shape.push_back(column.width);
+            }
+
+            columns[py::str(column.name)] = pyArray(std::move(column.values), shape);
+        }
+
+        result[py::str(table.first)] = columns;
+    }
+
+    return result;
+}
+
+/* Binds a request method, the request runs without the GIL and its response is converted with pyResponse */
+template <typename... Args>
+static auto pyRequest(std::vector<std::string> (CPPotify::*method)(Args...)) {
+    return [method](CPPotify &self, Args... args) {
+        std::vector<std::string> call;
+        {
+            py::gil_scoped_release release;
+            call = (self.*method)(args...);
+        }
+
+        return pyResponse(self, call);
+    };
+}
+
+/*
+Holder deleter for CPPotify objects. The refresh thread is joined without the GIL so other Python threads keep running
+while a token request in flight is aborted, the object itself is deleted with the GIL held as it owns Python callbacks
+*/
+struct releaseDeleter {
+    void operator()(CPPotify *self) const {
+        {
+            py::gil_scoped_release release;
+            self->stopRefresh();
+        }
+
+        delete self;
+    }
+};
+
 PYBIND11_MODULE(pybind11module, cpp) {
     cpp.doc() = "CPPotify Module - Python Spotify API using C++";
-    py::class_<CPPotify>(cpp, "CPPotify")
-            .def(py::init<std::string, std::string>())
-            .def(py::init<std::string, std::string, std::string, std::string, std::string, std::string, bool>())
-            .def("curlGET", &CPPotify::curlGET)
-            .def("getAlbums", &CPPotify::getAlbums)
-            .def("getArtists", &CPPotify::getArtists)
-            .def("getEpisodes", &CPPotify::getEpisodes)
-            .def("getPlayer", &CPPotify::getPlayer)
-            .def("getPlaylists", &CPPotify::getPlaylists)
-            .def("getProfiles", &CPPotify::getProfiles)
-            .def("getShows", &CPPotify::getShows)
-            .def("getTracks", &CPPotify::getTracks)
-            .def("browse", &CPPotify::browse)
-            .def("search", &CPPotify::search)
-            .def("postPlayer", &CPPotify::postPlayer)
+    cpp.attr("API_URL") = SPOTIFY_API_URL;
+    cpp.attr("TOKEN_URL") = SPOTIFY_TOKEN_URL;
+    cpp.def("parseJSON", py::overload_cast<const std::string &>(&parseJSON));
+    cpp.def("lazyJSON", &lazyJSON::fromString);
+    py::class_<responseBuffer>(cpp, "ResponseBuffer", py::buffer_protocol())
+            .def_buffer([](responseBuffer &buffer) {
+                return py::buffer_info(buffer.body.data(), 1, "B", 1, {buffer.body.size()}, {1}, true);
+            });
+    py::class_<lazyJSON>(cpp, "LazyJSON")
+            .def("__getitem__", &lazyJSON::getItem)
+            .def("__len__", &lazyJSON::size)
+            .def("__contains__", &lazyJSON::contains)
+            .def("__iter__", &lazyJSON::iter)
+            .def("__repr__", &lazyJSON::repr)
+            .def("get", &lazyJSON::get, py::arg("key"), py::arg("default") = py::none())
+            .def("keys", &lazyJSON::getKeys)
+            .def("values", &lazyJSON::getValues)
+            .def("items", &lazyJSON::getItems)
+            .def("is_object", &lazyJSON::isObject)
+            .def("to_python", &lazyJSON::toPython)
+            .def("raw", &lazyJSON::raw);
+    cpp.def("compactDiskCache", [](std::string path) { return diskCache(path).compact(); }, py::call_guard<py::gil_scoped_release>());
+    py::class_<tokenStore, std::shared_ptr<tokenStore>>(cpp, "TokenStore")
+            .def(py::init<std::string>())
+            .def("getPath", &tokenStore::getPath);
+
+    py::class_<CPPotify, std::unique_ptr<CPPotify, releaseDeleter>>(cpp, "CPPotify")
+            .def(py::init<std::string, std::string, std::shared_ptr<tokenStore>>(), py::arg("ID"), py::arg("SECRET"), py::arg("store") = nullptr, py::call_guard<py::gil_scoped_release>())
+            .def(py::init<std::string, std::string, std::string, std::string, std::string, std::string, bool, std::shared_ptr<tokenStore>>(), py::arg("ID"), py::arg("SECRET"), py::arg("oAuthToken"), py::arg("REDIRECT_URI"), py::arg("STATE"), py::arg("SCOPE"), py::arg("SHOW_DIALOG"), py::arg("store") = nullptr, py::call_guard<py::gil_scoped_release>())
+            .def("curlGET", pyRequest(&CPPotify::curlGET))
+            .def("getAlbums", pyRequest(&CPPotify::getAlbums))
+            .def("getArtists", pyRequest(&CPPotify::getArtists))
+            .def("getEpisodes", pyRequest(&CPPotify::getEpisodes))
+            .def("getPlayer", pyRequest(&CPPotify::getPlayer), py::arg("playerObj") = "", py::arg("deviceID") = "")
+            .def("getPlaylists", pyRequest(&CPPotify::getPlaylists))
+            .def("getProfiles", pyRequest(&CPPotify::getProfiles))
+            .def("getShows", pyRequest(&CPPotify::getShows))
+            .def("getTracks", pyRequest(&CPPotify::getTracks))
+            .def("browse", pyRequest(&CPPotify::browse))
+            .def("search", pyRequest(&CPPotify::search))
+            .def("performGET", pyRequest(&CPPotify::performGET))
+            .def("getMany", [](CPPotify &self, std::vector<std::string> targetURLs, int maxConcurrency) {
+                std::vector<std::vector<std::string>> calls;
+                {
+                    py::gil_scoped_release release;
+                    calls = self.getMany(targetURLs, maxConcurrency);
+                }
+
+                py::list responses;
+                for (auto &call : calls) {
+                    responses.append(pyResponse(self, call));
+                }
+
+                return responses;
+            }, py::arg("targetURLs"), py::arg("maxConcurrency") = 16)
+            .def("getAudioFeaturesMatrix", [](CPPotify &self, std::vector<std::string> trackIDs, int maxConcurrency) {
+                CPPotify::audioFeaturesMatrix matrix;
+                {
+                    py::gil_scoped_release release;
+                    matrix = self.getAudioFeaturesMatrix(trackIDs, maxConcurrency);
+                }
+
+                py::dict columns;
+                columns["id"] = py::cast(matrix.ids);
+
+                for (size_t c = 0; c < CPPotify::AUDIO_FEATURES.size(); c++) {
+                    columns[py::str(CPPotify::AUDIO_FEATURES[c])] = pyArray(std::move(matrix.columns[c]), {matrix.ids.size()});
+                }
+
+                return columns;
+            }, py::arg("trackIDs"), py::arg("maxConcurrency") = 16)
+            .def("getAudioAnalysisColumns", [](CPPotify &self, std::vector<std::string> trackIDs, int maxConcurrency) {
+                std::vector<columnReader> analyses;
+                {
+                    py::gil_scoped_release release;
+                    analyses = self.getAudioAnalysisColumns(trackIDs, maxConcurrency);
+                }
+
+                py::list results;
+                for (auto &analysis : analyses) {
+                    results.append(pyColumns(analysis));
+                }
+
+                return results;
+            }, py::arg("trackIDs"), py::arg("maxConcurrency") = 16)
+            .def("asyncInit", &CPPotify::asyncInit)
+            .def("asyncSubmit", [](CPPotify &self, std::string targetURL, py::function callback) {
+                self.asyncSubmit(targetURL, [&self, callback](std::vector<std::string> call) { callback(pyResponse(self, call)); });
+            })
+            .def("asyncSocketAction", &CPPotify::asyncSocketAction)
+            .def("asyncRenewToken", &CPPotify::asyncRenewToken, py::call_guard<py::gil_scoped_release>())
+            .def("asyncTokenRenewed", &CPPotify::asyncTokenRenewed)
+            .def("getAlbumsURL", &CPPotify::getAlbumsURL)
+            .def("getArtistsURL", &CPPotify::getArtistsURL)
+            .def("getEpisodesURL", &CPPotify::getEpisodesURL)
+            .def("getPlayerURL", &CPPotify::getPlayerURL, py::arg("playerObj") = "", py::arg("deviceID") = "")
+            .def("getPlaylistsURL", &CPPotify::getPlaylistsURL)
+            .def("getProfilesURL", &CPPotify::getProfilesURL)
+            .def("getShowsURL", &CPPotify::getShowsURL)
+            .def("getTracksURL", &CPPotify::getTracksURL)
+            .def("browseURL", &CPPotify::browseURL)
+            .def("searchURL", &CPPotify::searchURL)
+            .def("postPlayer", pyRequest(&CPPotify::postPlayer))
+            .def("enableCache", &CPPotify::enableCache, py::arg("maxBytes"), py::arg("ttls") = std::map<std::string, int>(), py::arg("defaultTTL") = 3600)
+            .def("disableCache", &CPPotify::disableCache)
+            .def("clearCache", &CPPotify::clearCache)
+            .def("enableDiskCache", &CPPotify::enableDiskCache, py::arg("path"), py::arg("ttls") = std::map<std::string, int>(), py::arg("defaultTTL") = 3600)
+            .def("disableDiskCache", &CPPotify::disableDiskCache)
+            .def("compactDiskCache", &CPPotify::compactDiskCache, py::call_guard<py::gil_scoped_release>())
+            .def("setRateLimit", &CPPotify::setRateLimit, py::arg("rate"), py::arg("burst") = 1, py::arg("maxRetries") = 5)
+            .def("disableRateLimit", &CPPotify::disableRateLimit)
+            .def("setRetryPolicy", &CPPotify::setRetryPolicy, py::arg("maxAttempts") = 3, py::arg("baseDelay") = 0.5, py::arg("maxDelay") = 8, py::arg("jitter") = true, py::arg("statuses") = std::vector<long> {500, 502, 503, 504}, py::arg("timeout") = 30)
+            .def("getStats", &CPPotify::getStats)
+            .def("setResponseMode", &CPPotify::setResponseMode)
+            .def("getResponseMode", &CPPotify::getResponseMode)
             .def("getToken", &CPPotify::getToken)
-            .def("reAuth", &CPPotify::reAuth)
-            .def("reAuthoAuth", &CPPotify::reAuthoAuth);
+            .def("reAuth", &CPPotify::reAuth, py::call_guard<py::gil_scoped_release>())
+            .def("reAuthoAuth", &CPPotify::reAuthoAuth, py::call_guard<py::gil_scoped_release>())
+            .def("getTokenExpiresIn", &CPPotify::getTokenExpiresIn)
+            .def("getTokenIssuedAt", &CPPotify::getTokenIssuedAt)
+            .def("hasToken", &CPPotify::hasToken)
+            .def("awaitToken", &CPPotify::awaitToken, py::call_guard<py::gil_scoped_release>());
 };
\ No newline at end of file
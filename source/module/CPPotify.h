@@ -2,38 +2,258 @@
 #define CPPOTIFY_H
 
 #include "authControl.h"
+#include "responseCache.h"
+#include "diskCache.h"
+#include "rateLimiter.h"
+#include "columnReader.h"
+#include "tokenStore.h"
 #include <map>
+#include <set>
+#include <deque>
+#include <atomic>
+#include <chrono>
+#include <memory>
+#include <mutex>
+#include <thread>
+#include <condition_variable>
+#include <functional>
 #include <string>
 #include <vector>
+#include <curl/curl.h>
 
+/*
+Spotify API client. One instance can be shared by any number of threads: the token is swapped under tokenMutex and
+renewed by a single thread at a time, handles come from a locked pool, and settings (caches, rate limit, retry policy,
+response mode) are swapped atomically so they can be changed while requests are running. The Python bindings release
+the GIL for every request. The async methods are the exception, they belong to the thread running the event loop
+*/
 class CPPotify {
 private:
     std::string CLIENT_ID;
     std::string CLIENT_SECRET;
     std::string oAuthToken;
     std::string TOKEN = "";
+    std::string BEARER = "";
+    std::mutex tokenMutex;
     std::string REFRESH_TOKEN = "";
     std::string REDIRECT_URI; 
     std::string STATE;
     std::string SCOPE; 
     bool SHOW_DIALOG;
-    authControl ac;
+
+    /* Held through a pointer so the oAuth reAuth override is kept, set once with std::atomic_store by renewToken */
+    std::shared_ptr<authControl> ac;
+
+    /* Optional token store shared with other processes, consulted by renewToken before requesting a token */
+    std::shared_ptr<tokenStore> store;
+
+    /*
+    Background token refresh. refreshThread wakes at tokenRefreshAt, REFRESH_MARGIN seconds before the token expires
+    (or halfway through its lifetime if that is shorter), and swaps in a new token so requests never wait on the
+    token endpoint. tokenRefreshAt starts at time_point::max(), the thread sleeps until the first request needing a
+    token requests it in awaitToken and setToken wakes it with the first refresh time. A refresh that fails is tried
+    again after REFRESH_RETRY seconds, doubling with each failure up to REFRESH_RETRY_MAX, and its error is kept in
+    tokenError. A refresh the token endpoint refuses with a 400 or 401 is not tried again, tokenRefused is set and
+    awaitToken raises tokenError until a token is set. A request in flight is aborted once refreshStop is set.
+    TOKEN, BEARER, tokenIssued, tokenExpiry, tokenRefreshAt, tokenError, tokenRefused, refreshFailures and
+    refreshStop are guarded by tokenMutex, which is never held across a request. renewMutex keeps one token request
+    running at a time. tokenGeneration counts the tokens set so far, a request that was refused with a 401 only
+    renews the token if it was sent with the current one
+    */
+    long tokenGeneration = 0;
+    std::chrono::system_clock::time_point tokenIssued;
+    std::chrono::steady_clock::time_point tokenExpiry;
+    std::chrono::steady_clock::time_point tokenRefreshAt = std::chrono::steady_clock::time_point::max();
+    std::string tokenError;
+    bool tokenRefused = false;
+    int refreshFailures = 0;
+    std::condition_variable refreshSignal;
+    std::thread refreshThread;
+    std::mutex renewMutex;
+    std::atomic<bool> refreshStop {false};
+
+    static const int REFRESH_MARGIN = 60;
+    static const int REFRESH_RETRY = 10;
+    static const int REFRESH_RETRY_MAX = 300;
+
+    void setToken(std::string token, int expiresIn);
+    std::string renewToken(bool refresh, long generation = -1);
+    std::string bearerHeader(long &generation);
+    void refreshLoop();
+    void refuseToken(std::string error);
+
+    /*
+    Pool of reusable libcurl easy handles. Handles keep their connection cache between
+    requests, so repeat calls to api.spotify.com skip the TCP connect and TLS handshake
+    */
+    std::vector<CURL*> handlePool;
+    std::mutex poolMutex;
+
+    /* Multi handle used by getMany, kept between calls so its connection cache stays warm */
+    CURLM *multiHandle = nullptr;
+    std::mutex multiMutex;
+
+    /*
+    Passed to HeaderCallback, which preallocates the body from Content-Length before it arrives. generation is the token
+    the request was last sent with and replayed is set once it has been sent again after a 401. etag and lastModified
+    are the validators of an expired cache entry, taken from the cache lookup that missed
+    */
+    struct responseTarget {
+        std::string *res;
+        std::map<std::string, std::string> *headers;
+        long generation = 0;
+        bool replayed = false;
+        std::string etag;
+        std::string lastModified;
+    };
+
+    /*
+    Event loop transfers, driven through the curl multi socket API. The owner of the event loop is told
+    which sockets to watch and when to fire the timer, and reports activity back with asyncSocketAction
+    */
+    struct asyncTransfer {
+        std::string targetURL;
+        std::string res;
+        std::map<std::string, std::string> headers;
+        struct curl_slist *chunk;
+        std::function<void(std::vector<std::string>)> callback;
+        int attempts;
+        responseTarget target;
+    };
+
+    CURLM *asyncHandle = nullptr;
+    std::map<CURL*, std::unique_ptr<asyncTransfer>> asyncTransfers;
+    std::deque<std::unique_ptr<asyncTransfer>> asyncQueue;
+    std::chrono::steady_clock::time_point asyncCurlDeadline = std::chrono::steady_clock::time_point::max();
+    std::chrono::steady_clock::time_point asyncQueueDeadline = std::chrono::steady_clock::time_point::max();
+    std::multimap<std::chrono::steady_clock::time_point, std::unique_ptr<asyncTransfer>> asyncDelayed;
+    std::function<void(int, int)> asyncSocketCallback;
+    std::function<void(long)> asyncTimerCallback;
+
+    /*
+    Transfers refused with a 401 wait in asyncUnauthorized while the token is renewed off the event loop thread. The
+    owner of the event loop is asked to renew it through asyncRenewCallback and reports back with asyncTokenRenewed
+    */
+    std::vector<std::unique_ptr<asyncTransfer>> asyncUnauthorized;
+    std::function<void(long)> asyncRenewCallback;
+    bool asyncRenewing = false;
+
+    static int asyncSocketFunction(CURL *curl, curl_socket_t s, int what, void *userp, void *socketp);
+    static int asyncTimerFunction(CURLM *multi, long timeout_ms, void *userp);
+    void asyncCheckDone();
+    void asyncStartQueued();
+    void asyncUpdateTimer();
+    void asyncReplay(std::unique_ptr<asyncTransfer> transfer);
+
+    /*
+    Optional token bucket rate limiter. 429 responses are always sent again after Retry-After seconds, up to rateLimitRetries
+    times, by pausing the limiter when it is set and by waiting on the request otherwise
+    */
+    std::shared_ptr<rateLimiter> limiter;
+    std::atomic<int> rateLimitRetries {5};
+
+    double rateWait();
+    void rateAcquire();
+    double rateLimited(CURL *curl, std::map<std::string, std::string> &headers, int attempt);
+
+    /*
+    Retry policy for transient failures. Connection errors, timeouts and responses with a status in STATUSES are sent
+    again up to MAX_ATTEMPTS times, waiting BASE_DELAY * 2^attempt seconds (capped at MAX_DELAY, randomized with JITTER)
+    */
+    struct retryPolicy {
+        int MAX_ATTEMPTS;
+        double BASE_DELAY;
+        double MAX_DELAY;
+        bool JITTER;
+        std::set<long> STATUSES;
+        long TIMEOUT;
+    };
+
+    std::shared_ptr<retryPolicy> retries = std::make_shared<retryPolicy>(retryPolicy {3, 0.5, 8, true, {500, 502, 503, 504}, 30});
+    std::atomic<long> statRequests {0};
+    std::atomic<long> statRetries {0};
+    std::atomic<long> statRateLimited {0};
+    std::atomic<long> statFailures {0};
+    std::atomic<long> statReauthorized {0};
+
+    /* Read and swapped with std::atomic_load/atomic_store, the response mode can be changed while requests are running */
+    std::shared_ptr<const std::string> RESPONSE_MODE = std::make_shared<const std::string>("json");
+
+    double retryDelay(CURL *curl, CURLcode code, responseTarget &target, int attempt);
+    bool refused(CURL *curl, responseTarget &target);
+    bool unauthorized(CURL *curl, responseTarget &target);
+    void retryFailed(CURL *curl, CURLcode code, std::string &res);
+
+    /* Optional response caches, read and swapped with std::atomic_load/atomic_store. The memory cache is checked first */
+    std::shared_ptr<responseCache> cache;
+    std::shared_ptr<diskCache> disk;
+
+    bool cacheLookup(std::string targetURL, cachedResponse &entry, bool stale = false);
+    void cacheStore(std::string targetURL, CURL *curl, std::string &res, std::map<std::string, std::string> &headers);
+
+    CURL *acquireHandle();
+    void releaseHandle(CURL *curl);
+
+    static size_t countIDs(std::string IDs);
+    columnReader readColumns(const std::vector<std::string> &call);
+    std::string buildURL(std::string spotifyObj, std::map<std::string, std::string> payload);
+    struct curl_slist *setupGET(CURL *curl, std::string targetURL, responseTarget *target);
+    static std::vector<std::string> makeResponse(std::string targetURL, std::string res);
     
     static size_t WriteCallback(void *contents, size_t size, size_t nmemb, void *userp);
+    static size_t HeaderCallback(char *buffer, size_t size, size_t nitems, void *userp);
 
 public:
     /*
     Constructors and Destructors
     */
-    CPPotify(std::string ID, std::string SECRET);
-    CPPotify(std::string ID, std::string SECRET, std::string oAuthToken, std::string REDIRECT_URI = "", std::string STATE = "34fFs29kd09", std::string SCOPE = "user-read-private user-read-email", bool SHOW_DIALOG = false);
+    CPPotify(std::string ID, std::string SECRET, std::shared_ptr<tokenStore> store = nullptr);
+    CPPotify(std::string ID, std::string SECRET, std::string oAuthToken, std::string REDIRECT_URI = "", std::string STATE = "34fFs29kd09", std::string SCOPE = "user-read-private user-read-email", bool SHOW_DIALOG = false, std::shared_ptr<tokenStore> store = nullptr);
     ~CPPotify();
 
+    /* Stops the background token refresh, aborting a token request in flight, and waits for the refresh thread to exit */
+    void stopRefresh();
+
     /* 
     Main libcurl call methods
     */
     std::vector<std::string> curlGET(std::string spotifyObj, std::map<std::string, std::string> payload);
     std::vector<std::string> curlPOST(std::string spotifyObj, std::map<std::string, std::string> payload);
+    std::vector<std::string> performGET(std::string targetURL);
+
+    /*
+    Batch methods, runs GET requests concurrently through curl_multi and returns {targetURL, res} pairs in input order
+    */
+    std::vector<std::vector<std::string>> getMany(std::vector<std::string> targetURLs, int maxConcurrency = 16);
+
+    /*
+    Audio features of many tracks as float columns in AUDIO_FEATURES order, with one row for each unique track ID in the
+    order first seen. The IDs are requested in concurrent batches of 100, rows of tracks without audio features are NaN
+    */
+    struct audioFeaturesMatrix {
+        std::vector<std::string> ids;
+        std::vector<std::vector<float>> columns;
+    };
+
+    static const std::vector<std::string> AUDIO_FEATURES;
+    audioFeaturesMatrix getAudioFeaturesMatrix(std::vector<std::string> trackIDs, int maxConcurrency = 16);
+
+    /*
+    Audio analyses of tracks requested concurrently, with the bars, beats, sections, segments and tatums read into
+    float columns by columnReader. Segment pitches and timbre become columns of width 12
+    */
+    std::vector<columnReader> getAudioAnalysisColumns(std::vector<std::string> trackIDs, int maxConcurrency = 16);
+
+    /*
+    Event loop methods, asyncSubmit starts a GET request without blocking and calls callback with {targetURL, res} once it completes.
+    renewCallback is called with the token generation that was refused, the event loop owner then calls asyncRenewToken
+    on another thread and asyncTokenRenewed on the event loop thread once it returns
+    */
+    void asyncInit(std::function<void(int, int)> socketCallback, std::function<void(long)> timerCallback, std::function<void(long)> renewCallback);
+    void asyncSubmit(std::string targetURL, std::function<void(std::vector<std::string>)> callback);
+    void asyncSocketAction(int fd, int events);
+    void asyncRenewToken(long generation);
+    void asyncTokenRenewed(bool renewed);
     
     /*
     GET methods
@@ -49,13 +269,70 @@ public:
     std::vector<std::string> search(std::string query, std::string objType = "", std::map<std::string, std::string> filt = std::map<std::string, std::string>(), int limit = 50, int offset = 0);
     std::vector<std::string> browse(std::string browseCategory, std::string categoryID = "", std::string categoryObj = "", std::string timestamp = "", int limit = 50, int offset = 0);
 
+    /*
+    GET URL methods, validate arguments and build the request URL for the matching GET method without sending it
+    */
+    std::string getAlbumsURL(std::string albumID, std::string albumObj = "", int limit = 50, int offset = 0);
+    std::string getArtistsURL(std::string artistID, std::string artistObj = "", std::string include_groups = "", int limit = 50, int offset = 0);
+    std::string getEpisodesURL(std::string episodeID);
+    std::string getPlaylistsURL(bool getOwnPlaylists, std::string userID = "", std::string playlistID = "", std::string playlistObj = "", std::string fields = "", int limit = 50, int offset = 0);
+    std::string getProfilesURL(bool getOwnProfile, std::string userID = "");
+    std::string getShowsURL(std::string showID, std::string showObj = "");
+    std::string getTracksURL(std::string trackID, std::string trackObj = "");
+    std::string getPlayerURL(std::string playerObj = "", std::string deviceID = "");
+    std::string searchURL(std::string query, std::string objType = "", std::map<std::string, std::string> filt = std::map<std::string, std::string>(), int limit = 50, int offset = 0);
+    std::string browseURL(std::string browseCategory, std::string categoryID = "", std::string categoryObj = "", std::string timestamp = "", int limit = 50, int offset = 0);
+
     /*
     POST methods
     */
     std::vector<std::string> postPlayer(std::string playerAction, std::string songURI = "", std::string deviceID = "");
 
+    /*
+    Token methods, tokens are renewed in the background before they expire. reAuth and reAuthoAuth renew the token
+    at once, getTokenExpiresIn returns the seconds left before the current token expires and getTokenIssuedAt the Unix
+    time it was set, 0 before the first token. hasToken is false until the first token arrives, and while the held
+    token has expired after a failed refresh. awaitToken blocks until a token is held and throws if the token request
+    failed or the token endpoint refused the last refresh
+    */
     std::string reAuth();
     std::string reAuthoAuth();
+    long getTokenExpiresIn();
+    double getTokenIssuedAt();
+    bool hasToken();
+    void awaitToken();
+
+    /*
+    Response cache methods, TTLs are in seconds and set per endpoint i.e. {"albums", 3600}, a TTL of 0 disables caching for that endpoint
+    */
+    void enableCache(size_t maxBytes, std::map<std::string, int> ttls = std::map<std::string, int>(), int defaultTTL = 3600);
+    void disableCache();
+    void clearCache();
+    void enableDiskCache(std::string path, std::map<std::string, int> ttls = std::map<std::string, int>(), int defaultTTL = 3600);
+    void disableDiskCache();
+    int compactDiskCache();
+
+    /*
+    Rate limit methods, rate is in requests per second and burst is the number of requests that can be sent at once after a quiet period
+    */
+    void setRateLimit(double rate, int burst = 1, int maxRetries = 5);
+    void disableRateLimit();
+
+    /*
+    Retry methods, statuses lists the HTTP statuses that are retried and timeout is the limit in seconds for a single attempt (0 for none).
+    getStats returns the number of requests sent, retries, rate limited retries, requests that failed after every attempt,
+    requests sent again with a new token after a 401 and requests sent to the token endpoint
+    */
+    void setRetryPolicy(int maxAttempts = 3, double baseDelay = 0.5, double maxDelay = 8, bool jitter = true, std::vector<long> statuses = {500, 502, 503, 504}, long timeout = 30);
+    std::map<std::string, long> getStats();
+
+    /*
+    Response mode of the Python bindings, "json" returns response bodies as strings, "cpp" parses them into Python objects in C++
+    and "lazy" returns LazyJSON views that only decode the values that are accessed. "bytes" and "buffer" skip decoding,
+    returning the body as bytes or as a memoryview of the C++ buffer
+    */
+    void setResponseMode(std::string mode);
+    std::string getResponseMode();
 
     /*
     Getters and Setters
@@ -1,6 +1,7 @@
 #include "authControl.h"
 #include <regex>
 #include <iostream>
+#include <stdexcept>
 #include <curl/curl.h>
 #include <nlohmann/json.hpp>
 
@@ -8,8 +9,12 @@ authControl::authControl() {}
 
 authControl::authControl(std::string ID) : CLIENT_ID(ID) {}
 
-authControl::authControl(std::string ID, std::string SECRET) : CLIENT_ID(ID), CLIENT_SECRET(SECRET) {
-    this->TOKEN = this->auth()[0];
+authControl::authControl(std::string ID, std::string SECRET) : authControl(ID, SECRET, true) {}
+
+authControl::authControl(std::string ID, std::string SECRET, bool authorize) : CLIENT_ID(ID), CLIENT_SECRET(SECRET) {
+    if (authorize) {
+        this->TOKEN = this->auth()[0];
+    }
 }
 
 authControl::~authControl() {}
@@ -71,8 +76,61 @@ size_t authControl::WriteCallback(void *contents, size_t size, size_t nmemb, voi
     return size * nmemb;
 }
 
+int authControl::ProgressCallback(void *clientp, curl_off_t dltotal, curl_off_t dlnow, curl_off_t ultotal, curl_off_t ulnow) {
+    /* A non zero return aborts the transfer with CURLE_ABORTED_BY_CALLBACK */
+    const std::atomic<bool> *abort = static_cast<authControl*>(clientp)->ABORT;
+    return (abort && *abort) ? 1 : 0;
+}
+
+/* Sends a token request with the timeouts and abort flag applied, the handle is set up by the caller */
+CURLcode authControl::performRequest(CURL *curl) {
+    curl_easy_setopt(curl, CURLOPT_TIMEOUT, REQUEST_TIMEOUT);
+    curl_easy_setopt(curl, CURLOPT_CONNECTTIMEOUT, CONNECT_TIMEOUT);
+    curl_easy_setopt(curl, CURLOPT_NOPROGRESS, 0L);
+    curl_easy_setopt(curl, CURLOPT_XFERINFOFUNCTION, this->ProgressCallback);
+    curl_easy_setopt(curl, CURLOPT_XFERINFODATA, this);
+
+    this->TOKEN_REQUESTS++;
+    return curl_easy_perform(curl);
+}
+
+static void checkRequest(CURLcode code) {
+    if (code != CURLE_OK) {
+        throw std::runtime_error(std::string("Could not reach the token endpoint, ") + curl_easy_strerror(code));
+    }
+}
+
+/*
+A refused token request is answered with an error object instead of a token, i.e. {"error": "invalid_client"}. A 400 or
+401 refusal, like bad credentials or a revoked refresh token, throws std::invalid_argument as sending it again can not
+succeed, any other failure throws std::runtime_error
+*/
+static nlohmann::json parseToken(const std::string &res, long status) {
+    nlohmann::json j = nlohmann::json::parse(res, nullptr, false);
+
+    if (!j.is_object() || !j.contains("access_token") || !j["access_token"].is_string()) {
+        std::string error = res;
+        for (const char *key : {"error_description", "error"}) {
+            if (j.is_object() && j.contains(key) && j[key].is_string()) {
+                error = j[key].get<std::string>();
+                break;
+            }
+        }
+
+        if (status == 400 || status == 401) {
+            throw std::invalid_argument("The token endpoint refused the request, " + error);
+        }
+
+        throw std::runtime_error("The token endpoint refused the request, " + error);
+    }
+
+    return j;
+}
+
 std::vector<std::string> authControl::auth() {
     CURL *curl;
+    CURLcode code = CURLE_FAILED_INIT;
+    long status = 0;
     std::string res;
 
     curl = curl_easy_init();
@@ -80,7 +138,7 @@ std::vector<std::string> authControl::auth() {
     if(curl) {
         try {
             curl_easy_setopt(curl, CURLOPT_TCP_NODELAY, 0);
-            curl_easy_setopt(curl, CURLOPT_URL, "https://accounts.spotify.com/api/token");
+            curl_easy_setopt(curl, CURLOPT_URL, SPOTIFY_TOKEN_URL);
             curl_easy_setopt(curl, CURLOPT_POSTFIELDS, "grant_type=client_credentials");
             curl_easy_setopt(curl, CURLOPT_WRITEFUNCTION, this->WriteCallback);
             curl_easy_setopt(curl, CURLOPT_WRITEDATA, &res);
@@ -93,7 +151,8 @@ std::vector<std::string> authControl::auth() {
 
             curl_easy_setopt(curl, CURLOPT_HTTPHEADER, authChunk);
 
-            curl_easy_perform(curl);
+            code = this->performRequest(curl);
+            curl_easy_getinfo(curl, CURLINFO_RESPONSE_CODE, &status);
             curl_easy_cleanup(curl);
         }
         catch (const char* Exception) {
@@ -101,7 +160,10 @@ std::vector<std::string> authControl::auth() {
         }
     }
 
-    auto j = nlohmann::json::parse(res);
+    checkRequest(code);
+
+    auto j = parseToken(res, status);
+    this->EXPIRES_IN = j.value("expires_in", 3600);
     return std::vector<std::string> {to_string(j["access_token"])};
 }
 
@@ -130,19 +192,36 @@ std::string authControl::getToken() {
     }
 }
 
+int authControl::getExpiresIn() {
+    return this->EXPIRES_IN;
+}
+
+long authControl::getTokenRequests() {
+    return this->TOKEN_REQUESTS;
+}
+
+void authControl::setAbort(const std::atomic<bool> *abort) {
+    this->ABORT = abort;
+}
+
 bool authControl::checkAuth() {
     return this->getToken() == "";
 }
 
-clientCredentials::clientCredentials(std::string ID, std::string SECRET) : authControl(ID, SECRET) {}
+clientCredentials::clientCredentials(std::string ID, std::string SECRET, bool authorize) : authControl(ID, SECRET, authorize) {}
 
-oAuth::oAuth(std::string ID, std::string SECRET, std::string oAuthToken, std::string REDIRECT_URI, std::string STATE, std::string SCOPE, bool SHOW_DIALOG) : authControl(ID, SECRET) {
+/* Only the authorization code is exchanged, the base class does not request a client credentials token first */
+oAuth::oAuth(std::string ID, std::string SECRET, std::string oAuthToken, std::string REDIRECT_URI, std::string STATE, std::string SCOPE, bool SHOW_DIALOG, bool authorize) : authControl(ID, SECRET, false) {
     this->oAuthToken = oAuthToken; 
     this->REDIRECT_URI = REDIRECT_URI;
     this->STATE = STATE;
     this->SCOPE = SCOPE;
     this->SHOW_DIALOG = SHOW_DIALOG;
 
+    if (!authorize) {
+        return;
+    }
+
     std::vector<std::string> tokens = this->auth();
     this->TOKEN = tokens[0];
     this->REFRESH_TOKEN = tokens[1];
@@ -168,6 +247,8 @@ std::string urlEncEasy(std::string url) {
 
 std::vector<std::string> oAuth::auth() {
     CURL *curl;
+    CURLcode code = CURLE_FAILED_INIT;
+    long status = 0;
     std::string res;
 
     curl = curl_easy_init();
@@ -175,7 +256,7 @@ std::vector<std::string> oAuth::auth() {
     if(curl) {
         try {
             curl_easy_setopt(curl, CURLOPT_TCP_NODELAY, 0);
-            curl_easy_setopt(curl, CURLOPT_URL, "https://accounts.spotify.com/api/token");
+            curl_easy_setopt(curl, CURLOPT_URL, SPOTIFY_TOKEN_URL);
 
             std::string body = "grant_type=authorization_code&code=" + this->getAuthToken() + "&redirect_uri=" + urlEncEasy(this->getRedirectURI());
 
@@ -193,7 +274,8 @@ std::vector<std::string> oAuth::auth() {
 
             curl_easy_setopt(curl, CURLOPT_HTTPHEADER, authChunk);
 
-            curl_easy_perform(curl);
+            code = this->performRequest(curl);
+            curl_easy_getinfo(curl, CURLINFO_RESPONSE_CODE, &status);
             curl_easy_cleanup(curl);
         }
         catch (const char* Exception) {
@@ -201,14 +283,17 @@ std::vector<std::string> oAuth::auth() {
         }
     }
 
-    std::cout << res << std::endl;
+    checkRequest(code);
 
-    auto j = nlohmann::json::parse(res);
-    return std::vector<std::string> {to_string(j["access_token"]), to_string(j["refresh_token"])};
+    auto j = parseToken(res, status);
+    this->EXPIRES_IN = j.value("expires_in", 3600);
+    return std::vector<std::string> {to_string(j["access_token"]), j.value("refresh_token", "")};
 }
 
 std::string oAuth::reAuth() {
     CURL *curl;
+    CURLcode code = CURLE_FAILED_INIT;
+    long status = 0;
     std::string res;
 
     curl = curl_easy_init();
@@ -216,7 +301,7 @@ std::string oAuth::reAuth() {
     if(curl) {
         try {
             curl_easy_setopt(curl, CURLOPT_TCP_NODELAY, 0);
-            curl_easy_setopt(curl, CURLOPT_URL, "https://accounts.spotify.com/api/token");
+            curl_easy_setopt(curl, CURLOPT_URL, SPOTIFY_TOKEN_URL);
 
             std::string body = "grant_type=refresh_token&refresh_token=" + this->getRefreshToken();
 
@@ -234,7 +319,8 @@ std::string oAuth::reAuth() {
 
             curl_easy_setopt(curl, CURLOPT_HTTPHEADER, authChunk);
 
-            curl_easy_perform(curl);
+            code = this->performRequest(curl);
+            curl_easy_getinfo(curl, CURLINFO_RESPONSE_CODE, &status);
             curl_easy_cleanup(curl);
         }
         catch (const char* Exception) {
@@ -242,9 +328,16 @@ std::string oAuth::reAuth() {
         }
     }
 
-    std::cout << res << std::endl;
+    checkRequest(code);
+
+    auto j = parseToken(res, status);
+    this->EXPIRES_IN = j.value("expires_in", 3600);
+
+    /* Spotify may rotate the refresh token, the new one replaces the old */
+    if (j.contains("refresh_token")) {
+        this->REFRESH_TOKEN = j["refresh_token"].get<std::string>();
+    }
 
-    auto j = nlohmann::json::parse(res);
     return to_string(j["access_token"]);
 }
 
@@ -260,6 +353,10 @@ std::string oAuth::getRefreshToken() {
     return this->REFRESH_TOKEN;
 }
 
+void oAuth::setRefreshToken(std::string token) {
+    this->REFRESH_TOKEN = token;
+}
+
 std::string oAuth::getScope() {
     return this->SCOPE;
 }
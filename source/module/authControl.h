@@ -1,16 +1,46 @@
 #ifndef AUTHCONTROL_H
 #define AUTHCONTROL_H
 
+#include <atomic>
 #include <string>
 #include <vector>
+#include <curl/curl.h>
+
+/* Endpoints the module talks to, overridable at build time i.e. to run the tests against a local server */
+#ifndef SPOTIFY_API_URL
+#define SPOTIFY_API_URL "https://api.spotify.com/v1/"
+#endif
+
+#ifndef SPOTIFY_TOKEN_URL
+#define SPOTIFY_TOKEN_URL "https://accounts.spotify.com/api/token"
+#endif
 
 /* Base Class */ 
 class authControl {
 private:
     std::string CLIENT_ID;
     std::string CLIENT_SECRET;
+
+protected:
     std::string TOKEN = "";
 
+    /* Lifetime in seconds of the last token received, from the expires_in field of the token response */
+    int EXPIRES_IN = 3600;
+
+    /* Number of requests sent to the token endpoint */
+    std::atomic<long> TOKEN_REQUESTS {0};
+
+    /* Token requests give up after REQUEST_TIMEOUT seconds, or at once when the flag set by setAbort becomes true */
+    static const long REQUEST_TIMEOUT = 30;
+    static const long CONNECT_TIMEOUT = 10;
+    const std::atomic<bool> *ABORT = nullptr;
+
+    static int ProgressCallback(void *clientp, curl_off_t dltotal, curl_off_t dlnow, curl_off_t ultotal, curl_off_t ulnow);
+    CURLcode performRequest(CURL *curl);
+
+    /* Sets the credentials without requesting a token, for subclasses that use another grant */
+    authControl(std::string ID, std::string SECRET, bool authorize);
+
 public:
     authControl();
     authControl(std::string ID);
@@ -34,20 +64,22 @@ public:
     std::string getClientID();
     std::string getClientSecret();
     std::string getToken();
+    int getExpiresIn();
+    long getTokenRequests();
+    void setAbort(const std::atomic<bool> *abort);
     bool checkAuth();
 };
 
 /* Client Credentials authorization */
 class clientCredentials : public authControl {
 public:
-    clientCredentials(std::string ID, std::string SECRET);
+    clientCredentials(std::string ID, std::string SECRET, bool authorize = true);
 };
 
 /* oAuth authorization */
 class oAuth : public authControl {
 private:
     std::string oAuthToken;
-    std::string TOKEN;
     std::string REDIRECT_URI; 
     std::string STATE;
     std::string SCOPE; 
@@ -55,13 +87,14 @@ private:
     std::string REFRESH_TOKEN;
 
 public:
-    oAuth(std::string CLIENT_ID, std::string CLIENT_SECRET, std::string oAuthToken, std::string REDIRECT_URI, std::string STATE = "34fFs29kd09", std::string SCOPE = "user-read-private user-read-email", bool SHOW_DIALOG = false);
+    oAuth(std::string CLIENT_ID, std::string CLIENT_SECRET, std::string oAuthToken, std::string REDIRECT_URI, std::string STATE = "34fFs29kd09", std::string SCOPE = "user-read-private user-read-email", bool SHOW_DIALOG = false, bool authorize = true);
 
     std::vector<std::string> auth();
     std::string reAuth();
 
     std::string getAuthToken();
     std::string getRefreshToken();
+    void setRefreshToken(std::string token);
     std::string getRedirectURI();
     std::string getState();
     std::string getScope();
@@ -0,0 +1,314 @@
+#include "columnReader.h"
+#include <algorithm>
+#include <charconv>
+#include <cmath>
+
+void columnReader::skipWhitespace() {
+    while (this->pos < this->end && (*this->pos == ' ' || *this->pos == '\n' || *this->pos == '\r' || *this->pos == '\t')) {
+        this->pos++;
+    }
+}
+
+bool columnReader::expect(char c) {
+    this->skipWhitespace();
+    if (this->pos >= this->end || *this->pos != c) {
+        return false;
+    }
+
+    this->pos++;
+    return true;
+}
+
+/* Sets text to the raw contents of the string at pos, escapes are left as they are */
+bool columnReader::readString(std::string_view &text) {
+    if (!this->expect('"')) {
+        return false;
+    }
+
+    const char *start = this->pos;
+    while (this->pos < this->end && *this->pos != '"') {
+        this->pos += (*this->pos == '\\') ? 2 : 1;
+    }
+
+    if (this->pos >= this->end) {
+        return false;
+    }
+
+    text = std::string_view(start, this->pos - start);
+    this->pos++;
+    return true;
+}
+
+/* Accepts only the JSON number grammar, from_chars alone would also read inf, nan, leading zeros and 1. */
+bool columnReader::readNumber(double &value) {
+    const char *p = this->pos;
+    auto digits = [&p, this]() {
+        const char *start = p;
+        while (p < this->end && *p >= '0' && *p <= '9') {
+            p++;
+        }
+
+        return p - start;
+    };
+
+    if (p < this->end && *p == '-') {
+        p++;
+    }
+
+    const char *integer = p;
+    if (digits() == 0 || (*integer == '0' && p - integer > 1)) {
+        return false;
+    }
+
+    if (p < this->end && *p == '.') {
+        p++;
+        if (digits() == 0) {
+            return false;
+        }
+    }
+
+    if (p < this->end && (*p == 'e' || *p == 'E')) {
+        p++;
+        if (p < this->end && (*p == '+' || *p == '-')) {
+            p++;
+        }
+
+        if (digits() == 0) {
+            return false;
+        }
+    }
+
+    auto result = std::from_chars(this->pos, p, value);
+    if (result.ec != std::errc()) {
+        return false;
+    }
+
+    this->pos = p;
+    return true;
+}
+
+bool columnReader::literal(std::string_view word) {
+    if (std::string_view(this->pos, std::min<size_t>(word.size(), this->end - this->pos)) != word) {
+        return false;
+    }
+
+    this->pos += word.size();
+    return true;
+}
+
+bool columnReader::isNumber() {
+    return this->pos < this->end && (*this->pos == '-' || (*this->pos >= '0' && *this->pos <= '9'));
+}
+
+/* Reads the members of the object or array at pos, calling member for each with its key, empty for arrays */
+template <typename Member>
+bool columnReader::readContainer(char open, char close, Member member) {
+    if (!this->expect(open) || ++this->depth > MAX_DEPTH) {
+        return false;
+    }
+
+    this->skipWhitespace();
+    if (this->pos < this->end && *this->pos == close) {
+        this->pos++;
+        this->depth--;
+        return true;
+    }
+
+    while (true) {
+        std::string_view key;
+        if (open == '{' && (!this->readString(key) || !this->expect(':'))) {
+            return false;
+        }
+
+        this->skipWhitespace();
+        if (this->pos >= this->end || !member(key)) {
+            return false;
+        }
+
+        this->skipWhitespace();
+        if (this->pos < this->end && *this->pos == ',') {
+            this->pos++;
+            continue;
+        }
+
+        if (this->pos < this->end && *this->pos == close) {
+            this->pos++;
+            this->depth--;
+            return true;
+        }
+
+        return false;
+    }
+}
+
+bool columnReader::skipValue() {
+    if (this->pos >= this->end) {
+        return false;
+    }
+
+    std::string_view text;
+    double number;
+
+    switch (*this->pos) {
+        case '{':
+            return this->readContainer('{', '}', [this](std::string_view) { return this->skipValue(); });
+        case '[':
+            return this->readContainer('[', ']', [this](std::string_view) { return this->skipValue(); });
+        case '"':
+            return this->readString(text);
+        case 't':
+            return this->literal("true");
+        case 'f':
+            return this->literal("false");
+        case 'n':
+            return this->literal("null");
+        default:
+            return this->readNumber(number);
+    }
+}
+
+/* Records share their member order, hint is the position the next member is expected at */
+columnReader::column &columnReader::findColumn(table &rows, std::string_view name, bool list, size_t &hint) {
+    size_t i = hint;
+    if (i >= rows.columns.size() || rows.columns[i].name != name) {
+        i = 0;
+        while (i < rows.columns.size() && rows.columns[i].name != name) {
+            i++;
+        }
+    }
+
+    if (i == rows.columns.size()) {
+        /* Rows read before the column appeared are filled once its width is known */
+        rows.columns.push_back(column {std::string(name), list, 0, {}});
+    }
+
+    hint = i + 1;
+    return rows.columns[i];
+}
+
+bool columnReader::readList(column &target, size_t row) {
+    size_t count = 0;
+
+    bool valid = this->readContainer('[', ']', [this, &target, &count](std::string_view) {
+        double value = NAN;
+        if (this->isNumber() ? !this->readNumber(value) : !this->skipValue()) {
+            return false;
+        }
+
+        if (target.width == 0 || count < target.width) {
+            target.values.push_back(static_cast<float>(value));
+        }
+
+        count++;
+        return true;
+    });
+
+    /* The first list sets the width, shorter lists are padded */
+    if (target.width == 0 && count > 0) {
+        target.width = count;
+        target.values.insert(target.values.begin(), row * count, NAN);
+    }
+
+    if (target.width > 0) {
+        target.values.resize((row + 1) * target.width, NAN);
+    }
+
+    return valid;
+}
+
+bool columnReader::readRecord(table &rows) {
+    size_t row = rows.rows++;
+    size_t hint = 0;
+
+    if (*this->pos == '{') {
+        bool valid = this->readContainer('{', '}', [this, &rows, &hint, row](std::string_view key) {
+            if (this->isNumber()) {
+                column &target = this->findColumn(rows, key, false, hint);
+                if (target.list) {
+                    return this->skipValue();
+                }
+
+                double value;
+                if (!this->readNumber(value)) {
+                    return false;
+                }
+
+                target.values.resize(row, NAN);
+                target.values.push_back(static_cast<float>(value));
+                return true;
+            }
+
+            if (*this->pos == '[') {
+                column &target = this->findColumn(rows, key, true, hint);
+                if (!target.list) {
+                    return this->skipValue();
+                }
+
+                target.values.resize(row * target.width, NAN);
+                return this->readList(target, row);
+            }
+
+            return this->skipValue();
+        });
+
+        if (!valid) {
+            return false;
+        }
+    }
+    else if (!this->literal("null")) {
+        /* Not a list of records */
+        return false;
+    }
+
+    /* Columns missing from this record are padded */
+    for (auto &target : rows.columns) {
+        target.values.resize(rows.rows * (target.list ? target.width : 1), NAN);
+    }
+
+    return true;
+}
+
+bool columnReader::readTable(table &rows) {
+    return this->readContainer('[', ']', [this, &rows](std::string_view) {
+        return this->readRecord(rows);
+    });
+}
+
+bool columnReader::read(const std::string &text) {
+    this->pos = text.data();
+    this->end = text.data() + text.size();
+    this->depth = 0;
+
+    this->skipWhitespace();
+
+    bool valid = this->readContainer('{', '}', [this](std::string_view key) {
+        std::string name(key);
+        const char *start = this->pos;
+
+        if (this->isNumber()) {
+            return this->readNumber(this->numbers[name]);
+        }
+
+        /* Lists of records become tables, anything else is kept as raw JSON */
+        if (*this->pos == '[') {
+            table rows;
+            if (this->readTable(rows)) {
+                this->tables[name] = std::move(rows);
+                return true;
+            }
+
+            this->pos = start;
+            this->depth = 1;
+        }
+
+        if (!this->skipValue()) {
+            return false;
+        }
+
+        this->raw[name] = std::string(start, this->pos - start);
+        return true;
+    });
+
+    this->skipWhitespace();
+    return valid && this->pos == this->end;
+}
@@ -0,0 +1,61 @@
+#ifndef COLUMNREADER_H
+#define COLUMNREADER_H
+
+#include <map>
+#include <string>
+#include <string_view>
+#include <vector>
+
+/*
+Reads a JSON object whose members hold lists of flat records, like the sections and segments of an audio analysis,
+into float columns without building a JSON tree. Each list becomes a table with a column for every number member of
+its records, and a row major column of fixed width for every member holding a list of numbers. Missing values, null
+records and extra list values are NaN or dropped. Number members of the root object are kept in numbers and any other
+member as raw JSON in raw
+*/
+class columnReader {
+public:
+    struct column {
+        std::string name;
+        bool list;
+        size_t width;
+        std::vector<float> values;
+    };
+
+    struct table {
+        size_t rows = 0;
+        std::vector<column> columns;
+    };
+
+    std::map<std::string, table> tables;
+    std::map<std::string, double> numbers;
+    std::map<std::string, std::string> raw;
+
+    /* Returns false if text is not a JSON object */
+    bool read(const std::string &text);
+
+private:
+    const char *pos = nullptr;
+    const char *end = nullptr;
+    int depth = 0;
+
+    static const int MAX_DEPTH = 512;
+
+    void skipWhitespace();
+    bool expect(char c);
+    bool readString(std::string_view &text);
+    bool readNumber(double &value);
+    bool literal(std::string_view word);
+    bool skipValue();
+    bool isNumber();
+
+    template <typename Member>
+    bool readContainer(char open, char close, Member member);
+
+    bool readTable(table &rows);
+    bool readRecord(table &rows);
+    bool readList(column &target, size_t row);
+    column &findColumn(table &rows, std::string_view name, bool list, size_t &hint);
+};
+
+#endif
@@ -0,0 +1,133 @@
+#include "diskCache.h"
+#include <ctime>
+#include <stdexcept>
+
+diskCache::diskCache(std::string path, std::map<std::string, int> ttls, int defaultTTL) : PATH(path), DEFAULT_TTL(defaultTTL), TTLS(ttls) {
+    /* Serialized mode so one connection can be shared by every thread of the client */
+    if (sqlite3_open_v2(path.c_str(), &this->db, SQLITE_OPEN_READWRITE | SQLITE_OPEN_CREATE | SQLITE_OPEN_FULLMUTEX, nullptr) != SQLITE_OK) {
+        std::string err = sqlite3_errmsg(this->db);
+        sqlite3_close(this->db);
+        throw std::runtime_error("Could not open disk cache at " + path + ": " + err);
+    }
+
+    /* WAL lets readers in other processes carry on while one process writes, writers wait on each other for up to 5 seconds */
+    sqlite3_busy_timeout(this->db, 5000);
+    this->exec("PRAGMA journal_mode=WAL");
+    this->exec("PRAGMA synchronous=NORMAL");
+    this->exec("CREATE TABLE IF NOT EXISTS responses (url TEXT PRIMARY KEY, res BLOB NOT NULL, etag TEXT NOT NULL DEFAULT '', last_modified TEXT NOT NULL DEFAULT '', expires INTEGER NOT NULL)");
+}
+
+diskCache::~diskCache() {
+    sqlite3_close(this->db);
+}
+
+void diskCache::exec(std::string sql) {
+    char *err = nullptr;
+
+    if (sqlite3_exec(this->db, sql.c_str(), nullptr, nullptr, &err) != SQLITE_OK) {
+        std::string msg = err ? err : "unknown error";
+        sqlite3_free(err);
+        throw std::runtime_error("Disk cache query failed: " + msg);
+    }
+}
+
+/* The player and anything under me/ belong to the user of the token, only catalog data is written to a file others can open */
+bool diskCache::shared(std::string targetURL) {
+    std::string endpoint = responseCache::endpoint(targetURL);
+    return endpoint != "me" && endpoint != "player";
+}
+
+int diskCache::ttl(std::string targetURL) {
+    if (!diskCache::shared(targetURL)) {
+        return 0;
+    }
+
+    auto it = this->TTLS.find(responseCache::endpoint(targetURL));
+    return (it == this->TTLS.end()) ? this->DEFAULT_TTL : it->second;
+}
+
+bool diskCache::get(std::string targetURL, cachedResponse &entry, bool stale) {
+    if (!diskCache::shared(targetURL)) {
+        return false;
+    }
+
+    sqlite3_stmt *stmt;
+    bool found = false;
+
+    /*
+    Expired rows with an ETag or Last-Modified value are returned when stale is set, so they can be revalidated. Without
+    stale only their validators are read, res comes last so its overflow pages are not loaded for an expired row
+    */
+    if (sqlite3_prepare_v2(this->db, "SELECT expires > ?, etag, last_modified, res FROM responses WHERE url = ?", -1, &stmt, nullptr) != SQLITE_OK) {
+        return false;
+    }
+
+    sqlite3_bind_int64(stmt, 1, std::time(nullptr));
+    sqlite3_bind_text(stmt, 2, targetURL.data(), targetURL.size(), SQLITE_TRANSIENT);
+
+    if (sqlite3_step(stmt) == SQLITE_ROW) {
+        bool fresh = sqlite3_column_int(stmt, 0) != 0;
+        std::string etag = reinterpret_cast<const char*>(sqlite3_column_text(stmt, 1));
+        std::string lastModified = reinterpret_cast<const char*>(sqlite3_column_text(stmt, 2));
+
+        if (fresh || etag != "" || lastModified != "") {
+            entry.etag = etag;
+            entry.lastModified = lastModified;
+        }
+
+        if (fresh || (stale && (etag != "" || lastModified != ""))) {
+            entry.res.assign(static_cast<const char*>(sqlite3_column_blob(stmt, 3)), sqlite3_column_bytes(stmt, 3));
+            found = true;
+        }
+    }
+
+    sqlite3_finalize(stmt);
+    return found;
+}
+
+void diskCache::put(std::string targetURL, cachedResponse entry) {
+    int seconds = this->ttl(targetURL);
+    if (seconds <= 0) {
+        return;
+    }
+
+    sqlite3_stmt *stmt;
+
+    if (sqlite3_prepare_v2(this->db, "INSERT OR REPLACE INTO responses (url, res, etag, last_modified, expires) VALUES (?, ?, ?, ?, ?)", -1, &stmt, nullptr) != SQLITE_OK) {
+        return;
+    }
+
+    sqlite3_bind_text(stmt, 1, targetURL.data(), targetURL.size(), SQLITE_TRANSIENT);
+    sqlite3_bind_blob(stmt, 2, entry.res.data(), entry.res.size(), SQLITE_TRANSIENT);
+    sqlite3_bind_text(stmt, 3, entry.etag.data(), entry.etag.size(), SQLITE_TRANSIENT);
+    sqlite3_bind_text(stmt, 4, entry.lastModified.data(), entry.lastModified.size(), SQLITE_TRANSIENT);
+    sqlite3_bind_int64(stmt, 5, std::time(nullptr) + seconds);
+
+    /* A write that times out waiting on another process is dropped, the response is still returned to the caller */
+    sqlite3_step(stmt);
+    sqlite3_finalize(stmt);
+}
+
+int diskCache::compact() {
+    sqlite3_stmt *stmt;
+    int removed = 0;
+
+    if (sqlite3_prepare_v2(this->db, "DELETE FROM responses WHERE expires <= ?", -1, &stmt, nullptr) == SQLITE_OK) {
+        sqlite3_bind_int64(stmt, 1, std::time(nullptr));
+
+        if (sqlite3_step(stmt) == SQLITE_DONE) {
+            removed = sqlite3_changes(this->db);
+        }
+
+        sqlite3_finalize(stmt);
+    }
+
+    this->exec("VACUUM");
+    this->exec("PRAGMA wal_checkpoint(TRUNCATE)");
+
+    return removed;
+}
+
+std::string diskCache::getPath() {
+    return this->PATH;
+}
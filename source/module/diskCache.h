@@ -0,0 +1,36 @@
+#ifndef DISKCACHE_H
+#define DISKCACHE_H
+
+#include "responseCache.h"
+#include <map>
+#include <string>
+#include <sqlite3.h>
+
+/* SQLite backed cache of API responses, keyed on the request URL and shared by every process that opens the same file */
+class diskCache {
+private:
+    std::string PATH;
+    int DEFAULT_TTL;
+    std::map<std::string, int> TTLS;
+    sqlite3 *db = nullptr;
+
+    void exec(std::string sql);
+
+public:
+    diskCache(std::string path, std::map<std::string, int> ttls = std::map<std::string, int>(), int defaultTTL = 3600);
+    ~diskCache();
+
+    diskCache(const diskCache&) = delete;
+    diskCache &operator=(const diskCache&) = delete;
+
+    static bool shared(std::string targetURL);
+    int ttl(std::string targetURL);
+
+    bool get(std::string targetURL, cachedResponse &entry, bool stale = false);
+    void put(std::string targetURL, cachedResponse entry);
+    int compact();
+
+    std::string getPath();
+};
+
+#endif
@@ -0,0 +1,310 @@
+#include "lazyJSON.h"
+#include "pyJSON.h"
+#include <stdexcept>
+#include <string_view>
+
+namespace py = pybind11;
+
+namespace {
+
+const size_t npos = std::string::npos;
+
+size_t skipWhitespace(const std::string &s, size_t p, size_t end) {
+    while (p < end && (s[p] == ' ' || s[p] == '\n' || s[p] == '\r' || s[p] == '\t')) {
+        p++;
+    }
+
+    return p;
+}
+
+/* Returns the position after the closing quote of the string starting at p */
+size_t skipString(const std::string &s, size_t p, size_t end) {
+    for (p++; p < end; p++) {
+        if (s[p] == '\\') {
+            p++;
+        }
+        else if (s[p] == '"') {
+            return p + 1;
+        }
+    }
+
+    return npos;
+}
+
+/* Returns the position after the value starting at p without decoding it, only brackets and strings are checked */
+size_t skipValue(const std::string &s, size_t p, size_t end) {
+    if (p >= end) {
+        return npos;
+    }
+
+    if (s[p] == '"') {
+        return skipString(s, p, end);
+    }
+
+    if (s[p] == '{' || s[p] == '[') {
+        std::string closing;
+
+        while (p < end) {
+            char c = s[p];
+
+            if (c == '"') {
+                p = skipString(s, p, end);
+                if (p == npos) {
+                    return npos;
+                }
+
+                continue;
+            }
+
+            if (c == '{' || c == '[') {
+                closing.push_back(c == '{' ? '}' : ']');
+            }
+            else if (c == '}' || c == ']') {
+                if (closing.empty() || closing.back() != c) {
+                    return npos;
+                }
+
+                closing.pop_back();
+                if (closing.empty()) {
+                    return p + 1;
+                }
+            }
+
+            p++;
+        }
+
+        return npos;
+    }
+
+    size_t start = p;
+    while (p < end && s[p] != ',' && s[p] != '}' && s[p] != ']' && s[p] != ' ' && s[p] != '\n' && s[p] != '\r' && s[p] != '\t') {
+        p++;
+    }
+
+    return (p == start) ? npos : p;
+}
+
+}
+
+lazyJSON::lazyJSON(std::shared_ptr<const std::string> buffer, size_t begin, size_t end) : buffer(buffer), value{begin, end} {}
+
+py::object lazyJSON::fromString(std::string text) {
+    auto buffer = std::make_shared<const std::string>(std::move(text));
+    const std::string &s = *buffer;
+
+    size_t begin = skipWhitespace(s, 0, s.size());
+    if (begin < s.size() && (s[begin] == '{' || s[begin] == '[')) {
+        size_t end = skipValue(s, begin, s.size());
+
+        if (end != npos && skipWhitespace(s, end, s.size()) == s.size()) {
+            return py::cast(lazyJSON(buffer, begin, end));
+        }
+    }
+
+    return parseJSON(s);
+}
+
+void lazyJSON::index() {
+    if (this->indexed) {
+        return;
+    }
+
+    const std::string &s = *this->buffer;
+    bool object = this->isObject();
+    size_t end = this->value.end - 1;
+    size_t p = skipWhitespace(s, this->value.begin + 1, end);
+
+    std::string key;
+    this->keys.clear();
+    this->values.clear();
+    this->positions.clear();
+
+    while (p < end) {
+        if (object) {
+            size_t keyEnd = (s[p] == '"') ? skipString(s, p, end) : npos;
+            if (keyEnd == npos) {
+                throw std::invalid_argument("Received malformed JSON, expected a key at position " + std::to_string(p));
+            }
+
+            /* Keys without escapes are used as they are, the rest are decoded */
+            std::string_view raw(s.data() + p + 1, keyEnd - p - 2);
+            key = (raw.find('\\') == std::string_view::npos) ? std::string(raw) : parseJSONValue(s.data() + p, keyEnd - p).cast<std::string>();
+
+            p = skipWhitespace(s, keyEnd, end);
+            if (p >= end || s[p] != ':') {
+                throw std::invalid_argument("Received malformed JSON, expected ':' at position " + std::to_string(p));
+            }
+
+            p = skipWhitespace(s, p + 1, end);
+        }
+
+        size_t valueEnd = skipValue(s, p, end);
+        if (valueEnd == npos) {
+            throw std::invalid_argument("Received malformed JSON, expected a value at position " + std::to_string(p));
+        }
+
+        /* A repeated key keeps its first position and takes the later value, like json.loads */
+        auto it = object ? this->positions.find(key) : this->positions.end();
+        if (it != this->positions.end()) {
+            this->values[it->second] = span{p, valueEnd};
+        }
+        else {
+            if (object) {
+                this->positions[key] = this->keys.size();
+                this->keys.push_back(key);
+            }
+
+            this->values.push_back(span{p, valueEnd});
+        }
+
+        p = skipWhitespace(s, valueEnd, end);
+        if (p < end) {
+            if (s[p] != ',') {
+                throw std::invalid_argument("Received malformed JSON, expected ',' at position " + std::to_string(p));
+            }
+
+            p = skipWhitespace(s, p + 1, end);
+        }
+    }
+
+    this->children.resize(this->values.size());
+    this->indexed = true;
+}
+
+py::object lazyJSON::valueAt(size_t i) {
+    if (this->children[i]) {
+        return this->children[i];
+    }
+
+    span child = this->values[i];
+    char first = (*this->buffer)[child.begin];
+
+    /* Nested objects and arrays are kept so their index is only built once */
+    if (first == '{' || first == '[') {
+        this->children[i] = py::cast(lazyJSON(this->buffer, child.begin, child.end));
+        return this->children[i];
+    }
+
+    return parseJSONValue(this->buffer->data() + child.begin, child.end - child.begin);
+}
+
+size_t lazyJSON::position(const std::string &key) {
+    this->index();
+
+    auto it = this->positions.find(key);
+    return (it == this->positions.end()) ? npos : it->second;
+}
+
+bool lazyJSON::isObject() {
+    return (*this->buffer)[this->value.begin] == '{';
+}
+
+size_t lazyJSON::size() {
+    this->index();
+    return this->values.size();
+}
+
+bool lazyJSON::contains(const std::string &key) {
+    return this->isObject() && this->position(key) != npos;
+}
+
+py::object lazyJSON::get(const std::string &key, py::object fallback) {
+    size_t i = this->isObject() ? this->position(key) : npos;
+    return (i == npos) ? fallback : this->valueAt(i);
+}
+
+py::object lazyJSON::getItem(py::object key) {
+    this->index();
+
+    if (this->isObject()) {
+        if (!py::isinstance<py::str>(key)) {
+            throw py::type_error("JSON object keys must be str");
+        }
+
+        size_t i = this->position(key.cast<std::string>());
+        if (i == npos) {
+            throw py::key_error(key.cast<std::string>());
+        }
+
+        return this->valueAt(i);
+    }
+
+    if (py::isinstance<py::slice>(key)) {
+        size_t start, stop, step, length;
+        if (!key.cast<py::slice>().compute(this->values.size(), &start, &stop, &step, &length)) {
+            throw py::error_already_set();
+        }
+
+        py::list items;
+        for (size_t i = 0; i < length; i++, start += step) {
+            items.append(this->valueAt(start));
+        }
+
+        return items;
+    }
+
+    if (!py::isinstance<py::int_>(key)) {
+        throw py::type_error("JSON array indices must be integers or slices");
+    }
+
+    long long i = key.cast<long long>();
+    if (i < 0) {
+        i += this->values.size();
+    }
+
+    if (i < 0 || i >= static_cast<long long>(this->values.size())) {
+        throw std::out_of_range("JSON array index out of range");
+    }
+
+    return this->valueAt(i);
+}
+
+py::list lazyJSON::getKeys() {
+    this->index();
+
+    py::list keys;
+    for (auto &key : this->keys) {
+        keys.append(py::str(key));
+    }
+
+    return keys;
+}
+
+py::list lazyJSON::getValues() {
+    this->index();
+
+    py::list values;
+    for (size_t i = 0; i < this->values.size(); i++) {
+        values.append(this->valueAt(i));
+    }
+
+    return values;
+}
+
+py::list lazyJSON::getItems() {
+    this->index();
+
+    py::list items;
+    for (size_t i = 0; i < this->keys.size(); i++) {
+        items.append(py::make_tuple(py::str(this->keys[i]), this->valueAt(i)));
+    }
+
+    return items;
+}
+
+py::iterator lazyJSON::iter() {
+    /* Objects iterate over their keys and arrays over their values, like dict and list */
+    return py::iter(this->isObject() ? this->getKeys() : this->getValues());
+}
+
+py::object lazyJSON::toPython() {
+    return parseJSONValue(this->buffer->data() + this->value.begin, this->value.end - this->value.begin);
+}
+
+std::string lazyJSON::raw() {
+    return this->buffer->substr(this->value.begin, this->value.end - this->value.begin);
+}
+
+std::string lazyJSON::repr() {
+    return "<LazyJSON " + std::string(this->isObject() ? "object" : "array") + " of " + std::to_string(this->size()) + (this->isObject() ? " keys>" : " items>");
+}
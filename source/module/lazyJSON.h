@@ -0,0 +1,57 @@
+#ifndef LAZYJSON_H
+#define LAZYJSON_H
+
+#include <memory>
+#include <string>
+#include <vector>
+#include <unordered_map>
+#include <pybind11/pybind11.h>
+
+/*
+Read only view of a JSON object or array in a response body. Nothing is decoded up front, the members of a view are
+indexed the first time one of them is accessed and only the accessed values are decoded. Nested objects and arrays
+are returned as views of the same buffer. Validation happens on access too: only brackets and strings are checked when
+the view is created, a malformed member or value throws std::invalid_argument (ValueError) when it is reached
+*/
+class lazyJSON {
+private:
+    struct span {
+        size_t begin;
+        size_t end;
+    };
+
+    std::shared_ptr<const std::string> buffer;
+    span value;
+
+    /* Built on first access, keys and values in document order. Arrays only use values */
+    bool indexed = false;
+    std::vector<std::string> keys;
+    std::vector<span> values;
+    std::unordered_map<std::string, size_t> positions;
+    std::vector<pybind11::object> children;
+
+    void index();
+    pybind11::object valueAt(size_t i);
+    size_t position(const std::string &key);
+
+public:
+    lazyJSON(std::shared_ptr<const std::string> buffer, size_t begin, size_t end);
+
+    /* Returns a view of text if it holds a JSON object or array, otherwise the value parsed with parseJSON */
+    static pybind11::object fromString(std::string text);
+
+    bool isObject();
+    size_t size();
+    bool contains(const std::string &key);
+    pybind11::object get(const std::string &key, pybind11::object fallback);
+    pybind11::object getItem(pybind11::object key);
+    pybind11::list getKeys();
+    pybind11::list getValues();
+    pybind11::list getItems();
+    pybind11::iterator iter();
+    pybind11::object toPython();
+    std::string raw();
+    std::string repr();
+};
+
+#endif
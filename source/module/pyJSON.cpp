@@ -0,0 +1,203 @@
+#include "pyJSON.h"
+#include <algorithm>
+#include <cstdint>
+#include <stdexcept>
+#include <unordered_map>
+#include <vector>
+#include <nlohmann/json.hpp>
+
+namespace py = pybind11;
+
+namespace {
+
+/*
+SAX handler for nlohmann::json::sax_parse that builds Python objects as the document is read, the lexer checks the
+JSON grammar and UTF-8 and joins surrogate pairs. Containers are added to their parent when they are opened, so the
+stack only holds borrowed references. Dict keys are decoded once per document
+*/
+class pyJSONBuilder {
+private:
+    PyObject *result = nullptr;
+    PyObject *pendingKey = nullptr;
+    std::vector<PyObject*> stack;
+
+    /* Keys repeat across the objects of a response */
+    std::unordered_map<std::string, PyObject*> keyCache;
+
+    static const size_t MAX_DEPTH = 512;
+
+    /* Takes over the reference to value */
+    bool add(PyObject *value) {
+        if (!value) {
+            return false;
+        }
+
+        if (this->stack.empty()) {
+            this->result = value;
+            return true;
+        }
+
+        PyObject *parent = this->stack.back();
+        int status = PyList_Check(parent) ? PyList_Append(parent, value) : PyDict_SetItem(parent, this->pendingKey, value);
+
+        Py_DECREF(value);
+        Py_CLEAR(this->pendingKey);
+
+        return status == 0;
+    }
+
+    bool open(PyObject *container) {
+        if (!container || this->stack.size() >= MAX_DEPTH) {
+            Py_XDECREF(container);
+            return false;
+        }
+
+        if (!this->add(container)) {
+            return false;
+        }
+
+        this->stack.push_back(container);
+        return true;
+    }
+
+public:
+    ~pyJSONBuilder() {
+        Py_XDECREF(this->result);
+        Py_XDECREF(this->pendingKey);
+
+        for (auto &key : this->keyCache) {
+            Py_DECREF(key.second);
+        }
+    }
+
+    /* Returns a new reference to the parsed document */
+    PyObject *release() {
+        PyObject *result = this->result;
+        this->result = nullptr;
+
+        return result;
+    }
+
+    bool null() {
+        Py_INCREF(Py_None);
+        return this->add(Py_None);
+    }
+
+    bool boolean(bool value) {
+        return this->add(PyBool_FromLong(value));
+    }
+
+    bool number_integer(std::int64_t value) {
+        return this->add(PyLong_FromLongLong(value));
+    }
+
+    bool number_unsigned(std::uint64_t value) {
+        return this->add(PyLong_FromUnsignedLongLong(value));
+    }
+
+    /* Integers too large for 64 bits are passed on as floats, their text is used so they stay exact like json.loads */
+    bool number_float(double value, const std::string &text) {
+        if (text.find_first_of(".eE") == std::string::npos) {
+            return this->add(PyLong_FromString(text.c_str(), nullptr, 10));
+        }
+
+        return this->add(PyFloat_FromDouble(value));
+    }
+
+    bool string(std::string &value) {
+        return this->add(PyUnicode_DecodeUTF8(value.data(), value.size(), "strict"));
+    }
+
+    /* Only called for binary formats like CBOR, never for JSON text */
+    template <typename Binary>
+    bool binary(Binary &) {
+        return false;
+    }
+
+    bool start_object(size_t) {
+        return this->open(PyDict_New());
+    }
+
+    bool key(std::string &value) {
+        auto it = this->keyCache.find(value);
+        if (it != this->keyCache.end()) {
+            Py_INCREF(it->second);
+            this->pendingKey = it->second;
+            return true;
+        }
+
+        PyObject *key = PyUnicode_DecodeUTF8(value.data(), value.size(), "strict");
+        if (!key) {
+            return false;
+        }
+
+        PyUnicode_InternInPlace(&key);
+        Py_INCREF(key);
+        this->keyCache.emplace(value, key);
+        this->pendingKey = key;
+
+        return true;
+    }
+
+    bool end_object() {
+        this->stack.pop_back();
+        return true;
+    }
+
+    bool start_array(size_t) {
+        return this->open(PyList_New(0));
+    }
+
+    bool end_array() {
+        this->stack.pop_back();
+        return true;
+    }
+
+    bool parse_error(size_t, const std::string &, const nlohmann::detail::exception &) {
+        return false;
+    }
+};
+
+}
+
+py::object parseJSON(const std::string &text) {
+    return parseJSON(text.data(), text.size());
+}
+
+/* Returns a new reference, or nullptr with no Python error set if the text is not valid JSON */
+static PyObject *parse(const char *data, size_t size) {
+    PyObject *result = nullptr;
+
+    {
+        pyJSONBuilder builder;
+        if (nlohmann::json::sax_parse(data, data + size, &builder)) {
+            result = builder.release();
+        }
+    }
+
+    if (!result) {
+        PyErr_Clear();
+    }
+
+    return result;
+}
+
+py::object parseJSON(const char *data, size_t size) {
+    PyObject *result = parse(data, size);
+
+    if (!result) {
+        return py::str(data, size);
+    }
+
+    return py::reinterpret_steal<py::object>(result);
+}
+
+py::object parseJSONValue(const char *data, size_t size) {
+    PyObject *result = parse(data, size);
+
+    if (!result) {
+        throw std::invalid_argument("Received malformed JSON value " + std::string(data, std::min<size_t>(size, 64)));
+    }
+
+    return py::reinterpret_steal<py::object>(result);
+}
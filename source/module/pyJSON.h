@@ -0,0 +1,18 @@
+#ifndef PYJSON_H
+#define PYJSON_H
+
+#include <string>
+#include <pybind11/pybind11.h>
+
+/*
+Builds Python objects straight from a UTF-8 JSON document, without creating a Python str of the whole document
+first. Returns the text as a str if it is not valid JSON, invalid UTF-8 raises UnicodeDecodeError like the default
+response mode. The GIL must be held
+*/
+pybind11::object parseJSON(const std::string &text);
+pybind11::object parseJSON(const char *data, size_t size);
+
+/* Like parseJSON, but throws std::invalid_argument (ValueError in Python) if the text is not valid JSON */
+pybind11::object parseJSONValue(const char *data, size_t size);
+
+#endif
@@ -0,0 +1,50 @@
+#include "rateLimiter.h"
+#include <thread>
+#include <algorithm>
+
+rateLimiter::rateLimiter(double rate, int burst) : RATE(rate), BURST(std::max(burst, 1)), tokens(std::max(burst, 1)) {
+    this->last = std::chrono::steady_clock::now();
+    this->pausedUntil = this->last;
+}
+
+double rateLimiter::tryAcquire() {
+    /* Takes a token and returns 0, or returns the number of seconds to wait before one is available */
+    std::lock_guard<std::mutex> lock(this->limiterMutex);
+    auto now = std::chrono::steady_clock::now();
+
+    if (now < this->pausedUntil) {
+        return std::chrono::duration<double>(this->pausedUntil - now).count();
+    }
+
+    double elapsed = std::max(0.0, std::chrono::duration<double>(now - this->last).count());
+    this->tokens = std::min(this->BURST, this->tokens + elapsed * this->RATE);
+    this->last = now;
+
+    if (this->tokens >= 1) {
+        this->tokens -= 1;
+        return 0;
+    }
+
+    return (1 - this->tokens) / this->RATE;
+}
+
+void rateLimiter::acquire() {
+    double wait;
+
+    while ((wait = this->tryAcquire()) > 0) {
+        std::this_thread::sleep_for(std::chrono::duration<double>(wait));
+    }
+}
+
+void rateLimiter::pause(double seconds) {
+    /* Called on a 429, holds every request until Retry-After has passed and then restarts from an empty bucket */
+    std::lock_guard<std::mutex> lock(this->limiterMutex);
+    auto until = std::chrono::steady_clock::now() + std::chrono::duration_cast<std::chrono::steady_clock::duration>(std::chrono::duration<double>(seconds));
+
+    if (until > this->pausedUntil) {
+        this->pausedUntil = until;
+    }
+
+    this->tokens = 0;
+    this->last = this->pausedUntil;
+}
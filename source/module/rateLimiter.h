@@ -0,0 +1,25 @@
+#ifndef RATELIMITER_H
+#define RATELIMITER_H
+
+#include <mutex>
+#include <chrono>
+
+/* Token bucket shared by every request of a client, refilled at RATE tokens per second up to BURST tokens */
+class rateLimiter {
+private:
+    double RATE;
+    double BURST;
+    double tokens;
+    std::chrono::steady_clock::time_point last;
+    std::chrono::steady_clock::time_point pausedUntil;
+    std::mutex limiterMutex;
+
+public:
+    rateLimiter(double rate, int burst);
+
+    double tryAcquire();
+    void acquire();
+    void pause(double seconds);
+};
+
+#endif
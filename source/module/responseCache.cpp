@@ -0,0 +1,101 @@
+#include "responseCache.h"
+
+responseCache::responseCache(size_t maxBytes, std::map<std::string, int> ttls, int defaultTTL) : MAX_BYTES(maxBytes), DEFAULT_TTL(defaultTTL), TTLS(ttls) {}
+
+std::string responseCache::endpoint(std::string targetURL) {
+    /*
+    https://api.spotify.com/v1/albums/{id}/tracks?... -> albums. Every request under me/, i.e. me/player or the saved
+    tracks at me/tracks, is me whatever follows, so the current user's data never takes the TTL of a catalog endpoint
+    */
+    size_t start = targetURL.find("/v1/");
+    start = (start == std::string::npos) ? 0 : start + 4;
+
+    std::string path = targetURL.substr(start, targetURL.find('?', start) - start);
+    return path.substr(0, path.find('/'));
+}
+
+int responseCache::ttl(std::string targetURL) {
+    auto it = this->TTLS.find(this->endpoint(targetURL));
+    return (it == this->TTLS.end()) ? this->DEFAULT_TTL : it->second;
+}
+
+static size_t entrySize(std::string &targetURL, cachedResponse &entry) {
+    return targetURL.size() + entry.res.size() + entry.etag.size() + entry.lastModified.size();
+}
+
+void responseCache::erase(std::list<cacheEntry>::iterator it) {
+    this->bytes -= entrySize(it->targetURL, it->response);
+    this->index.erase(it->targetURL);
+    this->entries.erase(it);
+}
+
+bool responseCache::get(std::string targetURL, cachedResponse &entry, bool stale) {
+    std::lock_guard<std::mutex> lock(this->cacheMutex);
+
+    auto it = this->index.find(targetURL);
+    if (it == this->index.end()) {
+        return false;
+    }
+
+    /* Expired entries with an ETag or Last-Modified value are kept so they can be revalidated with a conditional request */
+    if (it->second->expires <= std::chrono::steady_clock::now()) {
+        bool validators = it->second->response.etag != "" || it->second->response.lastModified != "";
+
+        if (!validators) {
+            this->erase(it->second);
+            return false;
+        }
+        else if (!stale) {
+            /* Only the validators are copied, the caller sends them with the request that replaces the entry */
+            entry.etag = it->second->response.etag;
+            entry.lastModified = it->second->response.lastModified;
+            return false;
+        }
+    }
+
+    this->entries.splice(this->entries.begin(), this->entries, it->second);
+    entry = it->second->response;
+    return true;
+}
+
+void responseCache::put(std::string targetURL, cachedResponse entry) {
+    int seconds = this->ttl(targetURL);
+    size_t entryBytes = entrySize(targetURL, entry);
+
+    if (seconds <= 0 || entryBytes > this->MAX_BYTES) {
+        return;
+    }
+
+    std::lock_guard<std::mutex> lock(this->cacheMutex);
+
+    auto it = this->index.find(targetURL);
+    if (it != this->index.end()) {
+        this->erase(it->second);
+    }
+
+    this->entries.push_front(cacheEntry{targetURL, entry, std::chrono::steady_clock::now() + std::chrono::seconds(seconds)});
+    this->index[targetURL] = this->entries.begin();
+    this->bytes += entryBytes;
+
+    while (this->bytes > this->MAX_BYTES) {
+        this->erase(std::prev(this->entries.end()));
+    }
+}
+
+void responseCache::clear() {
+    std::lock_guard<std::mutex> lock(this->cacheMutex);
+
+    this->entries.clear();
+    this->index.clear();
+    this->bytes = 0;
+}
+
+size_t responseCache::getBytes() {
+    std::lock_guard<std::mutex> lock(this->cacheMutex);
+    return this->bytes;
+}
+
+size_t responseCache::getSize() {
+    std::lock_guard<std::mutex> lock(this->cacheMutex);
+    return this->entries.size();
+}
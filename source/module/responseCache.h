@@ -0,0 +1,56 @@
+#ifndef RESPONSECACHE_H
+#define RESPONSECACHE_H
+
+#include <map>
+#include <list>
+#include <mutex>
+#include <chrono>
+#include <string>
+#include <unordered_map>
+
+/*
+Cached response body with the validators sent back by the API, used for conditional requests once the entry expires.
+A lookup that misses on an expired entry still fills in etag and lastModified, without copying the body
+*/
+struct cachedResponse {
+    std::string res;
+    std::string etag;
+    std::string lastModified;
+};
+
+/* In-memory LRU cache of API responses, keyed on the request URL */
+class responseCache {
+private:
+    struct cacheEntry {
+        std::string targetURL;
+        cachedResponse response;
+        std::chrono::steady_clock::time_point expires;
+    };
+
+    size_t MAX_BYTES;
+    size_t bytes = 0;
+    int DEFAULT_TTL;
+    std::map<std::string, int> TTLS;
+
+    /* Most recently used entries are kept at the front */
+    std::list<cacheEntry> entries;
+    std::unordered_map<std::string, std::list<cacheEntry>::iterator> index;
+    std::mutex cacheMutex;
+
+    void erase(std::list<cacheEntry>::iterator it);
+
+public:
+    responseCache(size_t maxBytes, std::map<std::string, int> ttls = std::map<std::string, int>(), int defaultTTL = 3600);
+
+    static std::string endpoint(std::string targetURL);
+    int ttl(std::string targetURL);
+
+    bool get(std::string targetURL, cachedResponse &entry, bool stale = false);
+    void put(std::string targetURL, cachedResponse entry);
+    void clear();
+
+    size_t getBytes();
+    size_t getSize();
+};
+
+#endif
@@ -0,0 +1,116 @@
+#include "tokenStore.h"
+#include <cerrno>
+#include <chrono>
+#include <cstring>
+#include <ctime>
+#include <stdexcept>
+#include <thread>
+#include <fcntl.h>
+#include <unistd.h>
+#include <sys/file.h>
+#include <nlohmann/json.hpp>
+
+/* Open descriptor of the store file, unlocked and closed when it goes out of scope */
+struct storeFile {
+    int fd;
+    bool locked = false;
+
+    ~storeFile() {
+        if (this->locked) {
+            flock(this->fd, LOCK_UN);
+        }
+
+        close(this->fd);
+    }
+};
+
+static int openStore(const std::string &path) {
+    /* Only the owner can read the file, it holds credentials */
+    int fd = open(path.c_str(), O_RDWR | O_CREAT | O_CLOEXEC, 0600);
+    if (fd < 0) {
+        throw std::runtime_error("Could not open token store at " + path + ": " + std::strerror(errno));
+    }
+
+    return fd;
+}
+
+tokenStore::tokenStore(std::string path) : PATH(path) {
+    close(openStore(path));
+}
+
+/*
+Takes the exclusive lock, polling with a growing backoff for up to LOCK_TIMEOUT seconds. Returns false if another
+process held it all that time
+*/
+static bool lockStore(int fd, const std::string &path, int timeout) {
+    auto deadline = std::chrono::steady_clock::now() + std::chrono::seconds(timeout);
+    auto backoff = std::chrono::milliseconds(5);
+
+    while (flock(fd, LOCK_EX | LOCK_NB) != 0) {
+        if (errno != EWOULDBLOCK && errno != EINTR) {
+            throw std::runtime_error("Could not lock token store at " + path + ": " + std::strerror(errno));
+        }
+
+        if (std::chrono::steady_clock::now() >= deadline) {
+            return false;
+        }
+
+        std::this_thread::sleep_for(backoff);
+        backoff = std::min(backoff * 2, std::chrono::milliseconds(200));
+    }
+
+    return true;
+}
+
+tokenStore::entry tokenStore::fetch(std::string key, std::string current, int minValidity, std::function<entry(const entry&)> request) {
+    storeFile file {openStore(this->PATH)};
+    file.locked = lockStore(file.fd, this->PATH, LOCK_TIMEOUT);
+
+    std::string text;
+    char buffer[4096];
+    ssize_t n;
+    while ((n = read(file.fd, buffer, sizeof(buffer))) > 0) {
+        text.append(buffer, n);
+    }
+
+    /* A file that is empty or was left half written is treated as holding no tokens */
+    nlohmann::json tokens = nlohmann::json::parse(text, nullptr, false);
+    if (!tokens.is_object()) {
+        tokens = nlohmann::json::object();
+    }
+
+    entry stored;
+    if (tokens.contains(key) && tokens[key].is_object()) {
+        stored.token = tokens[key].value("token", "");
+        stored.refreshToken = tokens[key].value("refresh_token", "");
+        stored.expires = tokens[key].value("expires", 0LL);
+    }
+
+    if (stored.token != "" && stored.token != current && stored.expires - std::time(nullptr) > minValidity) {
+        return stored;
+    }
+
+    entry fresh = request(stored);
+
+    /*
+    Refused requests are not stored, the next lookup requests a token again. Neither are tokens requested without the
+    lock, the process holding it may be writing the file
+    */
+    if (!file.locked || fresh.token == "" || fresh.token == "null") {
+        return fresh;
+    }
+
+    tokens[key] = {{"token", fresh.token}, {"refresh_token", fresh.refreshToken}, {"expires", fresh.expires}};
+    std::string out = tokens.dump();
+
+    /* A failed write only costs other processes a token request of their own */
+    if (ftruncate(file.fd, 0) == 0 && pwrite(file.fd, out.data(), out.size(), 0) < 0) {
+        ftruncate(file.fd, 0);
+    }
+
+    return fresh;
+}
+
+std::string tokenStore::getPath() {
+    return this->PATH;
+}
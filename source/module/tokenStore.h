@@ -0,0 +1,38 @@
+#ifndef TOKENSTORE_H
+#define TOKENSTORE_H
+
+#include <functional>
+#include <string>
+
+/*
+File backed store of access and refresh tokens, keyed on the client ID and shared by every process that opens the same
+file. Each lookup holds an exclusive advisory lock on the file until it returns, so processes that need a token at the
+same moment wait for the first one to request it and then reuse it instead of sending requests of their own. A process
+that can not take the lock within LOCK_TIMEOUT seconds reads the file without it, and requests a token of its own
+without storing it if there is no valid one. Token requests time out well within LOCK_TIMEOUT
+*/
+class tokenStore {
+private:
+    std::string PATH;
+
+    static const int LOCK_TIMEOUT = 45;
+
+public:
+    struct entry {
+        std::string token;
+        std::string refreshToken;
+        long long expires = 0;
+    };
+
+    tokenStore(std::string path);
+
+    /*
+    Returns the stored token for key if it is valid for more than minValidity seconds and is not current, the token the
+    caller wants to replace. Otherwise calls request with the stored entry and stores the token it returns
+    */
+    entry fetch(std::string key, std::string current, int minValidity, std::function<entry(const entry&)> request);
+
+    std::string getPath();
+};
+
+#endif
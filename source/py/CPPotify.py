@@ -1,13 +1,22 @@
 import sys
 import os
+import re
 import json
+import asyncio
+import inspect
+import itertools
+import weakref
 import warnings
 import webbrowser
 from datetime import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 sys.path.insert(0, os.path.join(os.path.abspath('../../'), 'build/'))
 import pybind11module
 import CPPotify_exceptions
+import CPPotify_models
+import CPPotify_export
 
 
 class CPPotify:
@@ -29,6 +38,17 @@ class CPPotify:
         cpp.oAuth_flow('url after enabling auth') 
         cpp.get_albums('spotify id for album you want to request', 'tracks')
 
+    Example token store shared between worker processes, which reuse a valid token instead of requesting their own:
+
+        cpp = CPPotify('your client id', 'your client secret', token_store = '/var/tmp/cppotify-tokens.json')
+
+    Example thread pool sharing one client. Requests release the GIL and the token is renewed by one thread at a time
+    while the others keep using the current one. Finish oAuth_flow before sharing the client, it replaces the C++ object:
+
+        cpp = CPPotify('your client id', 'your client secret')
+        with ThreadPoolExecutor(max_workers = 16) as pool:
+            tracks = list(pool.map(cpp.get_tracks, track_ids))
+
     get_albums: Get Spotify Album tracks/attributes
     get_artists: Get Spotify Artist details
     get_episodes: Get Spotify Episode attributes
@@ -39,11 +59,67 @@ class CPPotify:
     get_player: Get Spotify Player information. To interfact with the player, refer to other _player methods
     search: Use the Spotify API search functionality 
     browse: View information from the Spotify 'Browse' page
-
-    _token_check: Spotify API tokens are currently set to expire after 60 mintues - this function will auto-renew tokens 
+    get_many: Run several of the GET methods above concurrently
+    enable_cache: Cache GET responses in memory with per-endpoint expiry
+    enable_disk_cache: Cache GET responses in a SQLite file shared between processes
+    set_rate_limit: Limit the request rate, 429 Too Many Requests responses are waited out with or without it
+    set_retry_policy: Retry connection errors and server errors with exponential backoff
+    iter_pages: Iterate over the pages of a paginated request, requesting the remaining pages concurrently
+    iter_items: Iterate over the items of a paginated request
+    export_items: Stream the items of a paginated request to an NDJSON or Parquet file
+    get_audio_features_matrix: Get the audio features of many tracks as NumPy columns
+    get_audio_analysis_arrays: Get the audio analysis of tracks with segments, beats and the other lists as NumPy arrays
+    set_response_mode: Decode responses in C++ instead of with json.loads, return lazily decoded LazyJSON views or raw bytes
+    set_result_models: Return tracks, albums, artists, playlists and audio features as compact slotted classes
     """
 
-    def __init__(self, CLIENT_ID, CLIENT_SECRET, REDIRECT_URI = "", STATE = "", SCOPE = "", SHOW_DIALOG: bool = False, debug_toggle = False):
+    _url_methods = {
+        'albums': ('get_albums', 'getAlbumsURL'),
+        'artists': ('get_artists', 'getArtistsURL'),
+        'episodes': ('get_episodes', 'getEpisodesURL'),
+        'player': ('get_player', 'getPlayerURL'),
+        'playlists': ('get_playlists', 'getPlaylistsURL'),
+        'profiles': ('get_profiles', 'getProfilesURL'),
+        'shows': ('get_shows', 'getShowsURL'),
+        'tracks': ('get_tracks', 'getTracksURL'),
+        'search': ('search', 'searchURL'),
+        'browse': ('browse', 'browseURL')
+    }
+
+    # Start of an error body, checked on the undecoded responses of the 'bytes' and 'buffer' response modes
+    _raw_error = re.compile(rb'\s*\{\s*"error"\s*:')
+
+    # Highest offset plus limit an endpoint serves, pages past it are refused with a 400 even when total is larger
+    _max_offsets = {
+        'search': 1000
+    }
+
+    _batch_sizes = {
+        'albums': 20,
+        'artists': 50,
+        'episodes': 50,
+        'shows': 50,
+        'tracks': 50,
+        'audio-features': 100
+    }
+
+    _cache_ttls = {
+        'albums': 6 * 3600,
+        'artists': 6 * 3600,
+        'tracks': 6 * 3600,
+        'audio-features': 6 * 3600,
+        'audio-analysis': 6 * 3600,
+        'episodes': 6 * 3600,
+        'shows': 6 * 3600,
+        'users': 3600,
+        'playlists': 300,
+        'browse': 3600,
+        'search': 600,
+        'player': 0,
+        'me': 0
+    }
+
+    def __init__(self, CLIENT_ID, CLIENT_SECRET, REDIRECT_URI = "", STATE = "", SCOPE = "", SHOW_DIALOG: bool = False, debug_toggle = False, token_store = None):
         self.CLIENT_ID = CLIENT_ID 
         self.CLIENT_SECRET = CLIENT_SECRET
         self.REDIRECT_URI = REDIRECT_URI 
@@ -51,10 +127,13 @@ class CPPotify:
         self.SCOPE = SCOPE 
         self.SHOW_DIALOG = SHOW_DIALOG
         self.debug = debug_toggle
+        # File that tokens are kept in and shared through with other processes, locked while a token is requested
+        self._token_store = pybind11module.TokenStore(token_store) if token_store else None
         self.auth_url = None
-        self.TOKEN = None
         self.oAuth = None
         self.oAuthToken = None
+        self._cpp_settings = {}
+        self._result_models = False
 
         if REDIRECT_URI != "" and STATE != "" and SCOPE != "":
             # self.oAuth = oAuth(self.CLIENT_ID, self.CLIENT_SECRET, self.REDIRECT_URI, self.STATE, self.SCOPE, self.SHOW_DIALOG)
@@ -77,10 +156,23 @@ class CPPotify:
             self._cpp_obj = None
             
         else:
-            self._cpp_obj = pybind11module.CPPotify(self.CLIENT_ID, self.CLIENT_SECRET)
-            self.TOKEN = self._cpp_obj.getToken()
-        
-        self.TOKEN_start = datetime.now()
+            # Returns at once, the token is requested by the first request that needs it
+            self._cpp_obj = pybind11module.CPPotify(self.CLIENT_ID, self.CLIENT_SECRET, self._token_store)
+
+    @property
+    def TOKEN(self):
+        """
+        Current Spotify token, renewed by the C++ object in the background. Empty until the first token request completes
+        """
+        return self._cpp_obj.getToken() if self._cpp_obj else None
+
+    @property
+    def TOKEN_start(self):
+        """
+        Time the current token was received, as a datetime. None until the first token request completes
+        """
+        issued = self._cpp_obj.getTokenIssuedAt() if self._cpp_obj else 0
+        return datetime.fromtimestamp(issued) if issued else None
 
     def open_auth_url(self):
         if self.auth_url:
@@ -100,7 +192,10 @@ class CPPotify:
             except:
                 return "Invalid redirect URL"
 
-            self._cpp_obj = pybind11module.CPPotify(self.CLIENT_ID, self.CLIENT_SECRET, self.auth_token, self.REDIRECT_URI, self.STATE, self.SCOPE, self.SHOW_DIALOG)
+            self._cpp_obj = pybind11module.CPPotify(self.CLIENT_ID, self.CLIENT_SECRET, self.auth_token, self.REDIRECT_URI, self.STATE, self.SCOPE, self.SHOW_DIALOG, self._token_store)
+
+            for method, args in list(self._cpp_settings.items()):
+                getattr(self._cpp_obj, method)(*args)
         '''             
         self.oAuth.set_oAuth_token(url)
         self.oAuth.set_token()
@@ -114,7 +209,8 @@ class CPPotify:
         """
         Return information about Spotify albums
 
-        :param album_id: Spotify album ID for the album that information will be returned from. Can be a list object containing up to 20 IDs 
+        :param album_id: Spotify album ID for the album that information will be returned from. Can be a list object, lists longer
+                         than 20 IDs are split into batches that are requested concurrently and merged in input order
         :param album_obj: Album object, must be set to 'tracks'. Takes no value if returning playlist objects
         :param limit: Limit the amount of results returned, min 0, max 50, default 50
         :param offset: Offset results based on popularity, i.e. offset of 5 will list the 6th most popular results onwards, default 0. 
@@ -123,9 +219,10 @@ class CPPotify:
         :returns Call to relevant C++ class method 
     
         :raises ValueError if album_obj is not 'tracks'
-        :raises ValueError if length of multiple album_id's is greater than 50
         """
-        self._token_check()
+        merged = self._get_batched('albums', [album_id, album_obj, limit, offset])
+        if merged is not None:
+            return merged
         
         if type(album_id) == list:
             call = self._cpp_obj.getAlbums("%2C".join([id for id in album_id]), album_obj, limit, offset)
@@ -143,7 +240,8 @@ class CPPotify:
         """
         Return information about Spotify artists
 
-        :param artist_id: Spotify artist ID for the artist that information will be returned from. Can be a list object containing up to 50 IDs  
+        :param artist_id: Spotify artist ID for the artist that information will be returned from. Can be a list object, lists longer
+                          than 50 IDs are split into batches that are requested concurrently and merged in input order
         :param artist_obj: Artist object, must be albums, top-tracks or related-tracks. Takes no value if returning playlist objects
         :param include_groups: When returning an artists' albums, use this to filter for the type of albums to return i.e. pass the string 'album,single'
                                to only return an artists albums and singles
@@ -154,9 +252,10 @@ class CPPotify:
         :returns Call to relevant C++ class method
 
         :raises ValueError if artist_obj is not 'albums', 'top-tracks' or 'related-tracks'
-        :raises ValueError if length of mulitple artist_id's is greater than 50
         """
-        self._token_check()
+        merged = self._get_batched('artists', [artist_id, artist_obj, include_groups, limit, offset])
+        if merged is not None:
+            return merged
         
         if type(artist_id) == list:
             call = self._cpp_obj.getArtists("%2C".join([id for id in artist_id]), artist_obj, include_groups, limit, offset)
@@ -174,13 +273,14 @@ class CPPotify:
         """
         Return information about Spotify Playlist Episodes
 
-        :param episode_id: Episode ID for the episode that information will be returned be returned from. Can be a list object containing up to 50 IDs 
+        :param episode_id: Episode ID for the episode that information will be returned be returned from. Can be a list object, lists
+                           longer than 50 IDs are split into batches that are requested concurrently and merged in input order
 
         :returns Call to relevant C++ class method
-
-        :raises ValueError if length of multiple episode_id's is greater than 50      
         """
-        self._token_check()
+        merged = self._get_batched('episodes', [episode_id])
+        if merged is not None:
+            return merged
 
         if type(episode_id) == list:
             call = self._cpp_obj.getEpisodes(",".join([id for id in episode_id]))
@@ -207,8 +307,6 @@ class CPPotify:
 
         :raises ValueError if player_obj is not 'devices', 'currently-playing' or 'recently-played'
         """
-        self._token_check()
-        
         call = self._cpp_obj.getPlayer(player_obj)
 
         return self._parse_errors(
@@ -244,8 +342,6 @@ class CPPotify:
         :raises ValueError if playlist_obj is not 'tracks' or 'images'
         :raises ValueError if get_own_playlists is True and any Spotify IDs
         """
-        self._token_check()
-
         call = self._cpp_obj.getPlaylists(get_own_playlists, user_id, playlist_id, playlist_obj, fields, limit, offset)
 
         return self._parse_errors(
@@ -264,8 +360,6 @@ class CPPotify:
 
         :returns Call to relevant C++ class method
         """
-        self._token_check()
-
         return self._parse_errors(
             self._cpp_obj.getProfiles(get_own_profile, user_id)[1],
             'profiles',
@@ -277,14 +371,15 @@ class CPPotify:
         """
         Return information about Spotify Shows
 
-        :param show_id: Show ID for the show that information will be returned be returned from. Can be a list object containing up to 50 IDs       
+        :param show_id: Show ID for the show that information will be returned be returned from. Can be a list object, lists longer
+                        than 50 IDs are split into batches that are requested concurrently and merged in input order
         :param show_obj: Used if returning a show's episodes, enter the value 'episodes' which will replace the default value of null
 
         :returns Call to relevant C++ class method
-
-        :raises ValueError if length of multiple show_id's is greater than 50
         """
-        self._token_check()
+        merged = self._get_batched('shows', [show_id, show_obj])
+        if merged is not None:
+            return merged
 
         if type(show_id) == list:
             call = self._cpp_obj.getShows("%2C".join([id for id in show_id]), show_obj)
@@ -303,15 +398,17 @@ class CPPotify:
         Return information about Spotify songs/tracks
 
         :param track_id: Identifies the song/track for which information will be requested. If requesting for multiple tracks, input a 
-                       list of IDs
+                       list of IDs. Lists longer than 50 IDs (100 for audio-features) are split into batches that are requested
+                       concurrently and merged in input order
         :param track_obj: Optional, can be either 'audio-analysis' or 'audio-features'. If left blank will return track information
 
         :returns Call to relevant C++ class method
 
         :raises ValueError if track_obj is not 'audio-analysis', 'audio-features' or 'tracks'
-        :raises ValueError if length of multiple track_id's is greater than 50
         """
-        self._token_check()
+        merged = self._get_batched('tracks', [track_id, track_obj])
+        if merged is not None:
+            return merged
 
         if type(track_id) == list:
             call = self._cpp_obj.getTracks("%2C".join([id for id in track_id]), track_obj)
@@ -337,8 +434,6 @@ class CPPotify:
         :param offset: Offset results based on popularity, i.e. offset of 5 will list the 6th most popular results onwards, default 0,
                        max 2000. Can be used with the limit argument to parse search result pages
         """
-        self._token_check()
-
         call = self._cpp_obj.browse(browse_category, category_id, category_obj, str(timestamp).replace(' ', 'T').replace(':', '%3A').split('.')[0], limit, offset)
 
         return self._parse_errors(
@@ -368,8 +463,6 @@ class CPPotify:
         :raises ValueError if both query and filt are empty
         :raises ValueError if obj_type values are not 'album', 'artist', 'playlist', 'track', 'show', or 'episode'
         """
-        self._token_check()
-
         if type(obj_type) == list:
             call = self._cpp_obj.search(query, "%2C".join([typ for typ in obj_type]), filt, limit, offset)
         else:
@@ -382,6 +475,177 @@ class CPPotify:
             datetime.now()
         ) 
 
+    def get_many(self, requests: list, max_concurrency = 16):
+        """
+        Run several GET requests at the same time and return the responses in the order the requests were given
+
+        :param requests: List of requests, each a tuple of the Spotify object followed by the arguments of the matching method
+                         i.e. [('albums', 'album id', 'tracks'), ('tracks', ['track id', 'track id'], 'audio-features')].
+                         Spotify object must be one of 'albums', 'artists', 'episodes', 'player', 'playlists', 'profiles', 'shows',
+                         'tracks', 'search' or 'browse'. Keyword arguments can be passed as a dictionary in the last position
+                         i.e. ('artists', 'artist id', {'artist_obj': 'albums'})
+        :param max_concurrency: Maximum number of requests in flight at once, default 16
+
+        :returns List of responses, one for each request
+
+        :raises ValueError if a request uses a Spotify object that is not listed above
+        """
+        urls = [self._request_url(*self._split_request(request)) for request in requests]
+        calls = self._cpp_obj.getMany(urls, max_concurrency)
+
+        return [self._parse_errors(
+                    call[1],
+                    request[0],
+                    call[0],
+                    datetime.now()
+                ) for request, call in zip(requests, calls)]
+
+    def iter_pages(self, obj, *args, max_concurrency = 16, **kwargs):
+        """
+        Iterate over the pages of a paginated GET request, i.e. a playlist's tracks, an artist's albums, an album's tracks,
+        search results or browse results. Once the first page gives the total, the remaining pages are requested
+        concurrently in the background while the first one is being used, a few times max_concurrency pages at a time
+        so memory use does not grow with the number of pages. Pages without a total are followed through their next
+        link, with the next page requested while the current one is being used. Searches stop after the first 1000
+        results, the most the endpoint serves. A page that holds an error raises it and ends the iteration
+
+        :param obj: Spotify object of the GET method, i.e. 'playlists' for get_playlists
+        :param args: Positional arguments for the GET method
+        :param max_concurrency: Maximum number of page requests in flight at once, default 16
+        :param kwargs: Keyword arguments for the GET method
+
+        :returns Generator of paging objects, each holding the items, offset, limit, total and next link of one page.
+                 Searches for several object types yield all pages of one type before the next
+
+        :raises ValueError if the response is not paginated
+        """
+        response = self._decoded(self._get_url(obj, self._request_url(obj, args, kwargs)))
+        executor = ThreadPoolExecutor(max_workers = 1)
+
+        try:
+            for key in self._paging_keys(response):
+                page = response[key] if key else response
+                urls = self._page_urls(obj, page)
+
+                if urls:
+                    # The next window of pages is requested while the current one is being used
+                    size = self._page_window(max_concurrency, urls)
+                    windows = [urls[i:i + size] for i in range(0, len(urls), size)]
+                    prefetch = executor.submit(self._get_urls, obj, windows[0], max_concurrency)
+                    yield page
+
+                    for i in range(len(windows)):
+                        results = prefetch.result()
+                        if i + 1 < len(windows):
+                            prefetch = executor.submit(self._get_urls, obj, windows[i + 1], max_concurrency)
+
+                        for result in results:
+                            yield self._paging(result, key)
+
+                    continue
+
+                while page:
+                    prefetch = executor.submit(self._get_url, obj, page['next']) if page.get('next') else None
+                    yield page
+                    page = self._paging(prefetch.result(), key) if prefetch else None
+        finally:
+            executor.shutdown(wait = False)
+
+    def iter_items(self, obj, *args, max_concurrency = 16, **kwargs):
+        """
+        Iterate over the items of a paginated GET request, see iter_pages
+
+        :returns Generator of items across every page
+        """
+        for page in self.iter_pages(obj, *args, max_concurrency = max_concurrency, **kwargs):
+            yield from page['items']
+
+    def export_items(self, path, obj, *args, format = 'ndjson', compression = None, row_group_size = 10000, max_concurrency = 16, **kwargs):
+        """
+        Stream every item of a paginated GET request to a file, see iter_pages. Items are written as their pages
+        arrive, so memory use stays the same however many items there are
+
+        :param path: Output file path
+        :param obj: Spotify object of the GET method, i.e. 'playlists' for get_playlists
+        :param args: Positional arguments for the GET method
+        :param format: 'ndjson' to write one JSON object per line (default), or 'parquet' to write row groups with
+                       nested objects flattened into dotted columns i.e. track.album.name and lists stored as JSON
+                       strings. Parquet rows are spooled to a temporary file and the file is written when the last page
+                       has arrived, with the columns of every item. Parquet requires pyarrow
+        :param compression: 'gzip' to compress NDJSON, which is the default for paths ending in .gz. For Parquet any
+                            codec pyarrow supports, default 'snappy'
+        :param row_group_size: Rows per Parquet row group, default 10000
+        :param max_concurrency: Maximum number of page requests in flight at once, default 16
+        :param kwargs: Keyword arguments for the GET method
+
+        :returns Number of items written
+
+        :raises ValueError if format is not 'ndjson' or 'parquet', the response is not paginated, or a Parquet column
+                holds values of types that can not be stored together, i.e. strings and numbers
+        """
+        writer = CPPotify_export.open_writer(path, format, compression, row_group_size)
+        count = 0
+
+        try:
+            for item in self.iter_items(obj, *args, max_concurrency = max_concurrency, **kwargs):
+                writer.write(item)
+                count += 1
+        finally:
+            writer.close()
+
+        return count
+
+    def get_audio_features_matrix(self, track_ids: [list, str], structured = False, max_concurrency = 16):
+        """
+        Return the audio features of many tracks as NumPy float32 columns, filled in C++ without building a dict for each
+        track. Requires numpy
+
+        :param track_ids: Track ID or list of track IDs, duplicates are requested once. IDs are requested in batches of 100
+                          that run concurrently
+        :param structured: Return a NumPy structured array with one record per track instead of a dictionary of columns,
+                           default False
+        :param max_concurrency: Maximum number of batch requests in flight at once, default 16
+
+        :returns Dictionary with the unique track IDs in the order first seen under 'id' and a float32 array for each
+                 audio feature (danceability, energy, key, loudness, mode, speechiness, acousticness, instrumentalness,
+                 liveness, valence, tempo, duration_ms, time_signature), or a structured array with the same fields.
+                 Tracks without audio features are NaN
+
+        :raises RuntimeError if a batch request fails
+        """
+        import numpy
+
+        columns = self._cpp_obj.getAudioFeaturesMatrix([track_ids] if type(track_ids) == str else list(track_ids), max_concurrency)
+        columns['id'] = numpy.array(columns['id'], dtype = str)
+
+        if not structured:
+            return columns
+
+        matrix = numpy.empty(len(columns['id']), dtype = [(name, column.dtype) for name, column in columns.items()])
+        for name, column in columns.items():
+            matrix[name] = column
+
+        return matrix
+
+    def get_audio_analysis_arrays(self, track_id: [list, str], max_concurrency = 16):
+        """
+        Return the audio analysis of tracks with the bars, beats, sections, segments and tatums as NumPy float32 arrays,
+        decoded in C++ without building a Python float for each value. Requires numpy
+
+        :param track_id: Track ID, or list of track IDs whose analyses are requested concurrently
+        :param max_concurrency: Maximum number of requests in flight at once, default 16
+
+        :returns Dictionary shaped like the audio analysis response, with each list replaced by a dictionary of arrays
+                 with one row per entry, i.e. analysis['segments']['timbre'] is a segments x 12 array and
+                 analysis['beats']['start'] holds the start of every beat. meta and track are returned as dictionaries.
+                 A list of these dictionaries if track_id is a list
+
+        :raises RuntimeError if a request fails
+        """
+        analyses = self._cpp_obj.getAudioAnalysisColumns([track_id] if type(track_id) == str else list(track_id), max_concurrency)
+
+        return analyses[0] if type(track_id) == str else analyses
+
     def post_player(self, player_action, song_uri = '', device_id = ''):
         """
         Send commands to the Spotify Player
@@ -400,8 +664,6 @@ class CPPotify:
                 category=RuntimeWarning
             )
 
-        self._token_check()
-
         call = self._cpp_obj.postPlayer(player_action, song_uri.replace(':', '&3A'), device_id)
 
         return self._parse_errors(
@@ -411,44 +673,386 @@ class CPPotify:
             datetime.now()
         )
             
-    def _token_check(self):
+    def enable_cache(self, max_bytes = 64 * 1024 * 1024, ttls: dict = None, default_ttl = 3600):
         """
-        Auto regenerate Spotify tokens after 1 hour, use the "TOKEN_start" class variable
+        Cache GET responses in memory, keyed on the request URL. Least recently used responses are dropped once the
+        cache grows past max_bytes. Expired responses that came with an ETag or Last-Modified header are revalidated with
+        a conditional request, and a 304 Not Modified answer is served from the cache
+
+        :param max_bytes: Maximum size of the cache in bytes, default 64MB
+        :param ttls: Seconds to keep responses for each endpoint, i.e. {'albums': 3600, 'search': 0}. A TTL of 0 means the
+                     endpoint is never cached. Merged into the defaults, which keep catalog objects (albums, artists, tracks,
+                     episodes, shows) for 6 hours, playlists for 5 minutes and never cache player requests or requests
+                     under 'me', the profile, saved library and playlists of the current user
+        :param default_ttl: Seconds to keep responses for endpoints not listed in ttls, default 3600
         """
-        if not self.oAuth:
-            seconds_after_start = (datetime.now() - self.TOKEN_start).seconds
-            if seconds_after_start >= 3000 and seconds_after_start < 3400:
-                warnings.warn(
-                    "Spotify token nearing expiration. This class will generate a new Spotify token when the token expires"
-                )
-            elif seconds_after_start >= 3400:
-                warnings.warn(
-                    "Spotify token has expired. No action needed, generating new token..."
-                )
-                self.TOKEN = self._cpp_obj.reAuth()
-                self.TOKEN_start = datetime.now()
-
-                warnings.warn("New Spotify token created")
-        else:
-            seconds_after_start = (datetime.now() - self.TOKEN_start).seconds
-            if seconds_after_start >= 3000 and seconds_after_start < 3400:
-                warnings.warn(
-                    "Spotify token nearing expiration. This class will generate a new Spotify token when the token expires"
-                )
-            elif seconds_after_start >= 3400:
-                warnings.warn(
-                    "Spotify token has expired. No action needed, generating new token..."
-                )
-                self.TOKEN = self._cpp_obj.reAuthoAuth()
-                self.TOKEN_start = datetime.now()
-
-                warnings.warn("New Spotify token created")
+        self._configure('enableCache', max_bytes, {**self._cache_ttls, **(ttls or {})}, default_ttl)
+
+    def disable_cache(self):
+        """
+        Stop caching GET responses and drop the cached responses
+        """
+        self._cpp_settings.pop('enableCache', None)
+
+        if self._cpp_obj:
+            self._cpp_obj.disableCache()
+
+    def clear_cache(self):
+        """
+        Drop all cached responses, the cache stays enabled
+        """
+        if self._cpp_obj:
+            self._cpp_obj.clearCache()
+
+    def enable_disk_cache(self, path, ttls: dict = None, default_ttl = 3600):
+        """
+        Cache GET responses in a SQLite file that any number of processes can share. Checked after the memory cache
+        if both are enabled. Player requests and requests under 'me' belong to the current user and are never written to
+        the file, whatever their TTL
+
+        :param path: Path of the cache file, created if it does not exist
+        :param ttls: Seconds to keep responses for each endpoint, merged into the same defaults as enable_cache
+        :param default_ttl: Seconds to keep responses for endpoints not listed in ttls, default 3600
+        """
+        self._configure('enableDiskCache', path, {**self._cache_ttls, **(ttls or {})}, default_ttl)
+
+    def disable_disk_cache(self):
+        """
+        Stop reading and writing the disk cache. The cache file is left in place
+        """
+        self._cpp_settings.pop('enableDiskCache', None)
+
+        if self._cpp_obj:
+            self._cpp_obj.disableDiskCache()
+
+    def compact_disk_cache(self):
+        """
+        Delete expired responses from the disk cache and shrink the file. To compact a cache file without a client,
+        i.e. from a cron job, use pybind11module.compactDiskCache(path)
+
+        :returns Number of expired responses deleted
+        """
+        return self._cpp_obj.compactDiskCache() if self._cpp_obj else 0
+
+    def set_rate_limit(self, rate, burst = 1, max_retries = 5):
+        """
+        Limit the rate of requests sent to the Spotify API, shared by every method including get_many. Requests
+        answered with 429 Too Many Requests pause the limiter for the Retry-After period and are sent again. Without a
+        rate limit 429 responses are still sent again after Retry-After, each request waiting on its own
+
+        :param rate: Requests per second
+        :param burst: Number of requests that can be sent at once after a quiet period, default 1
+        :param max_retries: Times a rate limited request is sent again before the 429 response is returned, default 5
+        """
+        self._configure('setRateLimit', rate, burst, max_retries)
+
+    def disable_rate_limit(self):
+        """
+        Send requests without waiting for the limiter. 429 responses are still sent again after the Retry-After period,
+        up to the max_retries last given to set_rate_limit, default 5 times
+        """
+        self._cpp_settings.pop('setRateLimit', None)
+
+        if self._cpp_obj:
+            self._cpp_obj.disableRateLimit()
+
+    def set_retry_policy(self, max_attempts = 3, base_delay = 0.5, max_delay = 8, jitter = True, statuses = (500, 502, 503, 504), timeout = 30):
+        """
+        Set how requests are retried after connection errors, timeouts and server errors. Attempt n waits
+        base_delay * 2^n seconds, capped at max_delay. Requests that fail on every attempt return a Spotify style
+        error object, raised as a SpotifyResponseException
+
+        :param max_attempts: Times a request is sent before giving up, 1 disables retries, default 3
+        :param base_delay: Seconds to wait before the first retry, default 0.5
+        :param max_delay: Longest wait between retries in seconds, default 8
+        :param jitter: Wait a random time between 0 and the backoff delay, default True
+        :param statuses: HTTP statuses that are retried, default 500, 502, 503 and 504
+        :param timeout: Seconds before a single attempt is abandoned, 0 for no limit, default 30
+        """
+        self._configure('setRetryPolicy', max_attempts, base_delay, max_delay, jitter, list(statuses), timeout)
+
+    def set_response_mode(self, mode):
+        """
+        Choose how response bodies are decoded
+
+        :param mode: 'json' to decode them with json.loads (default), 'cpp' to build the Python objects directly from
+                     the response bytes in C++, which skips creating a str of the body, or 'lazy' to return read only
+                     LazyJSON views that only decode the fields that are accessed. LazyJSON supports indexing, len, in,
+                     iteration, get, keys, values and items, to_python returns the full dict or list. LazyJSON validates
+                     on access, a malformed value raises ValueError when it is read rather than when the response
+                     arrives. 'bytes' returns the undecoded body as bytes and 'buffer' as a read only memoryview of the
+                     C++ buffer, without copying it, for handing to another JSON parser or writing to disk. Batched
+                     requests and iter_pages still decode the raw bodies with json.loads
+
+        :raises ValueError if mode is not 'json', 'cpp', 'lazy', 'bytes' or 'buffer'
+        """
+        self._configure('setResponseMode', mode)
+
+    def set_result_models(self, enabled = True):
+        """
+        Return the tracks, albums, artists, playlists and audio features in responses as the Track, Album, Artist,
+        Playlist and AudioFeatures classes of CPPotify_models instead of dicts. The classes use __slots__ and only keep
+        the commonly used fields, which takes several times less memory when holding many records. Paging objects and
+        other dicts around them are kept, raw bodies of the 'bytes' and 'buffer' response modes are not converted
+
+        :param enabled: True to return models, False to return dicts again
+        """
+        self._result_models = enabled
+
+    def get_stats(self):
+        """
+        Request counters of the C++ object
+
+        :returns dict with the number of requests sent, retries, rateLimited retries, failures (requests that failed
+                 on every attempt), reauthorized requests (sent again with a new token after a 401) and tokenRequests
+                 (requests sent to the token endpoint)
+        """
+        return dict(self._cpp_obj.getStats()) if self._cpp_obj else {}
+
+    def _configure(self, method, *args):
+        """
+        Call a C++ configuration method, and call it again whenever the C++ object is rebuilt i.e. by oAuth_flow
+
+        :param method: Name of the C++ method
+        :param args: Arguments for the C++ method
+        """
+        self._cpp_settings[method] = args
+
+        if self._cpp_obj:
+            getattr(self._cpp_obj, method)(*args)
+
+    def _get_batched(self, obj, args, kwargs = None):
+        """
+        Request a list of IDs that is too long for one request in batches through get_many
+
+        :param obj: Spotify object of the GET method, i.e. 'albums' for get_albums
+        :param args: Positional arguments for the GET method
+        :param kwargs: Keyword arguments for the GET method
+
+        :returns Merged response, or None if the request fits in a single call
+        """
+        batches = self._batches(obj, args, kwargs)
+        if batches is None:
+            return None
+
+        return self._merge_batches(self.get_many([(obj, batch) for batch in batches]))
+
+    def _batches(self, obj, args, kwargs = None):
+        """
+        Split the ID list of a GET request into batches the endpoint accepts, 20 for albums, 100 for audio-features
+        and 50 for the rest
+
+        :param obj: Spotify object of the GET method, i.e. 'albums' for get_albums
+        :param args: Positional arguments for the GET method
+        :param kwargs: Keyword arguments for the GET method
+
+        :returns List of keyword argument dictionaries, one for each batch, or None if the IDs fit in a single request
+        """
+        if obj not in self._batch_sizes:
+            return None
+
+        arguments = self._bind(obj, args, kwargs)
+        names = list(arguments)
+        ids = arguments[names[0]]
+
+        # The ID list is the first argument of every batched method
+        size = self._batch_sizes['audio-features' if obj == 'tracks' and arguments['track_obj'] == 'audio-features' else obj]
+        if type(ids) != list or len(ids) <= size:
+            return None
+
+        # Batches are split evenly, a batch holding a single ID would be sent to the single object endpoint
+        count = -(-len(ids) // size)
+        return [{**arguments, names[0]: ids[len(ids) * i // count:len(ids) * (i + 1) // count]} for i in range(count)]
+
+    def _merge_batches(self, responses):
+        """
+        Merge the responses of batched requests, the lists in each response are joined in input order
+
+        :param responses: Parsed responses of each batch
+
+        :returns Merged response
+        """
+        if len(responses) == 1:
+            return responses[0]
+
+        # LazyJSON views are read only and raw bodies are undecoded, batches are merged as plain dicts
+        responses = [response.to_python() if isinstance(response, pybind11module.LazyJSON) else self._decoded(response) for response in responses]
+        merged = responses[0]
+
+        for response in responses[1:]:
+            for key, value in response.items():
+                if type(value) == list:
+                    merged[key].extend(value)
+
+        return merged
+
+    def _bind(self, obj, args, kwargs = None):
+        """
+        Bind arguments to the GET method of a Spotify object, filling in defaults
+
+        :param obj: Spotify object of the GET method, i.e. 'albums' for get_albums
+        :param args: Positional arguments for the GET method
+        :param kwargs: Keyword arguments for the GET method
+
+        :returns Dictionary of argument names and values, without self
+
+        :raises ValueError if the Spotify object does not match a GET method
+        """
+        if obj not in self._url_methods:
+            raise ValueError("Received invalid Spotify object " + str(obj) + ", must be one of " + ", ".join(self._url_methods.keys()))
+
+        bound = inspect.signature(getattr(CPPotify, self._url_methods[obj][0])).bind(self, *args, **(kwargs or {}))
+        bound.apply_defaults()
+
+        return dict(list(bound.arguments.items())[1:])
+
+    def _get_url(self, obj, url):
+        """
+        Send a GET request for a URL built by a C++ URL method or taken from the next link of a paging object
+
+        :param obj: Spotify object of the request
+        :param url: Request URL
+
+        :returns Parsed response
+        """
+        call = self._cpp_obj.performGET(url)
+
+        return self._parse_errors(
+            call[1],
+            obj,
+            call[0],
+            datetime.now()
+        )
+
+    def _get_urls(self, obj, urls, max_concurrency = 16):
+        """
+        Send GET requests for several URLs concurrently
+
+        :param obj: Spotify object of the requests
+        :param urls: Request URLs
+        :param max_concurrency: Maximum number of requests in flight at once, default 16
+
+        :returns Generator of parsed responses in the order of urls. The requests are sent before it is returned, each
+                 response is parsed when it is reached so the responses before an error are still returned
+        """
+        calls = self._cpp_obj.getMany(urls, max_concurrency)
+
+        return (self._parse_errors(
+                    call[1],
+                    obj,
+                    call[0],
+                    datetime.now()
+                ) for call in calls)
+
+    def _page_urls(self, obj, page):
+        """
+        Build the URLs of the pages after page from its next link, by setting the offset of each one. Endpoints in
+        _max_offsets stop at the last page they serve, i.e. the first 1000 results of a search
+
+        :param obj: Spotify object of the request, i.e. 'search'
+        :param page: Paging object
+
+        :returns List of URLs, empty if page is the last page or the paging object has no total
+        """
+        if not page.get('next') or page.get('total') is None or not page.get('limit'):
+            return []
+
+        next_url = page['next'] if re.search(r'[?&]offset=', page['next']) else page['next'] + '&offset=0'
+
+        end = page['total']
+        if obj in self._max_offsets:
+            end = min(end, self._max_offsets[obj] - page['limit'] + 1)
+
+        return [re.sub(r'([?&])offset=\d*', lambda match: match.group(1) + 'offset=' + str(offset), next_url)
+                for offset in range(page['offset'] + page['limit'], end, page['limit'])]
+
+    def _paging_keys(self, response):
+        """
+        Find the paging objects of a response. Paginated endpoints return a paging object, search and browse nest one
+        under each object type
+
+        :param response: Parsed response
+
+        :returns List of keys of the nested paging objects, [None] if the response itself is a paging object
+
+        :raises ValueError if the response holds no paging object
+        """
+        objects = (dict, pybind11module.LazyJSON)
+        if isinstance(response, objects) and 'items' in response:
+            return [None]
+
+        keys = [key for key, value in response.items() if isinstance(value, objects) and 'items' in value] if isinstance(response, objects) else []
+        if not keys:
+            raise ValueError("Received a response that is not paginated, iter_pages and iter_items need a paginated Spotify object")
+
+        return keys
+
+    def _page_window(self, max_concurrency, urls):
+        """
+        Number of pages iter_pages requests at a time, all of them if max_concurrency is not limited
+        """
+        return max_concurrency * 4 if max_concurrency > 0 else len(urls)
+
+    def _paging(self, response, key):
+        """
+        Return the paging object stored under key, or the response itself if key is None
+        """
+        response = self._decoded(response)
+        return response[key] if key else response
+
+    def _decoded(self, response):
+        """
+        Decode a raw body from the 'bytes' and 'buffer' response modes, other responses are returned as they are
+        """
+        if isinstance(response, (bytes, memoryview)):
+            return json.loads(bytes(response))
+
+        return response
+
+    def _split_request(self, request):
+        """
+        Split a get_many request into its Spotify object, positional arguments and keyword arguments
+
+        :param request: Tuple of the Spotify object followed by the arguments of the matching method
+
+        :returns Tuple of the Spotify object, list of positional arguments and dictionary of keyword arguments
+        """
+        obj, args, kwargs = request[0], list(request[1:]), {}
+
+        # A trailing dictionary holds keyword arguments, except for the positional filt argument of search
+        if args and type(args[-1]) == dict and not (obj == 'search' and len(args) == 3):
+            kwargs = args.pop()
+
+        return obj, args, kwargs
+
+    def _request_url(self, obj, args, kwargs = None):
+        """
+        Build the request URL for a call to one of the GET methods using the matching C++ URL method
+
+        :param obj: Spotify object of the GET method, i.e. 'albums' for get_albums
+        :param args: Positional arguments for the GET method
+        :param kwargs: Keyword arguments for the GET method
+
+        :returns Request URL
+
+        :raises ValueError if the Spotify object does not match a GET method
+        """
+        cpp_args = []
+        for value in self._bind(obj, args, kwargs).values():
+            if type(value) == list:
+                value = (',' if obj == 'episodes' else '%2C').join(value)
+            elif type(value) == datetime:
+                value = str(value).replace(' ', 'T').replace(':', '%3A').split('.')[0]
+
+            cpp_args.append(value)
+
+        return getattr(self._cpp_obj, self._url_methods[obj][1])(*cpp_args)
 
     def _parse_errors(self, response: str, obj, request_url, timestamp: datetime):
         """
         Returns a more detailed error object
 
-        :param response: The response being parse for an error
+        :param response: The response being parse for an error, either a JSON string or the object parsed from it
         :param obj: Spotify object that generated the response
         :param timestamp: Timestamp of the request 
 
@@ -458,6 +1062,7 @@ class CPPotify:
                            and return the original response object
         """
         response_map = {
+            '0': 'No Response - The request failed before a response was received',
             '200': 'OK',
             '201': 'Created',
             '202': 'Accepted',
@@ -470,11 +1075,22 @@ class CPPotify:
             '429': 'Too Many Requests - Rate limiting has been applied.',
             '500': 'Internal Server Error',
             '502': 'Bad Gateway',
-            '503': 'Service Unavailable'
+            '503': 'Service Unavailable',
+            '504': 'Gateway Timeout'
         }
 
         try:
-            response = json.loads(response)
+            # Responses are already Python objects when they are parsed in C++, see set_response_mode
+            if type(response) == str:
+                response = json.loads(response)
+
+            # Raw bodies are only decoded when they hold an error, Spotify and the C++ class put it first
+            if isinstance(response, (bytes, memoryview)):
+                if not self._raw_error.match(bytes(response[:64])):
+                    return response
+
+                response = json.loads(bytes(response))
+
             if 'error' in response.keys():
                 if str(response['error']['status']) in response_map.keys():
                     raise CPPotify_exceptions.SpotifyResponseException(response, obj, request_url, timestamp)
@@ -482,12 +1098,16 @@ class CPPotify:
                     warnings.warn("Unexpected error occured with request to {} at {}".format(request_url, str(timestamp)))
                     return response 
             else:
+                if self._result_models:
+                    response = CPPotify_models.from_response(response.to_python() if isinstance(response, pybind11module.LazyJSON) else response)
+
                 if self.debug:
                     print("""API call successfully completed for {} object at URL {}""".format(request_url, obj))
                     return response
                 else:
                     return response 
-        except:
+        except (ValueError, TypeError, AttributeError, KeyError):
+            # Bodies that are not a JSON object, or hold an error in another shape, are returned wrapped instead of raised
             print("""Found error in response. \n
                              URL: {} \n
                              Message: {} \n """.\
@@ -497,4 +1117,271 @@ class CPPotify:
             return {'response': response,
                     'request_obj': obj,
                     'request_url': request_url, 
-                    'time': str(timestamp)}
\ No newline at end of file
+                    'time': str(timestamp)}
+
+
+class AsyncCPPotify(CPPotify):
+    """
+    asyncio version of the CPPotify wrapper. GET methods are coroutines backed by non-blocking C++ transfers,
+    the sockets of those transfers are watched by the running event loop. Token requests run in the default executor
+
+    Takes the same arguments as CPPotify. Methods not listed below, like post_player, are inherited from CPPotify and block
+
+    Example:
+
+        cpp = AsyncCPPotify('your client id', 'your client secret')
+        albums, tracks = await asyncio.gather(cpp.get_albums('album id'), cpp.get_tracks('track id'))
+
+    get_albums, get_artists, get_episodes, get_player, get_playlists, get_profiles, get_shows, get_tracks, search, browse:
+        Awaitable versions of the CPPotify methods with the same arguments
+    get_many: Awaitable version of CPPotify.get_many with the same max_concurrency limit
+    iter_pages, iter_items: Asynchronous generator versions of the CPPotify methods
+    export_items: Awaitable version of CPPotify.export_items
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._loop = None
+        self._async_obj = None
+        self._timer = None
+        self._token_future = None
+
+    async def get_albums(self, *args, **kwargs):
+        return await self._get('albums', args, kwargs)
+
+    async def get_artists(self, *args, **kwargs):
+        return await self._get('artists', args, kwargs)
+
+    async def get_episodes(self, *args, **kwargs):
+        return await self._get('episodes', args, kwargs)
+
+    async def get_player(self, *args, **kwargs):
+        return await self._get('player', args, kwargs)
+
+    async def get_playlists(self, *args, **kwargs):
+        return await self._get('playlists', args, kwargs)
+
+    async def get_profiles(self, *args, **kwargs):
+        return await self._get('profiles', args, kwargs)
+
+    async def get_shows(self, *args, **kwargs):
+        return await self._get('shows', args, kwargs)
+
+    async def get_tracks(self, *args, **kwargs):
+        return await self._get('tracks', args, kwargs)
+
+    async def search(self, *args, **kwargs):
+        return await self._get('search', args, kwargs)
+
+    async def browse(self, *args, **kwargs):
+        return await self._get('browse', args, kwargs)
+
+    async def get_many(self, requests: list, max_concurrency = 16):
+        """
+        Run several GET requests at the same time, see CPPotify.get_many for the format of requests
+
+        :param max_concurrency: Maximum number of requests in flight at once, 0 for no limit, default 16
+
+        :returns List of responses, one for each request
+        """
+        semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency > 0 else None
+
+        async def get(obj, args, kwargs):
+            if semaphore is None:
+                return await self._get(obj, args, kwargs)
+
+            async with semaphore:
+                return await self._get(obj, args, kwargs)
+
+        return await asyncio.gather(*[get(obj, args, kwargs) for obj, args, kwargs in map(self._split_request, requests)])
+
+    async def iter_pages(self, obj, *args, max_concurrency = 16, **kwargs):
+        """
+        Asynchronous version of CPPotify.iter_pages, the remaining pages are requested while the first one is being used
+
+        :returns Asynchronous generator of paging objects
+        """
+        response = self._decoded(await self._get(obj, args, kwargs))
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def fetch(url):
+            async with semaphore:
+                return await self._get_url(obj, url)
+
+        for key in self._paging_keys(response):
+            page = response[key] if key else response
+            urls = self._page_urls(obj, page)
+
+            if urls:
+                # A few times max_concurrency pages are requested ahead, refilled as they are used
+                remaining = iter(urls)
+                prefetch = deque()
+
+                def fill():
+                    for url in itertools.islice(remaining, self._page_window(max_concurrency, urls) - len(prefetch)):
+                        prefetch.append(asyncio.ensure_future(fetch(url)))
+
+                fill()
+
+                try:
+                    yield page
+
+                    while prefetch:
+                        result = await prefetch.popleft()
+                        fill()
+                        yield self._paging(result, key)
+                except BaseException:
+                    # Pages still in flight are dropped once the generator is closed or a page raised an error
+                    for task in prefetch:
+                        task.cancel()
+                    raise
+
+                continue
+
+            while page:
+                prefetch = asyncio.ensure_future(self._get_url(obj, page['next'])) if page.get('next') else None
+
+                try:
+                    yield page
+                except GeneratorExit:
+                    if prefetch:
+                        prefetch.cancel()
+                    raise
+
+                page = self._paging(await prefetch, key) if prefetch else None
+
+    async def iter_items(self, obj, *args, max_concurrency = 16, **kwargs):
+        """
+        Asynchronous version of CPPotify.iter_items
+
+        :returns Asynchronous generator of items across every page
+        """
+        async for page in self.iter_pages(obj, *args, max_concurrency = max_concurrency, **kwargs):
+            for item in page['items']:
+                yield item
+
+    async def export_items(self, path, obj, *args, format = 'ndjson', compression = None, row_group_size = 10000, max_concurrency = 16, **kwargs):
+        """
+        Asynchronous version of CPPotify.export_items, writing to the file blocks the event loop
+
+        :returns Number of items written
+        """
+        writer = CPPotify_export.open_writer(path, format, compression, row_group_size)
+        count = 0
+
+        try:
+            async for item in self.iter_items(obj, *args, max_concurrency = max_concurrency, **kwargs):
+                writer.write(item)
+                count += 1
+        finally:
+            writer.close()
+
+        return count
+
+    async def _get(self, obj, args, kwargs):
+        """
+        Submit a GET request to the C++ event loop transfers and wait for the response
+
+        :param obj: Spotify object of the GET method, i.e. 'albums' for get_albums
+        :param args: Positional arguments for the GET method
+        :param kwargs: Keyword arguments for the GET method
+
+        :returns Parsed response
+        """
+        batches = self._batches(obj, args, kwargs)
+        if batches is not None:
+            return self._merge_batches(await asyncio.gather(*[self._get(obj, (), batch) for batch in batches]))
+
+        return await self._get_url(obj, self._request_url(obj, args, kwargs))
+
+    async def _get_url(self, obj, url):
+        """
+        Submit a GET request for a URL to the C++ event loop transfers and wait for the response
+
+        :param obj: Spotify object of the request
+        :param url: Request URL
+
+        :returns Parsed response
+        """
+        self._attach_loop()
+
+        if not self._cpp_obj.hasToken():
+            await self._await_token()
+
+        future = self._loop.create_future()
+        self._cpp_obj.asyncSubmit(
+            url,
+            lambda call: future.done() or future.set_result(call)
+        )
+        call = await future
+
+        return self._parse_errors(
+            call[1],
+            obj,
+            call[0],
+            datetime.now()
+        )
+
+    async def _await_token(self):
+        """
+        Wait for a token in the default executor so the event loop keeps running while it is requested. Every
+        coroutine waiting for it shares one executor call, a failed request is tried again by the next coroutine
+
+        :raises RuntimeError if the token request failed, or the token endpoint refused the last refresh
+        """
+        future = self._token_future
+        if future is None or future.done():
+            future = self._token_future = self._loop.run_in_executor(None, self._cpp_obj.awaitToken)
+
+        await asyncio.shield(future)
+
+    def _attach_loop(self):
+        """
+        Hand the socket and timer callbacks of the running event loop to the C++ object. Runs again if the event
+        loop or the C++ object changed, i.e. after oAuth_flow
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._async_obj is not self._cpp_obj:
+            self._loop = loop
+            self._async_obj = self._cpp_obj
+            self._token_future = None
+            # Weak reference so the callbacks held by the C++ object do not keep this wrapper alive. A timer already
+            # scheduled on the loop can still fire after the wrapper is gone, the callbacks do nothing then
+            ref = weakref.ref(self)
+
+            def callback(method):
+                return lambda *args: getattr(ref(), method, lambda *args: None)(*args)
+
+            self._cpp_obj.asyncInit(callback('_on_socket'), callback('_on_timer'), callback('_on_unauthorized'))
+
+    def _on_socket(self, fd, what):
+        """
+        Socket callback from libcurl, what is 1 to wait for reads, 2 for writes, 3 for both and 4 to stop watching fd
+        """
+        self._loop.remove_reader(fd)
+        self._loop.remove_writer(fd)
+
+        if what & 1:
+            self._loop.add_reader(fd, self._async_obj.asyncSocketAction, fd, 1)
+        if what & 2:
+            self._loop.add_writer(fd, self._async_obj.asyncSocketAction, fd, 2)
+
+    def _on_unauthorized(self, generation):
+        """
+        Renewal callback from the C++ object, a request was refused with a 401. The token is renewed in the default
+        executor and the refused requests are sent again, or completed with the 401 if the renewal failed
+        """
+        obj = self._async_obj
+        future = self._loop.run_in_executor(None, obj.asyncRenewToken, generation)
+        future.add_done_callback(lambda future: obj.asyncTokenRenewed(not future.cancelled() and future.exception() is None))
+
+    def _on_timer(self, timeout_ms):
+        """
+        Timer callback from libcurl, -1 cancels the timer
+        """
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+        if timeout_ms >= 0:
+            self._timer = self._loop.call_later(timeout_ms / 1000, self._async_obj.asyncSocketAction, -1, 0)
@@ -1,6 +1,7 @@
 import datetime
 
 response_map = {
+    '0': 'No Response - The request failed before a response was received',
     '200': 'OK',
     '201': 'Created',
     '202': 'Accepted',
@@ -13,12 +14,13 @@ response_map = {
     '429': 'Too Many Requests - Rate limiting has been applied.',
     '500': 'Internal Server Error',
     '502': 'Bad Gateway',
-    '503': 'Service Unavailable'
+    '503': 'Service Unavailable',
+    '504': 'Gateway Timeout'
 }
 
 class CPPotifyException(Exception):
     def __init__(self, message):
-        super.__init__(message)
+        super().__init__(message)
 
     def __str__(self):
         return "Exception found in CPPotify call"
@@ -26,9 +28,9 @@ class CPPotifyException(Exception):
 
 class SpotifyArgException(CPPotifyException):
     def __init__(self, message, method, timestamp: datetime.datetime):
-        super.__init__(message)
+        super().__init__(message)
         self.method = method
-        self.timestamp = self.timestamp
+        self.timestamp = timestamp
 
     def __str__(self):
         return """Exception found in call to method {0} at {1}"""
@@ -40,7 +42,7 @@ class SpotifyResponseException(CPPotifyException):
         self.response = response
         self.obj = obj
         self.request_url = request_url
-        self.timestamp = self.timestamp
+        self.timestamp = timestamp
         self.message = """Found error in response. \n
                           URL: {} \n
                           Spotify Object: {} \n
@@ -57,6 +59,6 @@ class SpotifyResponseException(CPPotifyException):
         super().__init__(self.message)
 
     def __str__(self):
-        return "Exception found in arguments made to CPPotify call. Retry the method using the correct argumnets"
+        return self.message
 
     
@@ -0,0 +1,190 @@
+"""
+Writers used by CPPotify.export_items to stream the items of paginated requests to a file as they arrive. NDJSON items
+are written one line at a time, Parquet items are spooled to a temporary file and written on close
+"""
+import gzip
+import json
+import tempfile
+
+import CPPotify_models
+
+
+def _plain(item):
+    """
+    JSON ready form of an item, LazyJSON views and result models are converted to dicts
+    """
+    if isinstance(item, CPPotify_models.SpotifyModel):
+        return item.to_dict()
+
+    if hasattr(item, 'to_python'):
+        return item.to_python()
+
+    return item
+
+
+def _flatten(item, prefix = '', row = None):
+    """
+    Flatten nested dicts into one row with dotted column names, i.e. track.album.name. Lists are kept as JSON strings
+    """
+    row = {} if row is None else row
+
+    if not isinstance(item, dict):
+        row[prefix or 'value'] = json.dumps(item, ensure_ascii = False) if isinstance(item, list) else item
+        return row
+
+    for key, value in item.items():
+        name = prefix + '.' + key if prefix else key
+
+        if isinstance(value, dict):
+            _flatten(value, name, row)
+        elif isinstance(value, list):
+            row[name] = json.dumps(value, ensure_ascii = False)
+        else:
+            row[name] = value
+
+    return row
+
+
+class NDJSONWriter:
+    """
+    Writes one JSON object per line, compressed with gzip if compression is 'gzip'
+    """
+    def __init__(self, path, compression = None):
+        if compression not in (None, 'gzip'):
+            raise ValueError("Received invalid compression " + str(compression) + " for NDJSON, must be None or 'gzip'")
+
+        self.file = gzip.open(path, 'wt', encoding = 'utf-8') if compression == 'gzip' else open(path, 'w', encoding = 'utf-8')
+
+    def write(self, item):
+        self.file.write(json.dumps(_plain(item), ensure_ascii = False, separators = (',', ':')) + '\n')
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    """
+    Writes flattened items to a Parquet file in row groups of row_group_size rows. Each row group is checked against
+    the columns seen so far and spooled to a temporary file, the Parquet file is written on close with the schema of
+    every row group. Columns that first appear in a later row group are added and columns that were always empty take
+    the type of their later values, integer columns that later hold floats become floats. Columns still empty at the
+    end are strings. Requires pyarrow
+    """
+    def __init__(self, path, compression = None, row_group_size = 10000):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Parquet export requires pyarrow, install it with pip install pyarrow")
+
+        self.pyarrow = pyarrow
+        self.parquet = pyarrow.parquet
+        self.path = path
+        self.compression = compression or 'snappy'
+        self.row_group_size = row_group_size
+        self.rows = []
+        self.types = {}
+        self.spool = tempfile.TemporaryFile('w+', encoding = 'utf-8')
+
+    def write(self, item):
+        self.rows.append(_flatten(_plain(item)))
+
+        if len(self.rows) >= self.row_group_size:
+            self._flush()
+
+    def _widen(self, name, current, new):
+        """
+        Type of a column that held values of type current and now holds values of type new
+
+        :raises ValueError if the types can not be stored in one column
+        """
+        types = self.pyarrow.types
+
+        if types.is_null(new) or current == new:
+            return current
+
+        if types.is_null(current):
+            return new
+
+        if all(types.is_integer(type) or types.is_floating(type) for type in (current, new)):
+            return self.pyarrow.float64()
+
+        raise ValueError("Received " + str(new) + " values for Parquet column " + name + " after " + str(current) + " values")
+
+    def _flush(self):
+        """
+        Merge the schema of the buffered rows into the columns and spool them
+
+        :raises ValueError if a column holds values of types that can not be stored together, the rows are dropped and
+                the rows spooled before them are still written on close
+        """
+        rows, self.rows = self.rows, []
+        if not rows:
+            return
+
+        try:
+            schema = self.pyarrow.Table.from_pylist(rows).schema
+        except (self.pyarrow.ArrowInvalid, self.pyarrow.ArrowTypeError) as error:
+            raise ValueError("Received items that can not be exported to Parquet: " + str(error))
+
+        types = dict(self.types)
+        for field in schema:
+            types[field.name] = self._widen(field.name, types.get(field.name, self.pyarrow.null()), field.type)
+
+        self.types = types
+        for row in rows:
+            self.spool.write(json.dumps(row, ensure_ascii = False, separators = (',', ':')) + '\n')
+
+    def _write(self):
+        fields = [self.pyarrow.field(name, self.pyarrow.string() if self.pyarrow.types.is_null(type) else type) for name, type in self.types.items()]
+        schema = self.pyarrow.schema(fields)
+
+        if not fields:
+            self.parquet.write_table(self.pyarrow.table({}), self.path, compression = self.compression)
+            return
+
+        self.spool.seek(0)
+        rows = []
+
+        with self.parquet.ParquetWriter(self.path, schema, compression = self.compression) as writer:
+            for line in self.spool:
+                rows.append(json.loads(line))
+
+                if len(rows) >= self.row_group_size:
+                    writer.write_table(self.pyarrow.Table.from_pylist(rows, schema = schema))
+                    rows = []
+
+            if rows:
+                writer.write_table(self.pyarrow.Table.from_pylist(rows, schema = schema))
+
+    def close(self):
+        try:
+            self._flush()
+        finally:
+            try:
+                self._write()
+            finally:
+                self.spool.close()
+
+
+def open_writer(path, format = 'ndjson', compression = None, row_group_size = 10000):
+    """
+    Open a writer for export_items
+
+    :param path: Output file path
+    :param format: 'ndjson' or 'parquet'
+    :param compression: 'gzip' or None for NDJSON, None defaults to gzip for paths ending in .gz. For Parquet any codec
+                        pyarrow supports, default 'snappy'
+    :param row_group_size: Rows per Parquet row group
+
+    :returns NDJSONWriter or ParquetWriter
+
+    :raises ValueError if format is not 'ndjson' or 'parquet'
+    """
+    if format == 'ndjson':
+        return NDJSONWriter(path, compression or ('gzip' if str(path).endswith('.gz') else None))
+
+    if format == 'parquet':
+        return ParquetWriter(path, compression, row_group_size)
+
+    raise ValueError("Received invalid export format " + str(format) + ", must be 'ndjson' or 'parquet'")
@@ -0,0 +1,202 @@
+"""
+Compact result classes for Spotify objects. Every class uses __slots__ and only keeps the fields listed in it, nested
+objects become models of their own and lists become tuples, so a large number of records takes a fraction of the
+memory of the nested dicts returned by default. See CPPotify.set_result_models
+"""
+
+
+def _image(data):
+    """
+    URL of the largest image of a Spotify object, Spotify lists the largest first
+    """
+    images = data.get('images')
+    return images[0].get('url') if images else None
+
+
+def _total(data, key):
+    """
+    Total of a nested followers or paging object
+    """
+    value = data.get(key)
+    return value.get('total') if isinstance(value, dict) else None
+
+
+def _models(values, model):
+    """
+    Tuple of models built from a list of dicts, None entries are kept as None
+    """
+    return tuple(model.from_dict(value) if value is not None else None for value in values or ())
+
+
+class SpotifyModel:
+    """
+    Base class of the result models. Fields missing from the response are set to None
+    """
+    __slots__ = ()
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Build a model from a Spotify object parsed from JSON
+
+        :param data: Dictionary of the Spotify object
+
+        :returns Model holding the fields of the class, other fields are dropped
+        """
+        return cls(**{name: data.get(name) for name in cls.__slots__})
+
+    def to_dict(self):
+        """
+        :returns Dictionary of the fields of the model, nested models are converted too
+        """
+        def convert(value):
+            if isinstance(value, SpotifyModel):
+                return value.to_dict()
+            if isinstance(value, tuple):
+                return [convert(item) for item in value]
+            return value
+
+        return {name: convert(getattr(self, name)) for name in self.__slots__}
+
+    def __eq__(self, other):
+        return type(self) == type(other) and all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return "{}(id={!r}, name={!r})".format(type(self).__name__, getattr(self, 'id', None), getattr(self, 'name', None))
+
+
+class Artist(SpotifyModel):
+    __slots__ = ('id', 'name', 'uri', 'popularity', 'followers', 'genres', 'image_url')
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            id = data.get('id'),
+            name = data.get('name'),
+            uri = data.get('uri'),
+            popularity = data.get('popularity'),
+            followers = _total(data, 'followers'),
+            genres = tuple(data.get('genres') or ()),
+            image_url = _image(data)
+        )
+
+
+class Album(SpotifyModel):
+    __slots__ = ('id', 'name', 'uri', 'album_type', 'release_date', 'release_date_precision', 'total_tracks', 'label',
+                 'popularity', 'genres', 'artists', 'image_url', 'tracks')
+
+    @classmethod
+    def from_dict(cls, data):
+        tracks = data.get('tracks')
+
+        return cls(
+            id = data.get('id'),
+            name = data.get('name'),
+            uri = data.get('uri'),
+            album_type = data.get('album_type'),
+            release_date = data.get('release_date'),
+            release_date_precision = data.get('release_date_precision'),
+            total_tracks = data.get('total_tracks'),
+            label = data.get('label'),
+            popularity = data.get('popularity'),
+            genres = tuple(data.get('genres') or ()),
+            artists = _models(data.get('artists'), Artist),
+            image_url = _image(data),
+            # Full albums hold the first page of their tracks
+            tracks = _models(tracks.get('items'), Track) if isinstance(tracks, dict) else None
+        )
+
+
+class Track(SpotifyModel):
+    __slots__ = ('id', 'name', 'uri', 'duration_ms', 'explicit', 'popularity', 'track_number', 'disc_number', 'is_local',
+                 'preview_url', 'isrc', 'album', 'artists')
+
+    @classmethod
+    def from_dict(cls, data):
+        album = data.get('album')
+
+        return cls(
+            id = data.get('id'),
+            name = data.get('name'),
+            uri = data.get('uri'),
+            duration_ms = data.get('duration_ms'),
+            explicit = data.get('explicit'),
+            popularity = data.get('popularity'),
+            track_number = data.get('track_number'),
+            disc_number = data.get('disc_number'),
+            is_local = data.get('is_local'),
+            preview_url = data.get('preview_url'),
+            isrc = (data.get('external_ids') or {}).get('isrc'),
+            album = Album.from_dict(album) if album else None,
+            artists = _models(data.get('artists'), Artist)
+        )
+
+
+class Playlist(SpotifyModel):
+    __slots__ = ('id', 'name', 'uri', 'description', 'public', 'collaborative', 'snapshot_id', 'owner_id', 'followers',
+                 'total_tracks', 'image_url', 'tracks')
+
+    @classmethod
+    def from_dict(cls, data):
+        tracks = data.get('tracks')
+        items = tracks.get('items') if isinstance(tracks, dict) else None
+
+        return cls(
+            id = data.get('id'),
+            name = data.get('name'),
+            uri = data.get('uri'),
+            description = data.get('description'),
+            public = data.get('public'),
+            collaborative = data.get('collaborative'),
+            snapshot_id = data.get('snapshot_id'),
+            owner_id = (data.get('owner') or {}).get('id'),
+            followers = _total(data, 'followers'),
+            total_tracks = _total(data, 'tracks'),
+            image_url = _image(data),
+            # Full playlists hold the first page of their tracks, each wrapped in a playlist item
+            tracks = _models([item.get('track') for item in items], Track) if items is not None else None
+        )
+
+
+class AudioFeatures(SpotifyModel):
+    __slots__ = ('id', 'uri', 'danceability', 'energy', 'key', 'loudness', 'mode', 'speechiness', 'acousticness',
+                 'instrumentalness', 'liveness', 'valence', 'tempo', 'duration_ms', 'time_signature')
+
+    def __repr__(self):
+        return "AudioFeatures(id={!r}, tempo={!r})".format(self.id, self.tempo)
+
+
+# Models by the type field of the Spotify object
+models = {
+    'artist': Artist,
+    'album': Album,
+    'track': Track,
+    'playlist': Playlist,
+    'audio_features': AudioFeatures
+}
+
+
+def from_response(response):
+    """
+    Replace the Spotify objects in a parsed response with models, wherever they are nested. Dicts and lists around
+    them, like paging objects or the list of a request for several IDs, are kept
+
+    :param response: Response parsed from JSON
+
+    :returns Response with the artists, albums, tracks, playlists and audio features replaced by models
+    """
+    if isinstance(response, list):
+        return [from_response(value) for value in response]
+
+    if isinstance(response, dict):
+        model = models.get(response.get('type'))
+        if model:
+            return model.from_dict(response)
+
+        return {key: from_response(value) for key, value in response.items()}
+
+    return response
@@ -17,6 +17,7 @@ ext_modules = [
                           pybind11.get_include(True)
                           ],
                       define_macros = [('VERSION_INFO', __version__)],
+                      libraries = ['curl', 'sqlite3'],
                       language="c++",
                       extra_compile_args = ['-std=c++17'])
 ]
@@ -0,0 +1,33 @@
+import sys
+sys.path.insert(0, '../../source/py')
+from CPPotify import CPPotify
+
+import time
+import unittest
+from keys import *
+
+
+class TokenRequests(unittest.TestCase):
+    """
+    Regression benchmark for the number of token endpoint requests a new client sends, and how long construction takes
+    """
+    CLIENTS = 20
+
+    def setUp(self):
+        self.CLIENT_ID = CLIENT_ID
+        self.CLIENT_SECRET = CLIENT_SECRET
+
+    def test_client_credentials(self):
+        start = time.perf_counter()
+        clients = [CPPotify(self.CLIENT_ID, self.CLIENT_SECRET) for _ in range(self.CLIENTS)]
+        elapsed = time.perf_counter() - start
+
+        for client in clients:
+            client.get_tracks('0psS4i5YooJrXfDnGvWRLi')
+            self.assertEqual(client.get_stats()['tokenRequests'], 1)
+
+        print('{} clients constructed in {:.1f}ms'.format(self.CLIENTS, elapsed * 1000))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import sys
+sys.path.insert(0, '../../source/py')
+from CPPotify import CPPotify
+
+import unittest
+import mock_spotify
+
+# Spotify IDs are 22 characters, a longer ID string is sent as a list of IDs
+TRACKS = ['%022d' % i for i in range(120)]
+
+
+def setUpModule():
+    global server
+    server = mock_spotify.start_server()
+
+
+def tearDownModule():
+    server.shutdown()
+    server.server_close()
+
+
+class Batching(unittest.TestCase):
+
+    def setUp(self):
+        server.reset()
+        self.cppotify_obj = CPPotify('client id', 'client secret')
+
+    def test_merged(self):
+        response = self.cppotify_obj.get_tracks(TRACKS)
+
+        self.assertEqual([track['id'] for track in response['tracks']], TRACKS)
+        self.assertEqual(server.count('/v1/tracks'), 3)
+
+    def test_keyword_arguments(self):
+        self.cppotify_obj.get_tracks(track_id = TRACKS)
+        response = self.cppotify_obj.get_tracks(TRACKS[:60])
+
+        self.assertEqual([track['id'] for track in response['tracks']], TRACKS[:60])
+        self.assertEqual(server.count('/v1/tracks'), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
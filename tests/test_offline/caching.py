@@ -0,0 +1,176 @@
+import sys
+sys.path.insert(0, '../../source/py')
+from CPPotify import CPPotify, pybind11module
+
+import os
+import time
+import tempfile
+import unittest
+import mock_spotify
+
+
+def setUpModule():
+    global server
+    server = mock_spotify.start_server()
+
+
+def tearDownModule():
+    server.shutdown()
+    server.server_close()
+
+
+class MemoryCache(unittest.TestCase):
+
+    def setUp(self):
+        server.reset()
+        self.cppotify_obj = CPPotify('client id', 'client secret')
+
+    def test_cached(self):
+        self.cppotify_obj.enable_cache()
+
+        first = self.cppotify_obj.get_tracks('cached')
+        second = self.cppotify_obj.get_tracks('cached')
+
+        self.assertEqual(first, second)
+        self.assertEqual(server.count('/v1/tracks/cached'), 1)
+
+    def test_ttl(self):
+        self.cppotify_obj.enable_cache(ttls = {'tracks': 0})
+
+        self.cppotify_obj.get_tracks('uncached')
+        self.cppotify_obj.get_albums('cached')
+        self.cppotify_obj.get_tracks('uncached')
+        self.cppotify_obj.get_albums('cached')
+
+        self.assertEqual(server.count('/v1/tracks/uncached'), 2)
+        self.assertEqual(server.count('/v1/albums/cached'), 1)
+
+    def test_current_user(self):
+        # Paging next links can point under me/, the tracks and playlists TTLs are for the catalog endpoints only
+        self.cppotify_obj.enable_cache(ttls = {'tracks': 3600, 'playlists': 3600})
+
+        for _ in range(2):
+            self.cppotify_obj._get_url('tracks', pybind11module.API_URL + 'me/tracks?limit=50&offset=0')
+            self.cppotify_obj._get_url('playlists', pybind11module.API_URL + 'me/playlists?limit=50&offset=0')
+            self.cppotify_obj.get_profiles(True)
+
+        self.assertEqual(server.count('/v1/me/tracks'), 2)
+        self.assertEqual(server.count('/v1/me/playlists'), 2)
+        self.assertEqual(server.count('/v1/me'), 4)
+
+    def test_current_user_tokens(self):
+        other = CPPotify('client id', 'client secret')
+        self.cppotify_obj.enable_cache()
+        other.enable_cache()
+
+        url = pybind11module.API_URL + 'me/tracks?limit=50&offset=0'
+        first = self.cppotify_obj._get_url('tracks', url)
+        second = other._get_url('tracks', url)
+
+        self.assertNotEqual(first['auth'], second['auth'])
+        self.assertEqual(self.cppotify_obj._get_url('tracks', url)['auth'], first['auth'])
+        self.assertEqual(server.count('/v1/me/tracks'), 3)
+
+    def test_clear_and_disable(self):
+        self.cppotify_obj.enable_cache()
+
+        self.cppotify_obj.get_tracks('cleared')
+        self.cppotify_obj.clear_cache()
+        self.cppotify_obj.get_tracks('cleared')
+        self.cppotify_obj.disable_cache()
+        self.cppotify_obj.get_tracks('cleared')
+
+        self.assertEqual(server.count('/v1/tracks/cleared'), 3)
+
+    def test_get_many(self):
+        self.cppotify_obj.enable_cache()
+
+        self.cppotify_obj.get_tracks('many')
+        responses = self.cppotify_obj.get_many([('tracks', 'many'), ('tracks', 'other')])
+
+        self.assertEqual([response['id'] for response in responses], ['many', 'other'])
+        self.assertEqual(server.count('/v1/tracks/many'), 1)
+
+    def test_revalidation(self):
+        self.cppotify_obj.enable_cache(ttls = {'tracks': 1})
+
+        first = self.cppotify_obj.get_tracks('revalidated')
+        time.sleep(1.2)
+        second = self.cppotify_obj.get_tracks('revalidated')
+
+        # The expired response is sent again with its ETag and served from the cache after a 304
+        self.assertEqual(first, second)
+        self.assertEqual(server.count('/v1/tracks/revalidated'), 2)
+        self.assertEqual(server.requests[-1][2], '"v1"')
+        self.assertEqual(server.revalidations, 1)
+
+        # The 304 renews the cached response
+        self.cppotify_obj.get_tracks('revalidated')
+        self.assertEqual(server.count('/v1/tracks/revalidated'), 2)
+
+
+class DiskCache(unittest.TestCase):
+
+    def setUp(self):
+        server.reset()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'cache.sqlite')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_shared(self):
+        first = CPPotify('client id', 'client secret')
+        first.enable_disk_cache(self.path)
+        response = first.get_tracks('disk')
+
+        second = CPPotify('client id', 'client secret')
+        second.enable_disk_cache(self.path)
+
+        self.assertEqual(second.get_tracks('disk'), response)
+        self.assertEqual(server.count('/v1/tracks/disk'), 1)
+
+    def test_current_user_tokens(self):
+        url = pybind11module.API_URL + 'me/tracks?limit=50&offset=0'
+
+        first = CPPotify('client id', 'client secret')
+        first.enable_disk_cache(self.path, ttls = {'me': 3600, 'player': 3600})
+        response = first._get_url('tracks', url)
+        first.get_player('')
+
+        second = CPPotify('client id', 'client secret')
+        second.enable_disk_cache(self.path, ttls = {'me': 3600, 'player': 3600})
+
+        self.assertNotEqual(second._get_url('tracks', url)['auth'], response['auth'])
+        second.get_player('')
+        self.assertEqual(server.count('/v1/me/tracks'), 2)
+        self.assertEqual(server.count('/v1/player'), 2)
+
+    def test_revalidation(self):
+        cppotify_obj = CPPotify('client id', 'client secret')
+        cppotify_obj.enable_disk_cache(self.path, ttls = {'tracks': 1})
+
+        first = cppotify_obj.get_tracks('revalidated')
+        time.sleep(1.2)
+        second = cppotify_obj.get_tracks('revalidated')
+
+        self.assertEqual(first, second)
+        self.assertEqual(server.requests[-1][2], '"v1"')
+        self.assertEqual(server.revalidations, 1)
+
+    def test_compact(self):
+        cppotify_obj = CPPotify('client id', 'client secret')
+        cppotify_obj.enable_disk_cache(self.path, ttls = {'tracks': 1})
+
+        cppotify_obj.get_tracks('expired')
+        cppotify_obj.get_albums('kept')
+        time.sleep(1.2)
+
+        self.assertEqual(cppotify_obj.compact_disk_cache(), 1)
+
+        cppotify_obj.get_albums('kept')
+        self.assertEqual(server.count('/v1/albums/kept'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
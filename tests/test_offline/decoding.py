@@ -0,0 +1,202 @@
+import sys
+sys.path.insert(0, '../../source/py')
+from CPPotify import CPPotify, pybind11module
+import CPPotify_models
+
+import json
+import math
+import unittest
+import mock_spotify
+
+
+DOCUMENTS = [
+    '{}',
+    '[]',
+    '{"name": "Caf\\u00e9 \\ud83c\\udfb5", "escaped": "a\\"b\\\\c\\/d\\n\\t", "utf8": "Sigur Rós"}',
+    '{"int": 42, "negative": -7, "big": 123456789012345678901234567890, "float": 0.125, "exponent": -1.5e-3}',
+    '{"true": true, "false": false, "null": null, "nested": {"list": [1, [2, [3, {"deep": []}]]]}}',
+    '[{"id": "a", "markets": ["US", "GB"]}, {"id": "b", "markets": []}, null]'
+]
+
+# Spotify IDs are 22 characters, a longer ID string is sent as a list of IDs
+TRACKS = ['%022d' % i for i in range(3)]
+
+
+def setUpModule():
+    global server
+    server = mock_spotify.start_server()
+
+
+def tearDownModule():
+    server.shutdown()
+    server.server_close()
+
+
+class ParseJSON(unittest.TestCase):
+
+    def test_parity(self):
+        for document in DOCUMENTS:
+            self.assertEqual(pybind11module.parseJSON(document), json.loads(document), document)
+
+    def test_escapes(self):
+        document = '"a\\"b\\\\c\\/d\\b\\f\\n\\r\\t\\u0041\\u00e9\\u20ac"'
+        self.assertEqual(pybind11module.parseJSON(document), json.loads(document))
+
+    def test_surrogate_pairs(self):
+        self.assertEqual(pybind11module.parseJSON('"\\ud83c\\udfb5"'), '\U0001f3b5')
+        self.assertEqual(pybind11module.parseJSON('{"\\ud83c\\udfb5": "\\uD834\\uDD1E"}'), {'\U0001f3b5': '\U0001d11e'})
+
+        # A lone surrogate can not be encoded as UTF-8, the document is returned as it is
+        self.assertEqual(pybind11module.parseJSON('"\\ud83c"'), '"\\ud83c"')
+        self.assertEqual(pybind11module.parseJSON('"\\udfb5\\ud83c"'), '"\\udfb5\\ud83c"')
+
+    def test_integers(self):
+        for number in ('9223372036854775807', '-9223372036854775808', '18446744073709551615', '18446744073709551616', '-99999999999999999999'):
+            self.assertEqual(pybind11module.parseJSON(number), int(number), number)
+
+        self.assertEqual(pybind11module.parseJSON('[1e2, 1E-2, 0.5, -0]'), [100.0, 0.01, 0.5, 0])
+
+    def test_depth(self):
+        self.assertEqual(pybind11module.parseJSON('[' * 512 + ']' * 512), json.loads('[' * 512 + ']' * 512))
+
+        document = '[' * 513 + ']' * 513
+        self.assertEqual(pybind11module.parseJSON(document), document)
+
+        document = '{"a": ' * 513 + '1' + '}' * 513
+        self.assertEqual(pybind11module.parseJSON(document), document)
+
+    def test_invalid(self):
+        # Bodies that are not JSON are returned as they are
+        self.assertEqual(pybind11module.parseJSON('Service Unavailable'), 'Service Unavailable')
+
+        for document in ('', ' ', '{"a": 1,}', '[1, 2', '[1] 2', '{"a" 1}', '{1: 2}', "'single'", 'tru', '01', '1.', '.5',
+                         '+1', '0x10', 'NaN', 'Infinity', '-Infinity', '"\\x"', '"\\u12"', '"tab\there"', '"open'):
+            self.assertEqual(pybind11module.parseJSON(document), document, document)
+
+
+class LazyJSON(unittest.TestCase):
+
+    def test_access(self):
+        document = DOCUMENTS[4]
+        view = pybind11module.lazyJSON(document)
+
+        self.assertEqual(len(view), 4)
+        self.assertIn('nested', view)
+        self.assertNotIn('missing', view)
+        self.assertEqual(list(view.keys()), list(json.loads(document).keys()))
+        self.assertEqual(view['nested']['list'][1][1][0], 3)
+        self.assertIsNone(view['null'])
+        self.assertEqual(view.get('missing', 'default'), 'default')
+        self.assertEqual(view.to_python(), json.loads(document))
+
+    def test_parity(self):
+        for document in DOCUMENTS:
+            self.assertEqual(pybind11module.lazyJSON(document).to_python(), json.loads(document), document)
+
+    def test_malformed_value(self):
+        # Only the accessed value is validated
+        view = pybind11module.lazyJSON('{"valid": 1, "invalid": "\\x"}')
+        self.assertEqual(view['valid'], 1)
+
+        with self.assertRaises(ValueError):
+            view['invalid']
+
+        with self.assertRaises(ValueError):
+            view.to_python()
+
+
+class ResponseModes(unittest.TestCase):
+
+    def setUp(self):
+        server.reset()
+        self.cppotify_obj = CPPotify('client id', 'client secret')
+        self.expected = self.cppotify_obj.get_tracks(TRACKS)
+
+    def test_cpp(self):
+        self.cppotify_obj.set_response_mode('cpp')
+        self.assertEqual(self.cppotify_obj.get_tracks(TRACKS), self.expected)
+
+    def test_lazy(self):
+        self.cppotify_obj.set_response_mode('lazy')
+        response = self.cppotify_obj.get_tracks(TRACKS)
+
+        self.assertIsInstance(response, pybind11module.LazyJSON)
+        self.assertEqual(response['tracks'][2]['id'], TRACKS[2])
+        self.assertEqual(response.to_python(), self.expected)
+
+    def test_raw(self):
+        for mode in ('bytes', 'buffer'):
+            self.cppotify_obj.set_response_mode(mode)
+            self.assertEqual(json.loads(bytes(self.cppotify_obj.get_tracks(TRACKS))), self.expected)
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            self.cppotify_obj.set_response_mode('xml')
+
+    def test_models(self):
+        self.cppotify_obj.set_result_models()
+        tracks = self.cppotify_obj.get_tracks(TRACKS)['tracks']
+
+        self.assertTrue(all(isinstance(track, CPPotify_models.Track) for track in tracks))
+        self.assertEqual([track.id for track in tracks], TRACKS)
+
+
+class Columns(unittest.TestCase):
+
+    def setUp(self):
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest('numpy is not installed')
+
+        server.reset()
+        self.cppotify_obj = CPPotify('client id', 'client secret')
+
+    def test_audio_features(self):
+        columns = self.cppotify_obj.get_audio_features_matrix(['track1', 'track2', 'missing', 'track1'])
+
+        # Duplicates are requested once and unknown tracks are NaN
+        self.assertEqual(list(columns['id']), ['track1', 'track2', 'missing'])
+        self.assertEqual(columns['danceability'].dtype.name, 'float32')
+        self.assertEqual(list(columns['danceability'][:2]), [1, 2])
+        self.assertEqual(list(columns['tempo'][:2]), [11, 12])
+        self.assertTrue(math.isnan(columns['energy'][2]))
+
+    def test_audio_features_batches(self):
+        track_ids = ['track' + str(i) for i in range(250)]
+        columns = self.cppotify_obj.get_audio_features_matrix(track_ids)
+
+        self.assertEqual(list(columns['key']), [i + 2 for i in range(250)])
+        self.assertEqual(server.count('/v1/audio-features'), 3)
+
+    def test_structured(self):
+        records = self.cppotify_obj.get_audio_features_matrix('track7', structured = True)
+
+        self.assertEqual(records.shape, (1,))
+        self.assertEqual(records['energy'][0], 8)
+
+    def test_audio_analysis(self):
+        analysis = self.cppotify_obj.get_audio_analysis_arrays('analysed')
+        expected = mock_spotify.analysis('analysed')
+
+        self.assertEqual(analysis['meta'], expected['meta'])
+        self.assertEqual(analysis['segments']['timbre'].shape, (3, 12))
+        self.assertEqual(list(analysis['segments']['timbre'][1]), [float(12 + j) for j in range(12)])
+        self.assertEqual(list(analysis['beats']['start']), [beat['start'] for beat in expected['beats']])
+        self.assertEqual(len(self.cppotify_obj.get_audio_analysis_arrays(['one', 'two'])), 2)
+
+    def test_malformed_numbers(self):
+        for number in (b'inf', b'-inf', b'nan', b'-nan', b'01', b'1.', b'-', b'1e', b'0x10'):
+            server.bodies['/v1/audio-analysis/malformed'] = b'{"beats": [{"start": ' + number + b'}]}'
+
+            with self.assertRaises(RuntimeError, msg = number):
+                self.cppotify_obj.get_audio_analysis_arrays('malformed')
+
+            server.bodies['/v1/audio-features/malformed'] = b'{"id": "malformed", "energy": ' + number + b'}'
+
+            with self.assertRaises(RuntimeError, msg = number):
+                self.cppotify_obj.get_audio_features_matrix('malformed')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,251 @@
+import sys
+sys.path.insert(0, '../../source/py')
+from CPPotify import pybind11module
+
+import json
+import re
+import threading
+import time
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, urlencode
+
+
+class MockSpotify(ThreadingHTTPServer):
+    """
+    Local stand-in for the Spotify Web API and token endpoint, for a module built with SPOTIFY_API_URL and
+    SPOTIFY_TOKEN_URL pointing at 127.0.0.1. Tests change the attributes to shape the next responses and read the
+    counters to check what the module sent
+    """
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, address):
+        super().__init__(address, MockHandler)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        # Token requests still waiting out token_delay from before the reset are not counted
+        self.epoch = getattr(self, 'epoch', 0) + 1
+
+        # Token endpoint
+        self.token_requests = 0
+        self.token_attempts = 0
+        self.token_delay = 0
+        self.token_status = 200
+        self.expires_in = 3600
+
+        # API endpoints
+        self.requests = []
+        self.revalidations = 0
+        self.failures = {}
+        self.reject_old_tokens = False
+        self.unauthorized = 0
+        self.playlist_sizes = {}
+        self.missing_offset = None
+        self.search_total = 2000
+
+        # Bodies served as they are for a path, i.e. malformed JSON
+        self.bodies = {}
+
+    def token(self):
+        return 'token%d' % self.token_requests
+
+    def fail(self, path, status, times = 1, headers = ()):
+        """
+        Answer the next requests for a path with an error status
+
+        :param path: Request path without the query, i.e. /v1/tracks/abc
+        :param status: HTTP status of the error responses
+        :param times: Number of requests that fail before the path is served again
+        :param headers: Extra response headers, i.e. [('Retry-After', '1')]
+        """
+        self.failures[path] = [status, times, list(headers)]
+
+    def count(self, path):
+        """
+        Number of requests received for a path, without the query
+        """
+        return len([request for request in self.requests if request[0] == path])
+
+    def handle_error(self, request, client_address):
+        # Clients that hang up early, i.e. a destroyed client abandoning its token request, are expected
+        pass
+
+    def start(self):
+        threading.Thread(target = self.serve_forever, daemon = True).start()
+        return self
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def send(self, status, body = None, headers = ()):
+        data = body if isinstance(body, bytes) else (b'' if body is None else json.dumps(body).encode())
+
+        self.send_response(status)
+        for key, value in headers:
+            self.send_header(key, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def error(self, status, message, headers = ()):
+        self.send(status, {'error': {'status': status, 'message': message}}, headers)
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0)).decode()
+
+        if urlparse(self.path).path != urlparse(pybind11module.TOKEN_URL).path:
+            return self.send(204)
+
+        epoch = server.epoch
+        time.sleep(server.token_delay)
+
+        with server.lock:
+            if server.epoch != epoch:
+                return self.send(503, {'error': 'server_error'})
+
+            server.token_attempts += 1
+
+        if server.token_status != 200:
+            return self.send(server.token_status, {'error': 'invalid_grant' if server.token_status in (400, 401) else 'server_error'})
+
+        with server.lock:
+            server.token_requests += 1
+            token = {'access_token': server.token(), 'token_type': 'Bearer', 'expires_in': server.expires_in}
+
+        if 'authorization_code' in body:
+            token['refresh_token'] = 'refresh'
+
+        self.send(200, token)
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        path, query = url.path, {key: value[0] for key, value in parse_qs(url.query).items()}
+
+        with server.lock:
+            server.requests.append((path, self.headers.get('Authorization'), self.headers.get('If-None-Match')))
+            failure = server.failures.get(path)
+            if failure and failure[1] > 0:
+                failure[1] -= 1
+                return self.error(failure[0], 'Mock failure', failure[2])
+
+            if server.reject_old_tokens and self.headers.get('Authorization') != 'Bearer ' + server.token():
+                server.unauthorized += 1
+                return self.error(401, 'The access token expired')
+
+            body = server.bodies.get(path)
+
+        if body is not None:
+            return self.send(200, body)
+
+        if path.endswith('/search'):
+            return self.search(query)
+
+        match = re.match(r'.*/playlists/([^/]+)/tracks$', path)
+        if match:
+            return self.playlist(path, match.group(1), query)
+
+        if path.endswith('/audio-features') or '/audio-features/' in path:
+            return self.audio_features(query['ids'].split(',') if 'ids' in query else [path.split('/')[-1]], 'ids' not in query)
+
+        if '/audio-analysis/' in path:
+            return self.send(200, analysis(path.split('/')[-1]))
+
+        if 'ids' in query:
+            key = path.split('/')[-1]
+            return self.send(200, {key: [{'id': id, 'type': key[:-1], 'name': 'name ' + id} for id in query['ids'].split(',')]})
+
+        # Every other object carries an ETag, and a conditional request for it is answered with 304
+        if self.headers.get('If-None-Match') == '"v1"':
+            with server.lock:
+                server.revalidations += 1
+            self.send_response(304)
+            self.send_header('ETag', '"v1"')
+            self.send_header('Content-Length', '0')
+            return self.end_headers()
+
+        self.send(200, {'id': path.split('/')[-1], 'path': path, 'auth': self.headers.get('Authorization'), 'count': server.count(path)}, [('ETag', '"v1"')])
+
+    def page(self, path, query, total):
+        limit, offset = int(query.get('limit', 20)), int(query.get('offset', 0))
+        next_query = dict(query, limit = limit, offset = offset + limit)
+
+        return {
+            'href': self.path,
+            'items': [{'id': 'item%d' % i, 'index': i} for i in range(offset, min(total, offset + limit))],
+            'limit': limit,
+            'offset': offset,
+            'total': total,
+            'next': pybind11module.API_URL + path.split('/v1/')[-1] + '?' + urlencode(next_query) if offset + limit < total else None
+        }
+
+    def search(self, query):
+        # Spotify serves the first 1000 results of a search
+        if int(query.get('offset', 0)) + int(query.get('limit', 20)) > 1000:
+            return self.error(400, 'Bad search offset')
+
+        path = urlparse(self.path).path
+        self.send(200, {type + 's': self.page(path, query, self.server.search_total) for type in query['type'].split(',')})
+
+    def playlist(self, path, playlist_id, query):
+        if self.server.missing_offset is not None and int(query.get('offset', 0)) >= self.server.missing_offset:
+            return self.error(404, 'Page not found')
+
+        self.send(200, self.page(path, query, self.server.playlist_sizes.get(playlist_id, 0)))
+
+    def audio_features(self, ids, single):
+        features = [None if id.startswith('missing') else features_of(id) for id in ids]
+        self.send(200, features[0] if single else {'audio_features': features})
+
+
+FEATURES = ['danceability', 'energy', 'key', 'loudness', 'mode', 'speechiness', 'acousticness', 'instrumentalness',
+            'liveness', 'valence', 'tempo', 'duration_ms', 'time_signature']
+
+
+def features_of(track_id):
+    """
+    Audio features of a mock track, each feature is its position in FEATURES plus the number at the end of the ID
+    """
+    number = int(re.sub(r'\D', '', track_id) or 0)
+    return dict({feature: i + number for i, feature in enumerate(FEATURES)}, id = track_id, type = 'audio_features')
+
+
+def analysis(track_id):
+    """
+    Audio analysis of a mock track with a few entries in each list
+    """
+    return {
+        'meta': {'analyzer_version': '4.0.0', 'status_code': 0},
+        'track': {'duration': 180.5, 'tempo': 120.0, 'key': 5},
+        'bars': [{'start': i * 2.0, 'duration': 2.0, 'confidence': 0.5} for i in range(4)],
+        'beats': [{'start': i * 0.5, 'duration': 0.5, 'confidence': 0.25} for i in range(8)],
+        'sections': [{'start': 0.0, 'duration': 180.5, 'confidence': 1.0, 'loudness': -7.5, 'tempo': 120.0, 'key': 5}],
+        'segments': [{'start': i * 0.25, 'duration': 0.25, 'loudness_max': -3.0, 'pitches': [j / 12 for j in range(12)],
+                      'timbre': [float(i * 12 + j) for j in range(12)]} for i in range(3)],
+        'tatums': [{'start': i * 0.25, 'duration': 0.25, 'confidence': 0.75} for i in range(16)]
+    }
+
+
+def start_server():
+    """
+    Start the mock server on the address the module was built for
+
+    :returns MockSpotify server, serving in a background thread
+
+    :raises unittest.SkipTest if the module was built for the Spotify servers
+    """
+    api, token = urlparse(pybind11module.API_URL), urlparse(pybind11module.TOKEN_URL)
+    if api.hostname not in ('127.0.0.1', 'localhost') or (api.hostname, api.port) != (token.hostname, token.port):
+        raise unittest.SkipTest('pybind11module was built for {}, build it with -DSPOTIFY_API_URL and -DSPOTIFY_TOKEN_URL '
+                                'pointing at one local port to run the offline tests'.format(pybind11module.API_URL))
+
+    return MockSpotify((api.hostname, api.port)).start()
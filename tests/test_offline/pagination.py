@@ -0,0 +1,169 @@
+import sys
+sys.path.insert(0, '../../source/py')
+from CPPotify import CPPotify, AsyncCPPotify
+from CPPotify_exceptions import SpotifyResponseException
+import CPPotify_export
+
+import os
+import gzip
+import json
+import asyncio
+import tempfile
+import unittest
+import mock_spotify
+
+
+def setUpModule():
+    global server
+    server = mock_spotify.start_server()
+
+
+def tearDownModule():
+    server.shutdown()
+    server.server_close()
+
+
+class IterPages(unittest.TestCase):
+
+    def setUp(self):
+        server.reset()
+        server.playlist_sizes = {'long': 250, 'short': 30}
+        self.cppotify_obj = CPPotify('client id', 'client secret')
+
+    def test_pages(self):
+        pages = list(self.cppotify_obj.iter_pages('playlists', False, playlist_id = 'long', playlist_obj = 'tracks', limit = 50))
+
+        self.assertEqual([page['offset'] for page in pages], [0, 50, 100, 150, 200])
+        self.assertEqual(server.count('/v1/playlists/long/tracks'), 5)
+
+    def test_items(self):
+        for max_concurrency in (1, 16):
+            items = list(self.cppotify_obj.iter_items('playlists', False, playlist_id = 'long', playlist_obj = 'tracks', limit = 20, max_concurrency = max_concurrency))
+            self.assertEqual([item['index'] for item in items], list(range(250)))
+
+    def test_single_page(self):
+        items = list(self.cppotify_obj.iter_items('playlists', False, playlist_id = 'short', playlist_obj = 'tracks', limit = 50))
+        self.assertEqual(len(items), 30)
+
+    def test_search(self):
+        # Search pages stop at the 1000th result instead of requesting offsets the endpoint refuses
+        items = list(self.cppotify_obj.iter_items('search', 'query', 'track', limit = 50))
+        self.assertEqual(len(items), 1000)
+
+        items = list(self.cppotify_obj.iter_items('search', 'query', 'track', limit = 30))
+        self.assertEqual(len(items), 990)
+
+    def test_search_types(self):
+        server.search_total = 120
+        pages = list(self.cppotify_obj.iter_pages('search', 'query', ['track', 'album'], limit = 50))
+
+        self.assertEqual(len(pages), 6)
+        self.assertEqual(sum(len(page['items']) for page in pages), 240)
+
+    def test_error(self):
+        server.missing_offset = 100
+        items = []
+
+        with self.assertRaises(SpotifyResponseException):
+            for item in self.cppotify_obj.iter_items('playlists', False, playlist_id = 'long', playlist_obj = 'tracks', limit = 50):
+                items.append(item)
+
+        self.assertEqual(len(items), 100)
+
+    def test_not_paginated(self):
+        with self.assertRaises(ValueError):
+            list(self.cppotify_obj.iter_pages('tracks', 'track'))
+
+    def test_async(self):
+        cppotify_obj = AsyncCPPotify('client id', 'client secret')
+
+        async def items():
+            return [item['index'] async for item in cppotify_obj.iter_items('playlists', False, playlist_id = 'long', playlist_obj = 'tracks', limit = 50)]
+
+        self.assertEqual(asyncio.run(items()), list(range(250)))
+
+
+class ExportItems(unittest.TestCase):
+
+    def setUp(self):
+        server.reset()
+        server.playlist_sizes = {'long': 250}
+        self.cppotify_obj = CPPotify('client id', 'client secret')
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def export(self, name, **kwargs):
+        path = os.path.join(self.directory.name, name)
+        count = self.cppotify_obj.export_items(path, 'playlists', False, playlist_id = 'long', playlist_obj = 'tracks', limit = 50, **kwargs)
+
+        self.assertEqual(count, 250)
+        return path
+
+    def test_ndjson(self):
+        with open(self.export('items.ndjson')) as file:
+            self.assertEqual([json.loads(line)['index'] for line in file], list(range(250)))
+
+    def test_gzip(self):
+        with gzip.open(self.export('items.ndjson.gz'), 'rt') as file:
+            self.assertEqual([json.loads(line)['index'] for line in file], list(range(250)))
+
+    def test_parquet(self):
+        try:
+            import pyarrow.parquet
+        except ImportError:
+            self.skipTest('pyarrow is not installed')
+
+        table = pyarrow.parquet.read_table(self.export('items.parquet', format = 'parquet', row_group_size = 100))
+
+        self.assertEqual(table.column('index').to_pylist(), list(range(250)))
+        self.assertEqual(pyarrow.parquet.ParquetFile(os.path.join(self.directory.name, 'items.parquet')).num_row_groups, 3)
+
+    def test_invalid_format(self):
+        with self.assertRaises(ValueError):
+            self.export('items.csv', format = 'csv')
+
+
+    def test_parquet_schema(self):
+        try:
+            import pyarrow.parquet
+        except ImportError:
+            self.skipTest('pyarrow is not installed')
+
+        path = os.path.join(self.directory.name, 'items.parquet')
+        writer = CPPotify_export.open_writer(path, 'parquet', row_group_size = 2)
+
+        # A key that first appears in a later row group, a column that is empty at first and an int column that gets floats
+        for item in [{'id': 'a', 'empty': None, 'number': 1}, {'id': 'b', 'empty': None, 'number': 2},
+                     {'id': 'c', 'empty': 3, 'number': 2.5, 'late': 'x'}]:
+            writer.write(item)
+        writer.close()
+
+        table = pyarrow.parquet.read_table(path)
+
+        self.assertEqual(table.to_pylist(), [{'id': 'a', 'empty': None, 'number': 1.0, 'late': None},
+                                             {'id': 'b', 'empty': None, 'number': 2.0, 'late': None},
+                                             {'id': 'c', 'empty': 3, 'number': 2.5, 'late': 'x'}])
+        self.assertEqual(str(table.schema.field('empty').type), 'int64')
+
+    def test_parquet_conflict(self):
+        try:
+            import pyarrow.parquet
+        except ImportError:
+            self.skipTest('pyarrow is not installed')
+
+        path = os.path.join(self.directory.name, 'items.parquet')
+        writer = CPPotify_export.open_writer(path, 'parquet', row_group_size = 1)
+        writer.write({'id': 'a', 'value': 1})
+
+        with self.assertRaises(ValueError):
+            writer.write({'id': 'b', 'value': 'text'})
+
+        # Rows before the conflicting row group are still written
+        writer.close()
+        self.assertEqual(pyarrow.parquet.read_table(path).to_pylist(), [{'id': 'a', 'value': 1}])
+
+
+if __name__ == '__main__':
+    unittest.main()
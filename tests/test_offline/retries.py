@@ -0,0 +1,144 @@
+import sys
+sys.path.insert(0, '../../source/py')
+from CPPotify import CPPotify, AsyncCPPotify
+from CPPotify_exceptions import SpotifyResponseException
+
+import time
+import asyncio
+import unittest
+import mock_spotify
+
+
+def setUpModule():
+    global server
+    server = mock_spotify.start_server()
+
+
+def tearDownModule():
+    server.shutdown()
+    server.server_close()
+
+
+class RateLimit(unittest.TestCase):
+
+    def setUp(self):
+        server.reset()
+        self.cppotify_obj = CPPotify('client id', 'client secret')
+
+    def test_retry_after(self):
+        self.cppotify_obj.set_rate_limit(100, burst = 10)
+        server.fail('/v1/tracks/limited', 429, headers = [('Retry-After', '1')])
+
+        start = time.perf_counter()
+        response = self.cppotify_obj.get_tracks('limited')
+
+        self.assertEqual(response['id'], 'limited')
+        self.assertGreaterEqual(time.perf_counter() - start, 0.9)
+        self.assertEqual(server.count('/v1/tracks/limited'), 2)
+        self.assertEqual(self.cppotify_obj.get_stats()['rateLimited'], 1)
+
+    def test_paced(self):
+        self.cppotify_obj.set_rate_limit(20, burst = 1)
+        self.cppotify_obj.get_tracks('warm')
+
+        start = time.perf_counter()
+        self.cppotify_obj.get_many([('tracks', 'paced' + str(i)) for i in range(10)])
+
+        self.assertGreaterEqual(time.perf_counter() - start, 0.4)
+
+    def test_without_limiter(self):
+        server.fail('/v1/tracks/limited', 429, headers = [('Retry-After', '1')])
+
+        start = time.perf_counter()
+        response = self.cppotify_obj.get_tracks('limited')
+
+        self.assertEqual(response['id'], 'limited')
+        self.assertGreaterEqual(time.perf_counter() - start, 0.9)
+        self.assertEqual(server.count('/v1/tracks/limited'), 2)
+
+    def test_without_limiter_get_many(self):
+        server.fail('/v1/tracks/limited', 429, headers = [('Retry-After', '1')])
+
+        start = time.perf_counter()
+        responses = self.cppotify_obj.get_many([('tracks', 'limited'), ('tracks', 'steady')])
+
+        self.assertEqual([response['id'] for response in responses], ['limited', 'steady'])
+        self.assertGreaterEqual(time.perf_counter() - start, 0.9)
+        self.assertEqual(server.count('/v1/tracks/limited'), 2)
+        self.assertEqual(server.count('/v1/tracks/steady'), 1)
+
+    def test_without_limiter_async(self):
+        server.fail('/v1/tracks/limited', 429, headers = [('Retry-After', '1')])
+        cppotify_obj = AsyncCPPotify('client id', 'client secret')
+
+        response = asyncio.run(cppotify_obj.get_tracks('limited'))
+
+        self.assertEqual(response['id'], 'limited')
+        self.assertEqual(server.count('/v1/tracks/limited'), 2)
+
+    def test_max_retries(self):
+        self.cppotify_obj.set_rate_limit(100, burst = 10, max_retries = 1)
+        server.fail('/v1/tracks/limited', 429, times = 3, headers = [('Retry-After', '0')])
+
+        with self.assertRaises(SpotifyResponseException) as context:
+            self.cppotify_obj.get_tracks('limited')
+
+        self.assertEqual(context.exception.response['error']['status'], 429)
+        self.assertEqual(server.count('/v1/tracks/limited'), 2)
+
+
+class RetryPolicy(unittest.TestCase):
+
+    def setUp(self):
+        server.reset()
+        self.cppotify_obj = CPPotify('client id', 'client secret')
+        self.cppotify_obj.set_retry_policy(max_attempts = 3, base_delay = 0.05, jitter = False)
+
+    def test_recovers(self):
+        server.fail('/v1/tracks/flaky', 503, times = 2)
+
+        self.assertEqual(self.cppotify_obj.get_tracks('flaky')['id'], 'flaky')
+        self.assertEqual(server.count('/v1/tracks/flaky'), 3)
+        self.assertEqual(self.cppotify_obj.get_stats()['retries'], 2)
+
+    def test_backoff(self):
+        self.cppotify_obj.set_retry_policy(max_attempts = 3, base_delay = 0.2, jitter = False)
+        server.fail('/v1/tracks/flaky', 502, times = 2)
+
+        start = time.perf_counter()
+        self.cppotify_obj.get_tracks('flaky')
+
+        # Waits base_delay, then twice base_delay
+        self.assertGreaterEqual(time.perf_counter() - start, 0.55)
+
+    def test_gives_up(self):
+        server.fail('/v1/tracks/down', 500, times = 5)
+
+        with self.assertRaises(SpotifyResponseException) as context:
+            self.cppotify_obj.get_tracks('down')
+
+        self.assertEqual(context.exception.response['error']['status'], 500)
+        self.assertEqual(server.count('/v1/tracks/down'), 3)
+        self.assertEqual(self.cppotify_obj.get_stats()['failures'], 1)
+
+    def test_client_errors(self):
+        server.fail('/v1/tracks/missing', 404)
+
+        with self.assertRaises(SpotifyResponseException):
+            self.cppotify_obj.get_tracks('missing')
+
+        self.assertEqual(server.count('/v1/tracks/missing'), 1)
+
+    def test_get_many(self):
+        server.fail('/v1/tracks/flaky', 503, times = 2)
+
+        responses = self.cppotify_obj.get_many([('tracks', 'flaky'), ('tracks', 'steady')])
+
+        self.assertEqual([response['id'] for response in responses], ['flaky', 'steady'])
+        self.assertEqual(server.count('/v1/tracks/flaky'), 3)
+        self.assertEqual(server.count('/v1/tracks/steady'), 1)
+
+
+
+if __name__ == '__main__':
+    unittest.main()
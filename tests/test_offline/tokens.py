@@ -0,0 +1,261 @@
+import sys
+sys.path.insert(0, '../../source/py')
+from CPPotify import CPPotify, AsyncCPPotify
+
+import os
+import gc
+import time
+import asyncio
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+import mock_spotify
+
+
+def setUpModule():
+    global server
+    server = mock_spotify.start_server()
+
+
+def tearDownModule():
+    server.shutdown()
+    server.server_close()
+
+
+class LazyToken(unittest.TestCase):
+
+    def setUp(self):
+        server.reset()
+
+    def test_construction(self):
+        server.token_delay = 0.5
+
+        start = time.perf_counter()
+        cppotify_obj = CPPotify('client id', 'client secret')
+        self.assertLess(time.perf_counter() - start, 0.25)
+
+        # No token is requested until a request needs one
+        time.sleep(0.2)
+        self.assertEqual(server.token_attempts, 0)
+        self.assertIsNone(cppotify_obj.TOKEN_start)
+
+        # The first request waits for the token
+        cppotify_obj.get_tracks('first')
+        self.assertEqual(server.requests[-1][1], 'Bearer token1')
+        self.assertEqual(cppotify_obj.get_stats()['tokenRequests'], 1)
+        self.assertEqual(server.token_requests, 1)
+
+    def test_token_start(self):
+        cppotify_obj = CPPotify('client id', 'client secret')
+        cppotify_obj.get_tracks('first')
+
+        self.assertLess(abs(datetime.now() - cppotify_obj.TOKEN_start), timedelta(seconds = 5))
+
+        with self.assertRaises(AttributeError):
+            cppotify_obj.TOKEN_start = datetime.now()
+
+    def test_destroyed(self):
+        cppotify_obj = CPPotify('client id', 'client secret')
+        cppotify_obj.get_tracks('first')
+
+        start = time.perf_counter()
+        del cppotify_obj
+        gc.collect()
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+    def test_destroyed_during_refresh(self):
+        server.expires_in = 2
+        cppotify_obj = CPPotify('client id', 'client secret')
+        cppotify_obj.get_tracks('first')
+
+        # The refresh after 1 second is still waiting on the token endpoint
+        server.token_delay = 3
+        time.sleep(1.3)
+
+        start = time.perf_counter()
+        del cppotify_obj
+        gc.collect()
+        self.assertLess(time.perf_counter() - start, 1)
+
+    def test_oAuth_construction(self):
+        CPPotify('client id', 'client secret', 'http://localhost/', 'state', 'user-read-private').oAuth_flow('http://localhost/?code=code&state=state')
+        time.sleep(0.2)
+
+        self.assertEqual(server.token_attempts, 0)
+
+    def test_token_failure(self):
+        server.token_status = 503
+        cppotify_obj = CPPotify('client id', 'client secret')
+
+        with self.assertRaises(RuntimeError):
+            cppotify_obj.get_tracks('first')
+
+    def test_oAuth(self):
+        cppotify_obj = CPPotify('client id', 'client secret', 'http://localhost/', 'state', 'user-read-private')
+        cppotify_obj.oAuth_flow('http://localhost/?code=code&state=state')
+
+        cppotify_obj.get_profiles(True)
+        cppotify_obj.get_profiles(True)
+
+        # Only the authorization code is exchanged, by the first request
+        self.assertEqual(cppotify_obj.get_stats()['tokenRequests'], 1)
+        self.assertEqual(server.token_requests, 1)
+        self.assertEqual(server.requests[-1][1], 'Bearer token1')
+
+
+class Refresh(unittest.TestCase):
+
+    def setUp(self):
+        server.reset()
+
+        # Tokens are refreshed halfway through a lifetime shorter than the refresh margin, after 1 second
+        server.expires_in = 2
+        self.cppotify_obj = CPPotify('client id', 'client secret')
+        self.cppotify_obj.get_tracks('first')
+
+    def tearDown(self):
+        # A failed test keeps its client alive, which would go on refreshing during the next tests
+        self.cppotify_obj = None
+
+    def test_background(self):
+        time.sleep(1.5)
+        self.assertEqual(server.token_requests, 2)
+
+        self.cppotify_obj.get_tracks('second')
+        self.assertEqual(server.requests[-1][1], 'Bearer token2')
+
+    def test_refused(self):
+        server.token_status = 400
+        time.sleep(1.5)
+
+        # The refusal is raised by the next request without sending it, and the refresh is not tried again
+        with self.assertRaises(RuntimeError) as context:
+            self.cppotify_obj.get_tracks('second')
+
+        self.assertIn('invalid_grant', str(context.exception))
+        self.assertEqual(server.count('/v1/tracks/second'), 0)
+        self.assertEqual(server.token_attempts, 2)
+
+        # A token set by hand ends the refusal
+        server.token_status = 200
+        self.cppotify_obj._cpp_obj.reAuth()
+
+        self.assertEqual(self.cppotify_obj.get_tracks('second')['id'], 'second')
+        self.assertEqual(server.token_attempts, 3)
+
+    def test_transient(self):
+        server.token_status = 503
+        time.sleep(2.2)
+
+        # The refresh failed and waits to try again, a request with the expired token requests one itself
+        with self.assertRaises(RuntimeError):
+            self.cppotify_obj.get_tracks('second')
+
+        self.assertEqual(server.token_attempts, 3)
+
+        server.token_status = 200
+        self.assertEqual(self.cppotify_obj.get_tracks('second')['id'], 'second')
+        self.assertEqual(server.requests[-1][1], 'Bearer token2')
+
+
+class Reauthorization(unittest.TestCase):
+
+    def setUp(self):
+        server.reset()
+        server.reject_old_tokens = True
+
+    def expire(self):
+        # The token the client holds is refused from now on
+        with server.lock:
+            server.token_requests += 1
+
+    def test_replayed(self):
+        cppotify_obj = CPPotify('client id', 'client secret')
+        cppotify_obj.get_tracks('first')
+        self.expire()
+
+        self.assertEqual(cppotify_obj.get_tracks('replayed')['id'], 'replayed')
+        self.assertEqual(server.unauthorized, 1)
+        self.assertEqual(cppotify_obj.get_stats()['reauthorized'], 1)
+        self.assertEqual(cppotify_obj.get_stats()['tokenRequests'], 2)
+
+    def test_single_renewal(self):
+        cppotify_obj = CPPotify('client id', 'client secret')
+        cppotify_obj.get_tracks('first')
+        self.expire()
+
+        responses = cppotify_obj.get_many([('tracks', 'replayed' + str(i)) for i in range(10)])
+
+        self.assertEqual([response['id'] for response in responses], ['replayed' + str(i) for i in range(10)])
+        self.assertEqual(cppotify_obj.get_stats()['tokenRequests'], 2)
+
+    def test_async(self):
+        cppotify_obj = AsyncCPPotify('client id', 'client secret')
+
+        async def requests():
+            await cppotify_obj.get_tracks('first')
+            self.expire()
+            return await asyncio.gather(*[cppotify_obj.get_tracks('replayed' + str(i)) for i in range(10)])
+
+        responses = asyncio.run(requests())
+
+        self.assertEqual([response['id'] for response in responses], ['replayed' + str(i) for i in range(10)])
+        self.assertEqual(cppotify_obj.get_stats()['tokenRequests'], 2)
+
+    def test_async_token(self):
+        server.token_delay = 0.3
+        cppotify_obj = AsyncCPPotify('client id', 'client secret')
+
+        async def requests():
+            ticks = 0
+            requests = asyncio.gather(*[cppotify_obj.get_tracks('waiting' + str(i)) for i in range(5)])
+
+            # The event loop keeps running while the first token is requested
+            while not requests.done():
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+            return ticks, requests.result()
+
+        ticks, responses = asyncio.run(requests())
+
+        self.assertGreater(ticks, 10)
+        self.assertEqual(len(responses), 5)
+        self.assertEqual(server.token_requests, 1)
+
+
+class TokenStore(unittest.TestCase):
+
+    def setUp(self):
+        server.reset()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'tokens')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_shared(self):
+        first = CPPotify('client id', 'client secret', token_store = self.path)
+        first.get_tracks('first')
+
+        second = CPPotify('client id', 'client secret', token_store = self.path)
+        second.get_tracks('second')
+
+        self.assertEqual(server.token_requests, 1)
+        self.assertEqual(first.TOKEN, second.TOKEN)
+        self.assertEqual(second.get_stats()['tokenRequests'], 0)
+
+    def test_concurrent(self):
+        server.token_delay = 0.2
+        clients = [CPPotify('client id', 'client secret', token_store = self.path) for _ in range(5)]
+
+        for cppotify_obj in clients:
+            cppotify_obj.get_tracks('concurrent')
+
+        self.assertEqual(server.token_requests, 1)
+        self.assertEqual(len(set(cppotify_obj.TOKEN for cppotify_obj in clients)), 1)
+
+
+
+if __name__ == '__main__':
+    unittest.main()